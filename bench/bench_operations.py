@@ -0,0 +1,286 @@
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import sqlite3
+import statistics
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'lib'))
+
+from generate import DEFAULT_SIZES, catalog_path
+
+# Times every lib/cli.py command against generated catalogs, in process, through cli.run()
+# (so argument parsing, opening the database and writing the output are all included, but
+# interpreter start-up is not). Results are written as JSON and can be compared with a
+# stored baseline:
+#
+#   python bench/bench_operations.py --sizes 10000,100000 --save-baseline
+#   ... change something ...
+#   python bench/bench_operations.py --sizes 10000,100000     # exits 1 on a regression
+#
+# Commands that change the catalog only touch rows named "Bench ..." that they create
+# themselves, and those rows are removed afterwards, so a cached catalog stays the same.
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, 'results.json')
+
+# Prefix of every artist and song the benchmark creates; generated titles never start with it
+PREFIX = 'Bench'
+
+
+class Case:
+    def __init__(self, name, argv, runs, setup=None, note=''):
+        self.name = name
+        self.note = note  # shown in the progress output only, so result names stay comparable
+        self.argv = argv  # function of the run number returning the command line
+        self.runs = runs
+        self.setup = setup  # function of the number of runs, called once before timing
+
+
+# Function to run one command quietly and return how long it took in milliseconds
+def run_command(cli, argv, devnull):
+    with contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        status = cli.run(argv)
+        elapsed = (time.perf_counter() - start) * 1000
+    if status:
+        raise RuntimeError(f"'{' '.join(argv)}' exited with status {status}")
+    return elapsed
+
+
+def summarise(timings):
+    ordered = sorted(timings)
+    return {
+        'runs': len(ordered),
+        'p50_ms': round(statistics.median(ordered), 3),
+        'p95_ms': round(ordered[math.ceil(len(ordered) * 0.95) - 1], 3),
+        'mean_ms': round(statistics.fmean(ordered), 3),
+        'min_ms': round(ordered[0], 3),
+        'max_ms': round(ordered[-1], 3),
+    }
+
+
+def _insert_artists(engine, names):
+    with engine.begin() as conn:
+        conn.exec_driver_sql("INSERT INTO artist_table (title, genre) VALUES (?, 'pop')", [(name,) for name in names])
+
+
+def _insert_songs(engine, titles, artist_id):
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO songs_table (title, release_date, bpm, artist_id) VALUES (?, '2024', 120, ?)",
+            [(title, artist_id) for title in titles],
+        )
+
+
+def _ids(engine, table, titles):
+    with engine.connect() as conn:
+        placeholders = ', '.join('?' * len(titles))
+        rows = conn.exec_driver_sql(f"SELECT title, id FROM {table} WHERE title IN ({placeholders})", tuple(titles))
+        ids = dict(rows.all())
+    return [ids[title] for title in titles]
+
+
+# Function to remove everything the benchmark created
+def cleanup(engine):
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "DELETE FROM songs_table WHERE title LIKE ? OR artist_id IN (SELECT id FROM artist_table WHERE title LIKE ?)",
+            (f'{PREFIX} %', f'{PREFIX} %'),
+        )
+        conn.exec_driver_sql("DELETE FROM artist_table WHERE title LIKE ?", (f'{PREFIX} %',))
+
+
+# Function to pick the artists for the per-artist listings: the most prolific and a median one
+def sample_artists(engine):
+    with engine.connect() as conn:
+        counts = conn.exec_driver_sql(
+            "SELECT a.title, count(*) FROM songs_table s JOIN artist_table a ON a.id = s.artist_id "
+            "GROUP BY s.artist_id ORDER BY count(*) DESC, a.title"
+        ).all()
+    return counts[0], counts[len(counts) // 2]
+
+
+def build_cases(engine, runs, list_runs):
+    (top_artist, top_count), (median_artist, median_count) = sample_artists(engine)
+    fixtures = {}
+
+    def fixture_artists(key):
+        def setup(count):
+            names = [f"{PREFIX} {key} {i}" for i in range(count)]
+            _insert_artists(engine, names)
+            fixtures[key] = names
+        return setup
+
+    def fixture_songs(key):
+        def setup(count):
+            names = [f"{PREFIX} {key} {i}" for i in range(count)]
+            _insert_artists(engine, [f"{PREFIX} {key} artist"])
+            artist_id = _ids(engine, 'artist_table', [f"{PREFIX} {key} artist"])[0]
+            _insert_songs(engine, names, artist_id)
+            fixtures[key] = names
+        return setup
+
+    def fixture_ids(key, table, setup):
+        def with_ids(count):
+            setup(count)
+            fixtures[key] = [str(i) for i in _ids(engine, table, fixtures[key])]
+        return with_ids
+
+    return [
+        Case('add-artist', lambda i: ['add-artist', f'{PREFIX} new artist {i}', '--genre', 'pop'], runs),
+        Case('add-song', lambda i: ['add-song', f'{PREFIX} new song {i}', '--artist', f'{PREFIX} song owner',
+                                    '--bpm', '120', '--release-date', '2024', '--create-artist'], runs),
+        Case('update-artist', lambda i: ['update-artist', fixtures['update'][i], '--genre', 'rock'], runs,
+             fixture_artists('update')),
+        Case('delete-artist (name)', lambda i: ['delete-artist', fixtures['delete artist'][i]], runs,
+             fixture_artists('delete artist')),
+        Case('delete-artist (id)', lambda i: ['delete-artist', fixtures['delete artist id'][i]], runs,
+             fixture_ids('delete artist id', 'artist_table', fixture_artists('delete artist id'))),
+        Case('delete-song (title)', lambda i: ['delete-song', fixtures['delete song'][i]], runs,
+             fixture_songs('delete song')),
+        Case('delete-song (id)', lambda i: ['delete-song', fixtures['delete song id'][i]], runs,
+             fixture_ids('delete song id', 'songs_table', fixture_songs('delete song id'))),
+        Case('list artists', lambda i: ['list', 'artists'], list_runs),
+        Case('list songs', lambda i: ['list', 'songs'], list_runs),
+        Case('list songs by bpm', lambda i: ['list', 'songs', '--sort', 'bpm'], list_runs),
+        Case('list songs of top artist', lambda i: ['list', 'songs', '--artist', top_artist], runs,
+             note=f' ({top_count})'),
+        Case('list songs of median artist', lambda i: ['list', 'songs', '--artist', median_artist], runs,
+             note=f' ({median_count})'),
+        Case('bpm', lambda i: ['bpm', str(90 + i % 60)], runs),
+        Case('search', lambda i: ['search', 'midnight star'], runs),
+    ]
+
+
+# Function to time every case against the catalog the models module is connected to
+def bench_catalog(runs, list_runs, only=None):
+    import cli
+    import models
+
+    models.init_db()
+    cleanup(models.engine)
+    results = {}
+    with open(os.devnull, 'w') as devnull:
+        try:
+            for case in build_cases(models.engine, runs, list_runs):
+                if only and not any(word in case.name for word in only):
+                    continue
+                if case.setup:
+                    case.setup(case.runs + 1)
+                run_command(cli, case.argv(0), devnull)  # warm-up, not counted
+                timings = [run_command(cli, case.argv(i), devnull) for i in range(1, case.runs + 1)]
+                results[case.name] = summarise(timings)
+                print(f"  {case.name + case.note:44} p50 {results[case.name]['p50_ms']:9.2f} ms  p95 {results[case.name]['p95_ms']:9.2f} ms",
+                      file=sys.stderr)
+        finally:
+            models.session.rollback()
+            cleanup(models.engine)
+    return results
+
+
+# Function to compare results with a baseline; returns a list of (size, operation, baseline p50, p50)
+def regressions(results, baseline, tolerance, min_delta_ms):
+    slower = []
+    for size, operations in results['catalogs'].items():
+        for name, timing in operations.items():
+            before = baseline.get('catalogs', {}).get(size, {}).get(name)
+            if before is None:
+                continue
+            limit = max(before['p50_ms'] * (1 + tolerance), before['p50_ms'] + min_delta_ms)
+            if timing['p50_ms'] > limit:
+                slower.append((size, name, before['p50_ms'], timing['p50_ms']))
+    return slower
+
+
+# Function to benchmark one catalog in a child process and return its results
+def run_in_subprocess(path, runs, list_runs, only):
+    import subprocess
+
+    env = dict(os.environ, SOUNDPLAY_DATABASE_URL=f'sqlite:///{path}')
+    command = [sys.executable, os.path.abspath(__file__), '--worker', str(runs), str(list_runs), ','.join(only or [])]
+    output = subprocess.run(command, env=env, check=True, stdout=subprocess.PIPE, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark every SOUNDPLAY command on generated catalogs')
+    parser.add_argument('--sizes', default=','.join(str(size) for size in DEFAULT_SIZES),
+                        help='Comma-separated catalog sizes in songs (default: 10000,100000,1000000)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--runs', type=int, default=50, help='Timed runs of each single-row command (default: 50)')
+    parser.add_argument('--list-runs', type=int, default=5, help='Timed runs of each full listing (default: 5)')
+    parser.add_argument('--only', help='Comma-separated words; only benchmark operations whose name contains one')
+    parser.add_argument('--catalog-dir', default=BENCH_DIR, help='Where generated catalogs are cached')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='JSON results file')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed p50 slowdown against the baseline as a fraction (default: 0.25)')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='Ignore slowdowns smaller than this, which are mostly noise (default: 1)')
+    args = parser.parse_args()
+    if args.runs < 2 or args.list_runs < 1:
+        parser.error('--runs must be at least 2 and --list-runs at least 1')
+
+    sizes = [int(size) for size in args.sizes.split(',')]
+    only = args.only.split(',') if args.only else None
+    results = {
+        'meta': {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'seed': args.seed,
+            'runs': args.runs,
+            'list_runs': args.list_runs,
+        },
+        'catalogs': {},
+    }
+
+    # Each catalog is benchmarked in a fresh process, because models binds its engine to
+    # SOUNDPLAY_DATABASE_URL when it is first imported
+    for size in sizes:
+        path = catalog_path(args.catalog_dir, size, args.seed)
+        print(f"{size:,} songs ({path})", file=sys.stderr)
+        results['catalogs'][str(size)] = run_in_subprocess(path, args.runs, args.list_runs, only)
+
+    with open(args.output, 'w') as handle:
+        json.dump(results, handle, indent=2)
+    print(f"Results written to {args.output}", file=sys.stderr)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as handle:
+            json.dump(results, handle, indent=2)
+        print(f"Baseline saved to {args.baseline}", file=sys.stderr)
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one", file=sys.stderr)
+        return 0
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+    slower = regressions(results, baseline, args.tolerance, args.min_delta_ms)
+    for size, name, before, after in slower:
+        print(f"REGRESSION {int(size):,} songs, {name}: p50 {before:.2f} ms -> {after:.2f} ms", file=sys.stderr)
+    if slower:
+        return 1
+    print("No regressions against the baseline.", file=sys.stderr)
+    return 0
+
+
+def worker(runs, list_runs, only):
+    results = bench_catalog(int(runs), int(list_runs), only.split(',') if only else None)
+    json.dump(results, sys.stdout)
+    return 0
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--worker']:
+        sys.exit(worker(*sys.argv[2:5]))
+    sys.exit(main())
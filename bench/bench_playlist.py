@@ -0,0 +1,65 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from generate import GENRES, generate
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark building playlists')
+    # The same catalog as bench_tempo.py, so it is only generated once
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tempo_1m.db'))
+    parser.add_argument('--songs', type=int, default=1_000_000)
+    parser.add_argument('--artists', type=int, default=20_000)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--budget-ms', type=float, default=200.0, help='Fail if p95 time for a 100-track set is above this')
+    args = parser.parse_args()
+
+    os.environ['SOUNDPLAY_DATABASE_URL'] = f'sqlite:///{args.db}'
+    import models
+    from playlist import build_playlist
+
+    models.init_db()
+    if models.session.query(models.Song.id).first() is None:
+        print(f"Generating {args.songs} songs in {args.db} ...")
+        generate(models.engine, args.songs, args.artists, args.seed)
+
+    rng = random.Random(args.seed)
+    cases = [
+        ('120 to 128', lambda: build_playlist(120, 128, seed=rng.random())),
+        ('100 to 130', lambda: build_playlist(100, 130, seed=rng.random())),
+        ('100 to 140', lambda: build_playlist(100, 140, seed=rng.random())),
+        ('130 to 100', lambda: build_playlist(130, 100, seed=rng.random())),
+        ('with genre', lambda: build_playlist(110, 130, genres=[rng.choice(GENRES)], seed=rng.random())),
+    ]
+
+    failed = False
+    for name, case in cases:
+        case()  # warm the page cache
+        timings = []
+        songs = 0
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            try:
+                songs = case().candidates
+            except ValueError:
+                continue  # a genre with too few songs in the range; nothing to time
+            timings.append((time.perf_counter() - start) * 1000)
+        if not timings:
+            continue
+        timings.sort()
+        p50 = statistics.median(timings)
+        p95 = timings[max(int(len(timings) * 0.95) - 1, 0)]
+        print(f"{name:12} p50 {p50:6.1f} ms  p95 {p95:6.1f} ms  max {timings[-1]:6.1f} ms  ({songs:,} songs read)")
+        failed = failed or p95 > args.budget_ms
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
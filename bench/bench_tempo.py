@@ -0,0 +1,61 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from generate import GENRES, generate
+
+
+def timed(function, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark tempo-compatibility queries')
+    parser.add_argument('--db', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tempo_1m.db'))
+    parser.add_argument('--songs', type=int, default=1_000_000)
+    parser.add_argument('--artists', type=int, default=20_000)
+    parser.add_argument('--runs', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--budget-ms', type=float, default=10.0, help='Fail if p95 latency is above this')
+    args = parser.parse_args()
+
+    os.environ['SOUNDPLAY_DATABASE_URL'] = f'sqlite:///{args.db}'
+    import models
+    from tempo import find_compatible
+
+    models.init_db()
+    if models.session.query(models.Song.id).first() is None:
+        print(f"Generating {args.songs} songs in {args.db} ...")
+        generate(models.engine, args.songs, args.artists, args.seed)
+
+    rng = random.Random(args.seed)
+    cases = [
+        ('target only', lambda: find_compatible(rng.uniform(70, 180), tolerance=3, limit=50)),
+        ('with genre', lambda: find_compatible(rng.uniform(70, 180), tolerance=3, genre=rng.choice(GENRES), limit=50)),
+        ('offset 200', lambda: find_compatible(rng.uniform(70, 180), tolerance=3, limit=50, offset=200)),
+        ('exact only', lambda: find_compatible(rng.uniform(70, 180), tolerance=3, limit=50, half_double=False)),
+    ]
+
+    failed = False
+    for name, case in cases:
+        timed(case, 5)  # warm the page cache
+        timings = sorted(timed(case, args.runs))
+        p50 = statistics.median(timings)
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"{name:12} p50 {p50:6.2f} ms  p95 {p95:6.2f} ms  max {timings[-1]:6.2f} ms")
+        failed = failed or p95 > args.budget_ms
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
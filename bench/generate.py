@@ -0,0 +1,156 @@
+import argparse
+import os
+import random
+import sys
+import time
+from itertools import accumulate
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+# Deterministic synthetic catalogs for the benchmarks. The same seed and sizes always give
+# the same database. The data is skewed like a real catalog:
+#  - artist popularity follows a Zipf curve, so a few artists have thousands of songs and most
+#    have a handful
+#  - titles are drawn from a small vocabulary, so many songs share a title with other artists'
+#    songs (and sometimes with the same artist's, like remasters and live versions)
+#  - about 10% of songs have no BPM, release dates come in several formats or are missing,
+#    and some artists have no genre
+
+GENRES = ['house', 'techno', 'hip hop', 'pop', 'afrobeat', 'drum and bass', 'disco', 'rock',
+          'Pop. Afrobeat', 'R&B', 'jazz', 'ambient']
+
+WORDS = ['love', 'night', 'fire', 'dance', 'heart', 'summer', 'city', 'dream', 'gold', 'light',
+         'rain', 'river', 'star', 'midnight', 'electric', 'blue', 'wild', 'home', 'shadow', 'road',
+         'paradise', 'rhythm', 'echo', 'ocean', 'neon', 'velvet', 'storm', 'sugar', 'thunder', 'time',
+         'forever', 'golden', 'silver', 'sunset', 'highway', 'crystal', 'island', 'magic', 'desert', 'moon']
+
+SUFFIXES = ['', '', '', '', '', ' (Remix)', ' (Live)', ' (Remastered)', ' Pt. 2', ' (Radio Edit)']
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+INSERT_BATCH = 50_000
+
+# Larger means more skew; with 1.1 the top 1% of artists have 30-70% of all songs, depending on size
+ZIPF_EXPONENT = 1.1
+
+
+# Function to pick the default number of artists for a catalog size (about 50 songs per artist)
+def default_artists(songs):
+    return max(10, songs // 50)
+
+
+def _artist_names(rng, count):
+    names = []
+    seen = set()
+    for i in range(1, count + 1):
+        name = f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}"
+        if name in seen:
+            name = f"{name} {i}"
+        seen.add(name)
+        names.append(name)
+    return names
+
+
+def _release_date(rng):
+    roll = rng.random()
+    year = rng.randint(1960, 2024)
+    if roll < 0.05:
+        return None
+    if roll < 0.55:
+        return str(year)
+    if roll < 0.9:
+        return f"{year}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+    return f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{year}"
+
+
+def _bpm(rng):
+    if rng.random() < 0.1:
+        return None
+    # Most music sits around 120; drum and bass and half-time hip hop add smaller peaks
+    centre = rng.choices((120, 174, 85), weights=(8, 1, 1))[0]
+    return max(40, min(260, int(rng.gauss(centre, 18))))
+
+
+# Function to fill an empty database with a synthetic catalog; returns (songs, artists)
+def generate(engine, songs, artists=None, seed=42):
+    rng = random.Random(seed)
+    artists = artists or default_artists(songs)
+    # Popularity of the artist with rank r is proportional to 1 / r^ZIPF_EXPONENT, with the
+    # ranks shuffled so the prolific artists are not simply the lowest IDs
+    ranks = list(range(1, artists + 1))
+    rng.shuffle(ranks)
+    cum_weights = list(accumulate(1 / rank ** ZIPF_EXPONENT for rank in ranks))
+    artist_ids = range(1, artists + 1)
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            "INSERT INTO artist_table (id, title, genre) VALUES (?, ?, ?)",
+            [
+                (i, name, None if rng.random() < 0.05 else rng.choice(GENRES))
+                for i, name in enumerate(_artist_names(rng, artists), start=1)
+            ],
+        )
+        for start in range(1, songs + 1, INSERT_BATCH):
+            count = min(INSERT_BATCH, songs + 1 - start)
+            owners = rng.choices(artist_ids, cum_weights=cum_weights, k=count)
+            conn.exec_driver_sql(
+                "INSERT INTO songs_table (id, title, release_date, bpm, artist_id) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (
+                        song_id,
+                        f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()}{rng.choice(SUFFIXES)}",
+                        _release_date(rng),
+                        _bpm(rng),
+                        owner,
+                    )
+                    for song_id, owner in zip(range(start, start + count), owners)
+                ],
+            )
+    return songs, artists
+
+
+# Function to return the path of the cached benchmark database for a catalog size, generating it if needed
+def catalog_path(directory, songs, seed=42):
+    path = os.path.join(directory, f"catalog_{songs}_{seed}.db")
+    if os.path.exists(path):
+        return path
+
+    from sqlalchemy import create_engine
+    from models import init_db
+
+    partial = path[:-len('.db')] + '.partial.db'
+    if os.path.exists(partial):
+        os.remove(partial)
+    engine = create_engine(f'sqlite:///{partial}')
+    init_db(engine)
+    started = time.perf_counter()
+    generate(engine, songs, seed=seed)
+    engine.dispose()
+    os.replace(partial, path)
+    print(f"Generated {songs:,} songs in {path} ({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+    return path
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate a synthetic SOUNDPLAY catalog')
+    parser.add_argument('db', help='Database file to create (must not exist)')
+    parser.add_argument('--songs', type=int, default=100_000)
+    parser.add_argument('--artists', type=int, help='Number of artists (default: songs / 50)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if os.path.exists(args.db):
+        parser.error(f"{args.db} already exists")
+
+    from sqlalchemy import create_engine
+    from models import init_db
+
+    engine = create_engine(f'sqlite:///{args.db}')
+    init_db(engine)
+    started = time.perf_counter()
+    songs, artists = generate(engine, args.songs, args.artists, args.seed)
+    print(f"Generated {songs:,} songs by {artists:,} artists in {time.perf_counter() - started:.1f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
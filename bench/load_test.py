@@ -0,0 +1,144 @@
+import argparse
+import asyncio
+import math
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from collections import Counter
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CLI = os.path.join(BENCH_DIR, '..', 'lib', 'cli.py')
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'lib'))
+
+# Load test of `cli.py serve`. Keep-alive client connections send GET requests back to back for a
+# fixed time, and the requests/sec and latency percentiles are printed at the end:
+#
+#   python bench/load_test.py --songs 100000 --concurrency 32 --seconds 10
+#
+# By default the script starts its own server on a generated catalog (see generate.py) on a free
+# port; --port points it at a server that is already running instead. Each request takes the next
+# path of the mix in turn, with {song}, {artist} and {bpm} replaced by random values. With
+# --conditional each connection sends back the ETag it last got for a path, as a caching client
+# would, so unchanged pages come back as 304s.
+
+DEFAULT_PATHS = (
+    '/artists?limit=50',
+    '/songs?limit=50',
+    '/songs?sort=bpm&limit=50',
+    '/songs/{song}',
+    '/artists/{artist}/songs?limit=20',
+    '/tempo?bpm={bpm}&limit=20',
+)
+
+
+def _percentile(ordered, fraction):
+    return ordered[max(0, math.ceil(len(ordered) * fraction) - 1)] if ordered else 0.0
+
+
+async def client(number, host, port, paths, args, deadline, latencies, statuses):
+    rng = random.Random(number)
+    etags = {}
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        turn = number
+        while time.perf_counter() < deadline:
+            template = paths[turn % len(paths)]
+            turn += 1
+            path = template.format(
+                song=rng.randint(1, args.songs), artist=rng.randint(1, args.artists), bpm=rng.randint(80, 170),
+            )
+            head = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+            if args.conditional and path in etags:
+                head += f"If-None-Match: {etags[path]}\r\n"
+            started = time.perf_counter()
+            writer.write((head + "\r\n").encode())
+            response = await reader.readuntil(b'\r\n\r\n')
+            lines = response.decode('latin-1').split('\r\n')
+            headers = dict(line.split(': ', 1) for line in lines[1:] if ': ' in line)
+            await reader.readexactly(int(headers.get('Content-Length', 0)))
+            latencies.append(time.perf_counter() - started)
+            status = int(lines[0].split(' ')[1])
+            statuses[status] += 1
+            if 'ETag' in headers:
+                etags[path] = headers['ETag']
+    finally:
+        writer.close()
+
+
+async def run_load(host, port, paths, args):
+    latencies = []
+    statuses = Counter()
+    started = time.perf_counter()
+    deadline = started + args.seconds
+    await asyncio.gather(*(
+        client(number, host, port, paths, args, deadline, latencies, statuses) for number in range(args.concurrency)
+    ))
+    return latencies, statuses, time.perf_counter() - started
+
+
+# Function to start `cli.py serve` on a free port; returns (process, port)
+def start_server(path, workers):
+    process = subprocess.Popen(
+        [sys.executable, CLI, '--db', path, 'serve', '--port', '0', '--workers', str(workers)],
+        stderr=subprocess.PIPE, text=True,
+    )
+    for line in process.stderr:
+        match = re.search(r'http://[^:]+:(\d+)', line)
+        if match:
+            return process, int(match.group(1))
+    raise RuntimeError(f"Server exited with code {process.wait()}")
+
+
+def print_report(latencies, statuses, elapsed, args):
+    ordered = sorted(latencies)
+    print(f"{len(ordered):,} requests in {elapsed:.1f}s over {args.concurrency} connections: "
+          f"{len(ordered) / elapsed:,.0f} requests/sec")
+    print("latency ms: " + ', '.join(
+        f"{label} {_percentile(ordered, fraction) * 1000:.2f}"
+        for label, fraction in (('p50', 0.50), ('p90', 0.90), ('p99', 0.99), ('max', 1.0))
+    ))
+    print("status: " + ', '.join(f"{status} x{count:,}" for status, count in sorted(statuses.items())))
+    return _percentile(ordered, 0.99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Requests/sec and latency of the serve command over keep-alive connections')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, help='Port of a running server (default: start one on a generated catalog)')
+    parser.add_argument('--songs', type=int, default=100_000, help='Catalog size, and the range of random song IDs')
+    parser.add_argument('--artists', type=int, help='Range of random artist IDs (default: songs / 50)')
+    parser.add_argument('--workers', type=int, default=4, help='Database workers of the started server (default: 4)')
+    parser.add_argument('--concurrency', type=int, default=32, help='Client connections (default: 32)')
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--path', action='append', help='Path to request (repeatable; default: a mix of every list endpoint)')
+    parser.add_argument('--conditional', action='store_true', help='Revalidate with If-None-Match like a caching client')
+    parser.add_argument('--p99-budget-ms', type=float, help='Fail if p99 latency is above this')
+    args = parser.parse_args()
+    args.artists = args.artists or max(1, args.songs // 50)
+
+    process = None
+    port = args.port
+    if port is None:
+        from generate import catalog_path
+        process, port = start_server(catalog_path(BENCH_DIR, args.songs), args.workers)
+    try:
+        latencies, statuses, elapsed = asyncio.run(run_load(args.host, port, args.path or DEFAULT_PATHS, args))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    p99 = print_report(latencies, statuses, elapsed, args)
+    if any(status >= 500 for status in statuses):
+        return 1
+    if args.p99_budget_ms is not None and p99 > args.p99_budget_ms:
+        print(f"p99 latency {p99:.2f} ms is above the budget of {args.p99_budget_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
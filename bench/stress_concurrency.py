@@ -0,0 +1,186 @@
+import argparse
+import math
+import multiprocessing
+import os
+import queue
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import time
+
+from sqlalchemy.exc import OperationalError
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'lib'))
+
+from generate import WORDS, catalog_path
+
+# Multi-process stress test of concurrent access. Reader processes run the menu's read
+# operations (artist lookup, a keyset page of songs, tempo match, search) in a loop while
+# writer processes insert songs in batches, each batch in one transaction, all against a
+# copy of a generated catalog. Each journal mode is run in turn:
+#
+#   python bench/stress_concurrency.py --songs 100000 --readers 4 --writers 1 --seconds 10
+#
+# Readers run with a busy timeout of 0, so any time a writer blocks a reader shows up as a
+# "database is locked" error instead of a hidden wait. With WAL, readers read the last committed
+# state while a writer works and never get one. With the rollback journal ("delete"), a
+# commit locks readers out of the whole file, so they do. Writers keep the normal busy timeout
+# and wait for each other. Exits with an error if a reader was blocked in WAL mode.
+
+
+def _percentile(ordered, fraction):
+    return ordered[max(0, math.ceil(len(ordered) * fraction) - 1)] if ordered else 0.0
+
+
+def reader(number, deadline, start, results):
+    # Fail instead of waiting whenever a writer blocks this reader
+    os.environ['SOUNDPLAY_BUSY_TIMEOUT'] = '0'
+    import models
+    import operations
+    import search
+    import tempo
+    from models import session_scope, Song
+    from pagination import KeysetPager
+
+    rng = random.Random(number)
+    with models.engine.connect() as conn:
+        artists = [row[0] for row in conn.exec_driver_sql("SELECT title FROM artist_table LIMIT 1000")]
+    reads = [
+        lambda: operations.find_artist(rng.choice(artists)),
+        lambda: KeysetPager(models.session.query(Song.id, Song.title), Song.title, Song.id, 20).seek(rng.choice(WORDS).title()),
+        lambda: tempo.find_compatible(rng.uniform(80, 170), limit=20),
+        lambda: search.search_songs(rng.choice(WORDS), limit=20),
+    ]
+    latencies = []
+    errors = 0
+    start.wait()
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            with session_scope():
+                rng.choice(reads)()
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append((time.perf_counter() - started) * 1000)
+    results.put(('reader', latencies, errors, 0))
+
+
+def writer(number, deadline, start, results, batch):
+    import models
+    from sqlalchemy import insert
+    from models import Song
+
+    rng = random.Random(1000 + number)
+    with models.engine.connect() as conn:
+        artist_ids = [row[0] for row in conn.exec_driver_sql("SELECT id FROM artist_table")]
+    latencies = []
+    errors = 0
+    rows = 0
+    start.wait()
+    while time.time() < deadline:
+        songs = [
+            {'title': f"Stress {number} {rng.choice(WORDS)} {rng.random():.6f}", 'release_date': '2024',
+             'bpm': rng.randint(60, 180), 'artist_id': rng.choice(artist_ids)}
+            for _ in range(batch)
+        ]
+        started = time.perf_counter()
+        try:
+            with models.engine.begin() as conn:
+                conn.execute(insert(Song.__table__), songs)
+        except OperationalError:
+            errors += 1
+            continue
+        rows += batch
+        latencies.append((time.perf_counter() - started) * 1000)
+    results.put(('writer', latencies, errors, rows))
+
+
+# Function to run every worker process (latencies and ops/sec count successful operations only) against path with the given journal mode; returns a report dict
+def run_mode(path, journal_mode, readers, writers, seconds, batch):
+    # Spawned processes start from scratch and read these when they import models
+    os.environ['SOUNDPLAY_DATABASE_URL'] = f'sqlite:///{path}'
+    os.environ['SOUNDPLAY_SQLITE_PRAGMAS'] = f'journal_mode={journal_mode}'
+    context = multiprocessing.get_context('spawn')
+    start = context.Event()
+    results = context.Queue()
+    # Leave the workers a few seconds to import SQLAlchemy before the clock starts
+    deadline = time.time() + seconds + 5
+    processes = [context.Process(target=reader, args=(i, deadline, start, results)) for i in range(readers)]
+    processes += [context.Process(target=writer, args=(i, deadline, start, results, batch)) for i in range(writers)]
+    for process in processes:
+        process.start()
+    time.sleep(deadline - seconds - time.time())
+    start.set()
+    try:
+        reports = [results.get(timeout=seconds + 60) for _ in processes]
+    except queue.Empty:
+        raise RuntimeError("A worker process did not report back; see its traceback above") from None
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+    report = {'mode': journal_mode, 'seconds': seconds}
+    for kind in ('reader', 'writer'):
+        latencies = sorted(latency for role, timings, _, _ in reports if role == kind for latency in timings)
+        report[kind] = {
+            'operations': len(latencies),
+            'per_sec': len(latencies) / seconds,
+            'errors': sum(errors for role, _, errors, _ in reports if role == kind),
+            'rows': sum(rows for role, _, _, rows in reports if role == kind),
+            'p50_ms': statistics.median(latencies) if latencies else 0.0,
+            'p99_ms': _percentile(latencies, 0.99),
+            'max_ms': latencies[-1] if latencies else 0.0,
+        }
+    return report
+
+
+def print_report(report):
+    print(f"journal_mode={report['mode']}")
+    for kind in ('reader', 'writer'):
+        stats = report[kind]
+        extra = f" ({stats['rows'] / report['seconds']:,.0f} rows/sec)" if kind == 'writer' else ''
+        label = 'blocked' if kind == 'reader' else 'failed'
+        print(
+            f"  {kind}s: {stats['per_sec']:7,.0f} ops/sec{extra}, p50 {stats['p50_ms']:7.2f} ms, "
+            f"p99 {stats['p99_ms']:7.2f} ms, max {stats['max_ms']:8.2f} ms, {stats['errors']} {label}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Concurrent readers and writers against one SQLite catalog')
+    parser.add_argument('--songs', type=int, default=100_000, help='Catalog size (default: 100000)')
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--writers', type=int, default=1)
+    parser.add_argument('--seconds', type=float, default=10.0)
+    parser.add_argument('--batch', type=int, default=500, help='Songs inserted per write transaction (default: 500)')
+    parser.add_argument('--modes', default='wal,delete', help='Journal modes to compare (default: wal,delete)')
+    parser.add_argument('--catalog-dir', default=BENCH_DIR, help='Where generated catalogs are cached')
+    args = parser.parse_args()
+
+    catalog = catalog_path(args.catalog_dir, args.songs)
+    failed = False
+    for mode in args.modes.split(','):
+        # Writers change the catalog, so every mode starts from a fresh copy of it
+        path = os.path.join(args.catalog_dir, f"stress_{mode}.db")
+        for suffix in ('', '-wal', '-shm', '-journal'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+        shutil.copyfile(catalog, path)
+        # Switched once up front; new connections only check it
+        with sqlite3.connect(path) as conn:
+            conn.execute(f"PRAGMA journal_mode = {mode}")
+        report = run_mode(path, mode, args.readers, args.writers, args.seconds, args.batch)
+        print_report(report)
+        if mode == 'wal':
+            failed = report['reader']['errors'] > 0
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
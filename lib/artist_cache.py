@@ -0,0 +1,86 @@
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import select
+
+from models import session, Artist
+
+# In-process, size-bounded LRU cache of artist title -> (id, genre), filled as names are
+# looked up. Every path that resolves an artist by name goes through it, so once an artist
+# is known, adding songs for it costs no artist SELECT. The paths that rename, regenre or
+# delete artists update or drop their entries after committing.
+#
+# Names that are not found are not cached, so an artist created by another process is seen
+# on the next lookup. A rename or delete done by another process while this one is running
+# is not, so long-running processes should only hold the entries they need (see maxsize).
+
+CachedArtist = namedtuple('CachedArtist', 'id genre')
+
+# Number of artists kept; SOUNDPLAY_ARTIST_CACHE_SIZE overrides it
+DEFAULT_SIZE = 4096
+
+
+class ArtistCache:
+    def __init__(self, maxsize=DEFAULT_SIZE):
+        if maxsize < 1:
+            raise ValueError("Artist cache size must be at least 1")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        # The serve command resolves names from several worker threads
+        self._lock = threading.Lock()
+
+    # Function to return the cached entry for title (counting a hit or miss), without touching the database
+    def peek(self, title):
+        with self._lock:
+            entry = self._entries.get(title)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(title)
+            self.hits += 1
+            return entry
+
+    # Function to return (id, genre) for title, reading it from the database on a miss; None if there is no such artist
+    def get(self, title):
+        entry = self.peek(title)
+        if entry is not None:
+            return entry
+        row = session.execute(select(Artist.id, Artist.genre).where(Artist.title == title)).first()
+        if row is None:
+            return None
+        return self.put(title, row.id, row.genre)
+
+    def put(self, title, artist_id, genre):
+        entry = CachedArtist(artist_id, genre)
+        with self._lock:
+            self._entries[title] = entry
+            self._entries.move_to_end(title)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return entry
+
+    def discard(self, title):
+        with self._lock:
+            self._entries.pop(title, None)
+
+    # Function to drop every entry, for changes that touch many artists at once
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+            }
+
+
+cache = ArtistCache(int(os.environ.get('SOUNDPLAY_ARTIST_CACHE_SIZE', DEFAULT_SIZE)))
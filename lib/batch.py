@@ -0,0 +1,179 @@
+import sys
+from collections import namedtuple
+
+from sqlalchemy import MetaData, Table, Column, Integer, select, update, delete, insert, func, and_
+
+from models import engine, Artist, Song
+from artist_cache import cache as artist_cache
+
+# `cli.py delete-songs`, `update-songs` and `delete-artists`: change many rows at once.
+#
+# The rows are chosen by a filter (artist, genre, BPM range, a file of IDs) that becomes the
+# WHERE clause of a single UPDATE or DELETE, run in one transaction, so retiring 5,000 songs is
+# one statement rather than 5,000 lookups and deletes. An ID list is first loaded into a
+# temporary table and joined in the same way. With dry_run the same WHERE clause is only counted.
+#
+# Related rows are cleaned up by the database: deleting an artist deletes their songs (the
+# songs' foreign key is ON DELETE CASCADE), and a deleted song's scanned files are unlinked
+# from it (ON DELETE SET NULL), as are its full-text search entries by trigger. See models.py.
+
+# Songs to change; None (or False) leaves a filter out, and the filters that are set must all match
+SongFilter = namedtuple('SongFilter', 'artist genre bpm_min bpm_max ids no_artist', defaults=(None,) * 5 + (False,))
+
+BATCH_IDS = Table(
+    'batch_ids', MetaData(),
+    Column('id', Integer, primary_key=True),
+    prefixes=['TEMPORARY'],
+)
+
+
+# Function to read IDs from a file (or stdin for '-'): whitespace or comma separated, '#' starts a comment
+def read_ids(path):
+    ids = set()
+    handle = sys.stdin if path == '-' else open(path, encoding='utf-8')
+    try:
+        for number, line in enumerate(handle, 1):
+            for token in line.split('#', 1)[0].replace(',', ' ').split():
+                if not token.isdigit():
+                    raise ValueError(f"{path}, line {number}: '{token}' is not an ID")
+                ids.add(int(token))
+    finally:
+        if handle is not sys.stdin:
+            handle.close()
+    return ids
+
+
+def _load_ids(conn, ids):
+    BATCH_IDS.create(conn)
+    if ids:
+        conn.execute(insert(BATCH_IDS), [{'id': value} for value in ids])
+
+
+def _genre_artists(genre):
+    artists = Artist.__table__
+    return select(artists.c.id).where(artists.c.genre.like(f"%{genre}%"))
+
+
+# Function to turn a SongFilter into a WHERE clause on songs_table
+def _song_condition(conn, chosen):
+    songs = Song.__table__
+    artists = Artist.__table__
+    conditions = []
+    if chosen.artist is not None:
+        artist_id = conn.execute(select(artists.c.id).where(artists.c.title == chosen.artist)).scalar()
+        if artist_id is None:
+            raise ValueError(f"Artist '{chosen.artist}' not found")
+        conditions.append(songs.c.artist_id == artist_id)
+    if chosen.genre:
+        conditions.append(songs.c.artist_id.in_(_genre_artists(chosen.genre)))
+    if chosen.bpm_min is not None:
+        conditions.append(songs.c.bpm >= chosen.bpm_min)
+    if chosen.bpm_max is not None:
+        conditions.append(songs.c.bpm <= chosen.bpm_max)
+    if chosen.no_artist:
+        conditions.append(songs.c.artist_id.is_(None))
+    if chosen.ids is not None:
+        _load_ids(conn, chosen.ids)
+        conditions.append(songs.c.id.in_(select(BATCH_IDS.c.id)))
+    if not conditions:
+        raise ValueError("Choose the songs with at least one filter")
+    return and_(*conditions)
+
+
+# Function to run body(conn, condition) in one transaction with the WHERE clause of a song filter
+def _with_songs(chosen, body, bind):
+    bind = bind if bind is not None else engine
+    with bind.begin() as conn:
+        try:
+            return body(conn, _song_condition(conn, chosen))
+        finally:
+            if chosen.ids is not None:
+                BATCH_IDS.drop(conn, checkfirst=True)
+
+
+def _count_songs(conn, condition):
+    songs = Song.__table__
+    return conn.execute(select(func.count()).select_from(songs).where(condition)).scalar()
+
+
+# Function to delete every song matching the filter; returns the number deleted (or matching, with dry_run)
+def delete_songs(chosen, dry_run=False, bind=None):
+    songs = Song.__table__
+
+    def body(conn, condition):
+        if dry_run:
+            return _count_songs(conn, condition)
+        return conn.execute(delete(songs).where(condition)).rowcount
+
+    return _with_songs(chosen, body, bind)
+
+
+# Function to set the BPM, release date and/or artist of every song matching the filter; None leaves a
+# field unchanged and clear_bpm removes the BPM. Returns the number updated (or matching, with dry_run)
+def update_songs(chosen, bpm=None, release_date=None, artist=None, clear_bpm=False, dry_run=False, bind=None):
+    songs = Song.__table__
+    artists = Artist.__table__
+    if bpm is not None and clear_bpm:
+        raise ValueError("Set the BPM or clear it, not both")
+
+    def body(conn, condition):
+        values = {}
+        if bpm is not None or clear_bpm:
+            values['bpm'] = bpm
+        if release_date is not None:
+            values['release_date'] = release_date
+        if artist is not None:
+            artist_id = conn.execute(select(artists.c.id).where(artists.c.title == artist)).scalar()
+            if artist_id is None:
+                raise ValueError(f"Artist '{artist}' not found")
+            values['artist_id'] = artist_id
+        if not values:
+            raise ValueError("Nothing to change")
+        if dry_run:
+            return _count_songs(conn, condition)
+        return conn.execute(update(songs).where(condition).values(**values)).rowcount
+
+    return _with_songs(chosen, body, bind)
+
+
+# Function to delete artists chosen by name, ID, genre and/or having no songs, and their songs with
+# them; returns (artists, songs) deleted (or matching, with dry_run)
+def delete_artists(titles=None, ids=None, genre=None, without_songs=False, dry_run=False, bind=None):
+    bind = bind if bind is not None else engine
+    songs = Song.__table__
+    artists = Artist.__table__
+
+    with bind.begin() as conn:
+        # Without enforcement the songs would be left behind pointing at nothing
+        if not conn.exec_driver_sql("PRAGMA foreign_keys").scalar():
+            raise ValueError("Deleting artists needs foreign key enforcement, but PRAGMA foreign_keys is off")
+        try:
+            conditions = []
+            if titles:
+                conditions.append(artists.c.title.in_(titles))
+            if ids is not None:
+                _load_ids(conn, ids)
+                conditions.append(artists.c.id.in_(select(BATCH_IDS.c.id)))
+            if genre:
+                conditions.append(artists.c.id.in_(_genre_artists(genre)))
+            if without_songs:
+                conditions.append(~select(songs.c.id).where(songs.c.artist_id == artists.c.id).exists())
+            if not conditions:
+                raise ValueError("Choose the artists with at least one filter")
+            condition = and_(*conditions)
+
+            # Counted in the same transaction, so it is exactly what the cascade deletes
+            song_count = conn.execute(
+                select(func.count()).select_from(songs).where(songs.c.artist_id.in_(select(artists.c.id).where(condition)))
+            ).scalar()
+            if dry_run:
+                artist_count = conn.execute(select(func.count()).select_from(artists).where(condition)).scalar()
+                return artist_count, song_count
+            artist_count = conn.execute(delete(artists).where(condition)).rowcount
+        finally:
+            if ids is not None:
+                BATCH_IDS.drop(conn, checkfirst=True)
+
+    # Names of deleted artists must not resolve any more
+    artist_cache.clear()
+    return artist_count, song_count
@@ -1,421 +1,672 @@
-import inquirer
-from sqlalchemy import create_engine, Column, Integer, String, Text, ForeignKey
-from sqlalchemy.orm import sessionmaker, relationship
-from sqlalchemy.orm import declarative_base
-from termcolor import colored
-import pyfiglet
-
-#Create the database engine and session
-DATABASE_URL = 'sqlite:///songdatabase.db'
-engine = create_engine(DATABASE_URL)
-Session = sessionmaker(bind=engine)
-session = Session()  #Create a session instance
-
-#Create the base class for declarative models
-Base = declarative_base()
-
-#Define the Artist and Song classes
-class Artist(Base):
-    __tablename__ = 'artist_table'
-    id = Column(Integer, primary_key=True)
-    title = Column(String, unique=True, nullable=False)
-    genre = Column(String)
-    songs = relationship('Song' ,backref='artist')
-
-class Song(Base):
-    __tablename__ = 'songs_table'
-    id = Column(Integer, primary_key=True)
-    title = Column(String, nullable=False)
-    release_date = Column(Text)
-    bpm = Column(Integer)
-    artist_id = Column(Integer, ForeignKey('artist_table.id'))
-
-#Create the tables if they don't exist
-Base.metadata.create_all(engine)
-
-#Function to find or create an artist
-def find_or_create_artist(title, genre):
-    artist = session.query(Artist).filter(Artist.title == title).first()
+import os
+import re
+import sys
+import argparse
 
-    if artist is None:
-        artist = Artist(title=title, genre=genre)
-        session.add(artist)
-        session.commit()
-        print(colored(f"Artist '{title}' added with ID {artist.id}", "green"))
-    else:
-        print(colored(f"Artist '{title}' already exists with ID {artist.id}", "red"))
+# Only the standard library is imported here. SQLAlchemy and the menu's UI libraries
+# (inquirer, pyfiglet, termcolor) are imported inside the commands that need them,
+# so `--help` and one-shot commands start without paying for them.
 
-    return artist
 
-#Function to create an artist
-def create_artist():
-    title = input(colored('Artist Name: ', "green"))
-    genre = input(colored('Genre: ', "green"))
+def error(message):
+    print(message, file=sys.stderr)
+    return 1
 
-    find_or_create_artist(title, genre)
 
-#Function to find or create a song
-def find_or_create_song(title, artist_name, release_date, bpm):
-    artist = session.query(Artist).filter(Artist.title == artist_name).first()
+def format_row(values):
+    return '\t'.join('' if value is None else str(value) for value in values)
 
-    if artist is None:
-        print(colored(f"Artist '{artist_name}' not found. Song not created", "red"))
-        return
-    song = session.query(Song).filter(Song.title == title, Song.artist_id == artist.id).first()
 
-    if song is None:
-        song = Song(
-            title= title,
-            artist_id = artist.id,
-            release_date=release_date,
-            bpm = bpm
-        )
-        session.add(song)
-        session.commit()
-        print(colored(f"Song '{title}' added with ID {song.id}", "green" ))
+# argparse type for --pragma; models.parse_pragmas applies the same rule
+def pragma_setting(text):
+    if not re.match(r'^[A-Za-z_]+=-?\w+$', text):
+        raise argparse.ArgumentTypeError(f"invalid PRAGMA setting '{text}' (expected name=value)")
+    return text
 
-    else:
-        print(colored(f"Song '{title}' already exists with ID {song.id}", "red"))
-
-    #Function to create a song
-def create_song():
-    artists = session.query(Artist).all()
-    artist_choices = {artist.title: artist for artist in artists}
-
-    title = input(colored('Song Title: ', 'green'))
-    artist_name = input(colored('Select Artist or enter "new" to create a new artist: ', "green"))
-
-    if artist_name.lower() == "new":
-        #Create a new artist
-        new_artist_name = input(colored('New Artist Name: ', "green"))
-        new_artist_genre = input(colored('Genre: ', "green"))
-
-        if not new_artist_name:
-            print(colored("Artist Name cannot be empty.", "red"))
-            return
-            
-        find_or_create_artist(new_artist_name, new_artist_genre)
-        artist_name = new_artist_name
-    elif artist_name not in artist_choices:
-        print(colored("Invalid Artist Name.", "red"))
-        return
- 
-    release_date = input(colored ('Release Date: ', "green"))
-    bpm = input(colored('BPM (optional): ', "green"))
-
-    if not title:
-        print(colored("Song Title cannot be empty.", "red"))
-        return 
-        
-    if not release_date:
-        print(colored("Release Date cannot be empty.", "red"))
-        
-    if not bpm:
-        bpm = None
-    elif not bpm.isdigit() or len(bpm) == 0:
-        print(colored("Invalid BPM input. BPM set to None.", "red"))
-        bpm = None
-    else:
-        bpm= int(bpm)
-        
-    find_or_create_song(title, artist_name, release_date, bpm)
-
-#Function to update an artist
-def update_artist():
-    artist_name = input(colored('Enter Artist Name to update:', "green"))
-    artist = session.query(Artist).filter(Artist.title == artist_name).first()
-
-    if artist:
-        new_title = input('New Artist Name: ')
-        new_genre = input('New Genre: ')
-        artist.title = new_title
-        artist.genre = new_genre
-        session.commit()
-        print(colored(f"Artist Name {artist_name} updated.", "green"))
-    else:
-        print(colored(f"Artist '{artist_name}' not found.", "red"))
 
+# Function to ask a yes/no question on the terminal; no answer (or no terminal) means no
+def confirm(question):
+    try:
+        answer = input(f"{question} [y/N] ")
+    except EOFError:
+        print()
+        answer = ''
+    return answer.strip().lower() in ('y', 'yes')
 
-#FUNCTION TO DELETE AN ARTIST BY NAME OR ID
-def delete_artist():
-    artist_input = input('Enter Artist Name or ID to delete:  ')
 
-    if artist_input.isdigit():
-        artist = session.query(Artist).filter(Artist.id == int(artist_input)).first()
-    else:
-        artist = session.query(Artist).filter(Artist.title == artist_input).first()
-    
-    if artist:
-        session.delete(artist)
-        session.commit()
-        print(f"Artist {artist.title} (ID; {artist.id}) deleted.")
-
-# Function to delete a song by title or ID
-def delete_song():
-    song_input = input('Enter Song Title or ID to delete: ')
-
-    #Check if the input is a digit (ID) or not (Title)
-    if song_input.isdigit():
-        song = session.query(Song).filter(Song.id == int(song_input)).first()
-    else:
-        song = session.query(Song).filter(Song.title == song_input).first()
-    
-    if song:
-        session.delete(song)
-        session.commit()
-        print(f"Song '{song.title}' (ID: {song.id}) deleted.")
+# Function to open the database for a command, bringing its schema up to date
+def open_db():
+    from models import init_db
+    from migrate import MigrationError
+
+    try:
+        init_db()
+    except MigrationError as exc:
+        sys.exit(error(f"Migration failed: {exc}"))
+
+
+def cmd_menu(args):
+    open_db()
+    import menu
+
+    if args.profile:
+        import profiler
+        profiler.ACTIVE.instrument(menu, menu.OPERATIONS)
+    menu.PAGE_SIZE = args.page_size
+    menu.COLOR = False if args.no_color else None
+    menu.main()
+    return 0
+
+
+def cmd_add_artist(args):
+    open_db()
+    from operations import get_or_create_artist
+
+    artist, created = get_or_create_artist(args.name, args.genre)
+    if created:
+        print(f"Artist '{artist.title}' added with ID {artist.id}")
     else:
-        print(colored(f"Song '{song_input}' not found.", "red"))
-
-#Function to list songs by a selected artist
-def list_songs_by_artist(artist):
-    songs = session.query(Song).filter(Song.artist_id == artist.id).all()
-    if songs:
-        print(colored(f"Songs by {artist.title}:", "green"))
-        for song in songs:
-            print(
-                colored(f"{colored('ID:', 'yellow')} {colored(song.id, 'green')}, "
-                        f"{colored('Title:', 'yellow')} {colored(song.title, 'green')}, "
-                        f"{colored('Release Date:', 'yellow')} {colored(song.release_date, 'green')}, "
-                        f"{colored('BPM:', 'yellow')} {colored(song.bpm, 'green')} ", 
-                        "green")
-            )
+        print(f"Artist '{artist.title}' already exists with ID {artist.id}")
+    return 0
+
+
+def cmd_add_song(args):
+    open_db()
+    from operations import find_artist_id, get_or_create_artist, get_or_create_song, parse_bpm
+
+    try:
+        bpm = parse_bpm(args.bpm)
+    except ValueError as exc:
+        return error(str(exc))
+
+    if args.create_artist:
+        artist, _ = get_or_create_artist(args.artist, args.genre)
     else:
-        print(colored(f"No songs found for {artist.title}.", "red"))
-
-# Function to list artists
-def list_artists():
-    while True:
-        artists = session.query(Artist).order_by(Artist.title).all()
-        if artists:
-            # Print a bigger "List of Artists" text
-            ascii_banner = pyfiglet.figlet_format("Artists", font = "big")
-            print(colored(ascii_banner, "red"))
-
-            artist_choices = [artist.title for artist in artists]
-            artist_choices.append("Back") #Add a "Back" option
-            # Remove the "Delete Artist by ID" option
-            artist_name = inquirer.prompt([
-                inquirer.List('artist_name',
-                            message = colored("Select an artist:", "green"),
-                            choices = artist_choices
-                            )
-            ])['artist_name']
-
-            if artist_name == "Back":
-                return #Go back to the previous menu
-            else:
-                artist = session.query(Artist).filter(Artist.title == artist_name).first()
-                if artist:
-                    #Display artist.id, artist.title, and artist.genre in green and "Id:", "Name:", "Genre:" in green
-                    print(
-                        f"{colored('Id:', 'yellow')} {colored(artist.id, 'green')}, "
-                        f"{colored('Name:', 'yellow')} {colored(artist.title, 'green')}, "
-                        f"{colored('Genre:', 'yellow')} {colored(artist.genre, 'green')}"
-                    )
-
-                    # Option to list songs for the selected artist
-                    list_songs_option = input(colored("List songs for this artist? (y/n): ", "green"))
-                    if list_songs_option.lower() == "y":
-                        list_songs_by_artist(artist)
-                else:
-                    print(colored(f"Artist '{artist_name}' not found.", "red"))
-        else:
-            print(colored("No artists found in the database.", "red"))
-
-# Function to list songs alphabetically
-def list_songs():
-    while True:
-        songs = session.query(Song).order_by(Song.title).all()
-        if songs:
-            ascii_banner = pyfiglet.figlet_format("Songs", font="big")
-            print(colored(ascii_banner, "red"))
-            song_choices = [song.title for song in songs ]
-            song_choices.append("Back") #Add a "Back" option
-            song_title = inquirer.prompt([
-                inquirer.List('song_title',
-                              message=colored("Select a song:", "green"),
-                              choices=song_choices)
-            ])['song_title']
-
-            if song_title == "Back":
-                return #Go back to the previous menu
-            else:
-                song = song.query(Song).filter(Song.title == song_title).first()
-                if song:
-                    artist_name = song.artist.title if song.artist else "Unknown Artist"
-                    print(
-                        colored(f"{colored('ID:', 'yellow')} {colored(song.id, 'green')}, "
-                                f"{colored('Title:', 'yellow')} {colored(song.title, 'green')}, "
-                                f"{colored('Artist:', 'yellow')} {colored(artist_name, 'green')}, "
-                                f"{colored('Release Date:', 'yellow')} {colored(song.release_date, 'green')}, "
-                                f"{colored('BPM:', 'yellow')} {colored(song.bpm, 'green')}",
-                                "green")
-                    )
-                else:
-                    print(colored(f"Song '{song_title}' not found.", "red"))
-        else:
-            print(colored("No songs found in the database.", "red"))
-        
-# Function to list songs by BPM
-def list_songs_by_bpm():
-    songs = session.query(Song).order_by(Song.bpm).all()
-    if songs:
-        print(colored("List of Songs by BPM:", "green"))
-    for song in songs:
-        artist_name = song.artist.title if song.artist else "Unknown Artist"
-        bpm = song.bpm if song.bpm is not None else "N/A"
-
-    # Colorise labels and values separately with the desired order
-        formatted_output = (
-        f"{colored('BPM:', 'yellow')} {colored(bpm, 'green')}, "
-        f"{colored('Title:', 'yellow')} {colored(song.title, 'green')}, "
-        f"{colored('Artist:', 'yellow')} {colored(artist_name, 'green')}, "
-        f"{colored('Release Date:', 'yellow')} {colored(song.release_date, 'green')}, "
-        f"{colored('ID:', 'yellow')} {colored(song.id, 'green')}"
-                )
-        print(formatted_output)
+        artist = find_artist_id(args.artist)
+        if artist is None:
+            return error(f"Artist '{args.artist}' not found. Song not created")
+
+    song, created = get_or_create_song(args.title, artist.id, args.release_date, bpm)
+    if created:
+        print(f"Song '{song.title}' added with ID {song.id}")
     else:
-        print(colored("No songs found in the database.", "red"))
-
-
-# Function to manage the main menu 
-
-def main():
-    while True:
-        ascii_banner = pyfiglet.figlet_format("SOUNDPLAY")
-        print(colored(ascii_banner, "green"))
-        print(colored("Choose an operations:", "green"))
-        print(colored("1. Add Artist", "light_yellow"))
-        print(colored("2. Add Song", "light_yellow"))
-        print(colored("3. Update Artist", "light_yellow"))
-        print(colored("4. Delete Artist", "light_yellow"))
-        print(colored("5. Delete Song", "light_yellow")) #Add the option to delete a song
-        print(colored("6. Lists", "light_yellow")) #Create a submenu for listing operations
-        print(colored("7. Exit", "light_yellow")) #Update the exit option
-
-        choice = input(colored("Enter your choice (1-7): ", "green"))
-        if choice == '1' :
-            create_artist()
-            ascii_banner = pyfiglet.figlet_format("Artist is Added!! ")
-            print(colored(ascii_banner, "red"))
-        elif choice == '2' :
-            create_song()
-            ascii_banner = pyfiglet.figlet_format("Song is Added!!")
-            print(colored(ascii_banner, "red"))
-        elif choice == '3':
-            update_artist()
-        elif choice == '4':
-            delete_artist()
-        elif choice == '6':
-            list_operations() # Call the new function for listing operations
-        elif choice == '7':
-            print(r'''
-               ⣀⠀⣘⣩⣅⣤⣤⣄⣠⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠄⢈⣻⣿⣿⢷⣾⣭⣯⣯⡳⣤⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣧⠻⠿⡻⢿⠿⡾⣽⣿⣳⣧⡷⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠈⢰⡶⢈⠐⡀⠀⠀⠁⠀⠀⠀⠈⢿⡽⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢫⢅⢠⣥⣐⡀⠀⠀⠀⠀⠀⠀⢸⢳⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠠⠆⠡⠱⠒⠖⣙⠂⠈⠵⣖⡂⠄⢸⠉⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢻⠆⠀⠰⡈⢆⣑⠂⠀⠀⠀⠀⠀⠏⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢗⠀⠱⡈⢆⠙⠉⠃⠀⠀⠀⠀⠃⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠦⡡⢘⠩⠯⠒⠀⠀⠀⢀⠐⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⡄⢔⡢⢡⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠁⢆⠸⡁⠋⠃⠁⠀⢀⢠⣄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢰⡰⠌⣒⠡⠄⠀⢀⠔⠁⣸⣿⣷⣤⣀⡄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⣐⣤⡄⠀⠀⠘⢚⣒⢂⠇⣜⠒⠉⠀⢀⣿⣿⣿⣿⣿⣿⣿⣷⣶⣶⣦⣔⣀⢄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⡀⢀⢠⣤⣶⣿⣿⣿⡆⠀⠀⠐⡂⠌⠐⠝⠀⠀⠀⢀⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⣤⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⢨⣶⣿⣿⣿⣿⣿⣿⣿⣿⣤⡶⢐⡑⣊⠀⡴⢤⣀⣀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⢸⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡏⠀⠷⡈⠀⠶⢶⣰⣸⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣆⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⢾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣯⣉⠑⠚⣙⡒⠒⠲⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡁⠀⠀⠀⠀⠀⠀⠀⠀
-⣸⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡷⠶⠀⠀⠤⣬⣍⣹⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣄⠀⠀⠀⠀⠀⠀⠀⠀
-⣸⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣛⣙⠀⢠⠲⠖⠶⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡄⠀⠀⠀⠀⠀⠀⠀
-⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣯⣭⣰⢘⣙⣛⣲⣿⣿⣿⣿⡿⡻⠿⠿⠿⠿⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⣦⡀⠀⠀⠀⠀
-⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⠶⢾⡠⢤⣭⣽⣿⣿⣿⣿⡟⣱⠦⠄⠤⠐⡄⠹⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣶⣤⡀⠀
-⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡛⣻⡕⠶⠶⣿⣿⣿⣿⣿⣿⣗⣎⠒⣀⠃⡐⢀⠙⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⠀
-⢻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣭⣹⣏⣛⣛⣿⣿⣿⣿⣿⣿⣿⣞⣍⣉⢉⠰⠀⠠⢹⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠅
-⣽⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠶⢼⡧⢤⣽⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣯⣣⣡⣛⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣅
-⡿⣷⣽⡿⠛⠋⠉⣉⡐⠶⣾⣾⣟⣻⡕⠶⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣹⣫⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠗
-⢸⣿⣟⣥⡶⢘⡻⢶⡹⣛⣼⣿⣯⣽⢯⣙⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠿⠿⣿⣿⣿⣿⣿⣿⡿⠿⠟⠁⠀
-⠘⢟⣾⣿⣿⣚⠷⣳⢳⣫⣽⣿⣛⣾⡷⢾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣆⠀⠀⠁⠀⠈⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠙⢋⣿⣿⣯⣙⣯⣵⣿⣿⣯⣽⣟⣻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡯⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠉⠛⢻⠟⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⢸⣿⣿⣿⣟⡟⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⣡⣿⣿⣿⣿⡗⣮⢻⣽⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⠀
-''')
-            ascii_banner = pyfiglet.figlet_format("GoodBye!!")
-            print(colored(ascii_banner, "red"))
-
-            break
-        else:
-            print(colored("Invalid choice. Please enter a valid option (1-7).", "red"))
-
-
-
-    pass
-# Function to manage the list operations submenu
-def list_operations():
-    while True:
-        print(colored("List Operations:", "green"))
-        print(colored("1. Artists", "light_yellow"))
-        print(colored("2. Songs", "light_yellow"))
-        print(colored("3. BPM", "light_yellow"))
-        print(colored("4. Back to Main Menu", "light_yellow"))
-
-        choice = input(colored("Enter your choice (1-4): ", "green"))
-
-        if choice == '1':
-            list_artists()
-        elif choice == '2':
-            list_songs()
-        elif choice == '3':
-            ascii_banner = pyfiglet.figlet_format("BPM!!")
-            print(colored(ascii_banner, "red"))
-            list_songs_by_bpm()
-        elif choice == '4':
-            break
-        else:
-            print(colored("Invalid choice. Please enter a valid option (1-4).", "red"))
-            print(r'''
-                  ⣀⣀⠤⠴⠖⠒⠒⠉⠉⠁⠐⠲⢤⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣀⡤⠖⠊⠉⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠉⠳⣄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⠞⠉⠀⠀⠀⠀⠀⠀⠀⠀⠀⣀⠀⠀⠀⢀⡀⠀⠀⠀⠀⠈⢣⣄⡀⣀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⢀⡴⠋⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠈⠛⠷⢦⣴⣿⣿⣶⣶⣖⣲⣾⣿⣿⡛⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⡰⠋⠀⢀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⡼⠋⠁⠀⠈⠳⡀⠀⠉⢻⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⢀⡞⠁⠀⠀⣾⠃⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⡴⠋⠀⠀⠀⠀⡀⠀⠙⢦⠈⢦⣇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⡰⠋⠀⠀⠀⣰⣋⣤⣤⣄⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⡞⠀⠀⠀⠀⢠⣏⣈⡦⠀⠈⢳⠀⠻⡄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⡄⠀⠀⠀⣠⣶⠟⠁⠀⠀⠀⠉⠛⠦⣄⠀⠀⠀⠀⠀⠘⡇⠀⠀⠀⠀⠀⠀⠉⠀⠀⠀⠀⢣⠀⢹⣄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⢸⡇⠀⠀⢚⣿⣿⠀⠀⠀⠀⠀⠀⠀⠀⠀⡏⠀⠀⠀⠀⠀⠙⢦⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢸⠄⠀⢿⢦⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⢸⠃⠀⢠⡿⠃⠃⡴⠲⡀⠀⠀⠀⠀⠀⣸⠁⠀⢀⣀⣤⣄⣀⣀⡙⠢⣄⣀⠀⠀⠀⠀⢀⣠⠟⠀⠀⠘⡎⢧⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⡆⡇⠀⠀⠈⠀⣼⠀⠓⠚⠀⠀⠀⠀⢀⡴⠃⢀⡴⠋⠁⠈⢧⠀⢠⠟⠑⢶⣍⡙⠛⠛⠛⠉⠀⠀⠀⠀⠀⠸⢼⡇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⣇⡇⠀⠀⠀⣠⠻⣄⠀⠀⠀⠀⢀⣴⠏⠀⡰⢳⡀⠀⠀⠀⢈⡷⠃⠀⠀⠈⢢⣉⣙⣻⠟⠲⣤⠀⠀⠀⠀⠀⢸⡇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⣿⡇⠀⠀⠸⠃⠀⠉⠓⠒⠒⠒⠋⠁⠀⢰⠃⠀⢷⣄⡠⠴⠋⠀⠀⠀⠀⠀⠀⠈⠉⠀⠀⠀⠈⢧⠀⠀⠀⠀⢸⡇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⡏⠇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⡿⠀⠀⡞⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢳⡤⠀⠀⠘⡇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⡇⡆⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⡇⢀⡾⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣀⡶⠏⠀⠀⠀⠀⡇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠃⢻⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢰⠏⠁⠀⠀⠀⠀⠀⠀⠀⣀⣀⡤⠤⠴⠲⠒⠒⠚⠉⠁⠀⠀⠀⠀⠀⠀⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⢰⡘⡇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣼⠀⠀⠀⠀⢀⣠⠴⠖⠋⠉⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠈⢇⢸⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⠇⠀⢀⡠⠖⠋⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠈⠺⣇⠀⠀⠀⠀⠀⠀⠀⠀⢀⡟⢀⠴⠋⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⡇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⡔⠒⠲⣶⣶⠒⠹⣿⠉⠙⢶⡀
-⠀⠀⠀⢿⣆⠀⠀⠀⠀⠀⠀⠀⡾⠖⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣀⣀⢀⣀⣀⣠⠤⣶⠶⠶⣦⡀⠀⠀⢀⡇⢀⡶⠛⠙⢶⠀⠀⠀⠀⠀⢠⠇⠀⠀⢸⠇⠀⠀⣸⠀⠀⠀⢣
-⠀⠀⠀⢸⡍⠣⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⣤⢦⣤⠀⠀⠀⠀⠀⠀⡟⠀⠀⠙⣿⠁⠀⢻⠀⠀⠈⢷⠀⠀⣸⠇⠌⠀⠀⠀⢸⡇⠀⠀⠀⠀⡼⠀⠀⠀⣼⠀⠀⢠⡏⠀⠀⠀⢸
-⠀⠀⠀⠀⠇⠀⠈⠒⢤⣀⠀⠀⠀⠀⠀⢰⠏⠀⠀⠸⡇⠀⠀⠀⠀⢸⡇⠀⠀⠀⡏⠀⠀⣼⠀⠀⠀⢸⡆⣰⠏⠀⡇⠀⠀⠀⢸⡇⠀⠀⢀⡴⠁⠀⠀⣼⠋⠀⣰⠟⠀⠀⠀⠀⡞
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠁⠀⠀⠀⠀⡿⠀⠀⠀⠀⡇⠀⠀⠀⢀⡾⠀⠀⢀⡼⠁⠀⣴⠏⠀⠀⠀⢸⡷⠃⠀⠀⡇⠀⠀⠀⠐⠓⠚⠉⠁⠀⠀⠀⠊⠀⠀⠠⠋⠀⠀⠀⠀⣸⠇
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣗⠀⠀⠀⠀⣧⣤⠤⠖⠛⠁⠀⢠⠛⠁⠀⡼⠋⠀⠀⠀⢀⡞⠁⠀⠀⠀⣧⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣀⣤⠞⠃⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣿⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣠⠞⠀⠀⠀⠀⣠⡿⠀⠀⠀⠀⠀⠀⠀⠀⢀⣤⠂⠀⠀⠀⠀⣠⠞⠋⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣿⡄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⣴⠟⠁⠀⢀⣠⡴⠚⠁⠀⠀⠀⠀⠀⠀⢀⣤⡶⠛⠁⠀⠀⢀⣠⠞⠁⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⣠⠞⠋⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣀⡴⠛⠂⠒⠒⠈⠉⠀⠀⠀⠀⠀⠀⠀⠀⢀⡴⠟⠁⠀⣀⣤⠶⠞⠉⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠠⠴⠒⠋⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣀⣠⠶⠚⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢠⠞⢁⠀⠐⠈⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠂⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠠⠶⠛⠉⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
-''')
+        print(f"Song '{song.title}' already exists with ID {song.id}")
+    return 0
 
 
+def cmd_update_artist(args):
+    open_db()
+    from sqlalchemy.exc import IntegrityError
+    from models import session
+    from operations import find_artist, update_artist
 
+    if args.new_name is None and args.genre is None:
+        return error("Nothing to update: give --new-name and/or --genre")
+    if args.new_name is not None and not args.new_name.strip():
+        return error("The new name cannot be empty")
+    artist = find_artist(args.name)
+    if artist is None:
+        return error(f"Artist '{args.name}' not found.")
+    try:
+        update_artist(artist, title=args.new_name, genre=args.genre)
+    except IntegrityError:
+        session.rollback()
+        return error(f"Artist '{args.new_name}' already exists")
+    print(f"Artist '{args.name}' updated.")
+    return 0
+
+
+def cmd_delete_artist(args):
+    open_db()
+    from operations import find_artist_by_name_or_id, delete_artist
+
+    artist = find_artist_by_name_or_id(args.artist)
+    if artist is None:
+        return error(f"Artist '{args.artist}' not found.")
+    songs = delete_artist(artist)
+    print(f"Artist '{artist.title}' (ID: {artist.id}) deleted with {songs} song{'s' if songs != 1 else ''}.")
+    return 0
 
-if __name__ == '__main__':
-    main()
 
+def cmd_delete_song(args):
+    open_db()
+    from operations import find_song_by_title_or_id, delete_song
+
+    song = find_song_by_title_or_id(args.song)
+    if song is None:
+        return error(f"Song '{args.song}' not found.")
+    delete_song(song)
+    print(f"Song '{song.title}' (ID: {song.id}) deleted.")
+    return 0
+
+
+# Function to print artists or songs as tab-separated lines
+def cmd_list(args):
+    open_db()
+    from models import session, Artist
+    from listing import songs_query, write_lines
+
+    if args.what == 'artists':
+        query = session.query(Artist.id, Artist.title, Artist.genre).order_by(Artist.title)
+    else:
+        query = songs_query(sort=args.sort, artist_title=args.artist)
 
+    write_lines(query.yield_per(1000), format_row)
+    return 0
 
 
+# Function to print songs whose tempo matches a target BPM
+def cmd_bpm(args):
+    open_db()
+    from tempo import find_compatible
 
-    
+    try:
+        matches = find_compatible(
+            args.target, tolerance=args.tolerance, genre=args.genre,
+            limit=args.limit, offset=args.offset, half_double=not args.exact_only,
+        )
+    except ValueError as exc:
+        return error(str(exc))
+
+    from listing import write_lines
+    write_lines(
+        matches,
+        lambda match: format_row((match.id, match.title, match.artist, match.genre, match.bpm,
+                                  match.relation, f"{match.deviation:.2f}%")),
+    )
+    return 0
+
+
+# Function to print songs and/or artists matching a search, best match first
+def cmd_search(args):
+    open_db()
+    from search import search_songs, search_artists
+    from listing import write_lines
+
+    fuzzy = not args.exact
+    if args.what in ('all', 'artists'):
+        result = search_artists(args.query, limit=args.limit, fuzzy=fuzzy)
+        if result.corrected:
+            print(f"No artists match '{args.query}', showing results for '{result.corrected}'", file=sys.stderr)
+        write_lines(result.hits, lambda hit: format_row(('artist', hit.id, hit.title, '', hit.genre)))
+    if args.what in ('all', 'songs'):
+        result = search_songs(args.query, limit=args.limit, fuzzy=fuzzy)
+        if result.corrected:
+            print(f"No songs match '{args.query}', showing results for '{result.corrected}'", file=sys.stderr)
+        write_lines(result.hits, lambda hit: format_row(('song', hit.id, hit.title, hit.artist, hit.genre)))
+    return 0
+
+
+# Function to run the bulk import command
+def cmd_import(args):
+    open_db()
+    from importer import import_file
+
+    try:
+        stats = import_file(args.path, fmt=args.format, batch_size=args.batch_size)
+    except (OSError, ValueError) as exc:
+        return error(f"Import failed: {exc}")
+    print(stats.report())
+    return 0
+
+
+# Function to detect the BPM of every new or changed WAV file in a folder
+def cmd_scan(args):
+    open_db()
+    try:
+        from scanner import scan_folder
+    except ModuleNotFoundError as exc:
+        if exc.name != 'numpy':
+            raise
+        return error("scan needs NumPy (pip install numpy)")
+
+    try:
+        stats = scan_folder(
+            args.path, workers=args.workers, batch_size=args.batch_size,
+            overwrite=args.overwrite, rescan=args.rescan,
+        )
+    except (OSError, ValueError) as exc:
+        return error(f"Scan failed: {exc}")
+    for path, message in stats.failures:
+        print(f"{path}: {message}", file=sys.stderr)
+    print(stats.report())
+    return 0
+
+
+# Function to print genre, tempo and release date statistics for the whole catalog
+def cmd_stats(args):
+    open_db()
+    try:
+        from stats import catalog_stats, write_report
+    except ModuleNotFoundError as exc:
+        if exc.name != 'numpy':
+            raise
+        return error("stats needs NumPy (pip install numpy)")
+
+    try:
+        stats = catalog_stats(top=args.top, bin_width=args.bin_width)
+    except ValueError as exc:
+        return error(str(exc))
+    if args.format == 'json':
+        import json
+        json.dump(stats, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        write_report(stats)
+    return 0
+
+
+# Function to find artists and songs stored more than once and, once confirmed, merge them
+def cmd_dedupe(args):
+    open_db()
+    from dedupe import find_duplicates, write_plan, merge
+    from listing import counted
+
+    plan = find_duplicates(all_suffixes=args.all_suffixes)
+    write_plan(plan, shown=args.show)
+    if not plan or args.dry_run:
+        return 0
+    if not args.yes and not confirm(f"Merge {counted(plan.artists_merged, 'artist')} and {counted(plan.songs_merged, 'song')}?"):
+        print("Nothing was changed.")
+        return 0
+    artists, songs = merge(plan)
+    print(f"Merged {counted(artists, 'artist')} and {counted(songs, 'song')}.")
+    return 0
+
+
+# Function to build the song filter of delete-songs and update-songs
+def song_filter(args):
+    from batch import SongFilter, read_ids
+
+    return SongFilter(
+        artist=args.artist, genre=args.genre, bpm_min=args.bpm_min, bpm_max=args.bpm_max,
+        ids=read_ids(args.ids) if args.ids else None, no_artist=args.no_artist,
+    )
+
+
+# Function to delete every song matching a filter in one statement, after a dry-run count
+def cmd_delete_songs(args):
+    open_db()
+    from batch import delete_songs
+    from listing import counted
+
+    try:
+        chosen = song_filter(args)
+        matched = delete_songs(chosen, dry_run=True)
+    except (OSError, ValueError) as exc:
+        return error(str(exc))
+    print(f"{counted(matched, 'song')} match.")
+    if not matched or args.dry_run:
+        return 0
+    if not args.yes and not confirm(f"Delete {counted(matched, 'song')}?"):
+        print("Nothing was changed.")
+        return 0
+    print(f"Deleted {counted(delete_songs(chosen), 'song')}.")
+    return 0
+
+
+# Function to change every song matching a filter in one statement, after a dry-run count
+def cmd_update_songs(args):
+    open_db()
+    from batch import update_songs
+    from listing import counted
+    from operations import parse_bpm
+
+    try:
+        chosen = song_filter(args)
+        changes = dict(bpm=parse_bpm(args.set_bpm), release_date=args.set_release_date,
+                       artist=args.set_artist, clear_bpm=args.clear_bpm)
+        matched = update_songs(chosen, dry_run=True, **changes)
+    except (OSError, ValueError) as exc:
+        return error(str(exc))
+    print(f"{counted(matched, 'song')} match.")
+    if not matched or args.dry_run:
+        return 0
+    if not args.yes and not confirm(f"Update {counted(matched, 'song')}?"):
+        print("Nothing was changed.")
+        return 0
+    print(f"Updated {counted(update_songs(chosen, **changes), 'song')}.")
+    return 0
+
+
+# Function to delete the chosen artists and their songs in one statement, after a dry-run count
+def cmd_delete_artists(args):
+    open_db()
+    from batch import delete_artists, read_ids
+    from listing import counted
+
+    try:
+        choice = dict(titles=args.names, ids=read_ids(args.ids) if args.ids else None,
+                      genre=args.genre, without_songs=args.without_songs)
+        artists, songs = delete_artists(dry_run=True, **choice)
+    except (OSError, ValueError) as exc:
+        return error(str(exc))
+    print(f"{counted(artists, 'artist')} with {counted(songs, 'song')} match.")
+    if not artists or args.dry_run:
+        return 0
+    if not args.yes and not confirm(f"Delete {counted(artists, 'artist')} and their {counted(songs, 'song')}?"):
+        print("Nothing was changed.")
+        return 0
+    artists, songs = delete_artists(**choice)
+    print(f"Deleted {counted(artists, 'artist')} and {counted(songs, 'song')}.")
+    return 0
+
+
+# Function to serve the catalog as a local HTTP/JSON API until interrupted
+def cmd_serve(args):
+    open_db()
+    from server import serve
+
+    def ready(server):
+        print(f"Serving on http://{server.host}:{server.port} with {server.workers} database "
+              f"worker{'s' if server.workers != 1 else ''} (Ctrl-C to stop)", file=sys.stderr)
+
+    try:
+        server = serve(args.host, args.port, workers=args.workers, queue_limit=args.queue_limit, ready=ready)
+    except (OSError, ValueError) as exc:
+        return error(f"Server failed: {exc}")
+    print(server.report(), file=sys.stderr)
+    return 0
+
+
+# Function to build a tempo-smooth set from a start to an end BPM
+def cmd_playlist(args):
+    open_db()
+    try:
+        from playlist import build_playlist, detect_format, write_m3u, write_json
+    except ModuleNotFoundError as exc:
+        if exc.name != 'numpy':
+            raise
+        return error("playlist needs NumPy (pip install numpy)")
+
+    try:
+        playlist = build_playlist(
+            args.start, args.end, length=args.length, max_step=args.max_step, genres=args.genre,
+            artist_gap=args.artist_gap, seed=args.seed,
+        )
+    except ValueError as exc:
+        return error(str(exc))
+
+    fmt = args.format or (detect_format(args.output) if args.output else None)
+    if fmt is None:
+        from listing import write_lines
+        write_lines(
+            enumerate(playlist.tracks, 1),
+            lambda item: format_row((item[0], item[1].id, item[1].title, item[1].artist, item[1].genre, item[1].bpm)),
+        )
+    else:
+        write = write_json if fmt == 'json' else write_m3u
+        try:
+            if args.output and args.output != '-':
+                with open(args.output, 'w', encoding='utf-8') as out:
+                    missing = write(playlist, out)
+            else:
+                missing = write(playlist, sys.stdout)
+        except OSError as exc:
+            return error(f"Playlist failed: {exc}")
+        if missing:
+            print(f"{missing} of the tracks have no scanned audio file and are listed as comments", file=sys.stderr)
+    print(f"{len(playlist.tracks)} tracks picked from {playlist.candidates:,} songs in "
+          f"{playlist.index_ms + playlist.search_ms:.0f} ms (index {playlist.index_ms:.0f} ms, "
+          f"search {playlist.search_ms:.0f} ms)", file=sys.stderr)
+    return 0
+
+
+# Function to export the (optionally filtered) catalog
+def cmd_export(args):
+    open_db()
+    from export import export, parse_date_bound
+
+    try:
+        count = export(
+            args.path, fmt=args.format, chunk_size=args.chunk_size,
+            genre=args.genre, bpm_min=args.bpm_min, bpm_max=args.bpm_max,
+            released_from=parse_date_bound(args.released_from),
+            released_to=parse_date_bound(args.released_to),
+        )
+    except (OSError, ValueError) as exc:
+        return error(f"Export failed: {exc}")
+    print(f"Exported {count} songs to {'stdout' if args.path == '-' else args.path}", file=sys.stderr)
+    return 0
+
+
+# Function to run the schema migrations and optionally verify the query plans
+def cmd_migrate(args):
+    from migrate import migrate, check_query_plans, MigrationError, LATEST_VERSION
+
+    try:
+        applied = migrate()
+    except MigrationError as exc:
+        return error(f"Migration failed: {exc}")
+    for number, description in applied:
+        print(f"Applied migration {number}: {description}")
+    if not applied:
+        print(f"Database is up to date (version {LATEST_VERSION}).")
+
+    if args.check:
+        problems = check_query_plans()
+        for name, detail in problems:
+            print(f"Query '{name}' is not using an index: {detail}", file=sys.stderr)
+        if problems:
+            return 1
+        print("All hot queries are served by an index.")
+    return 0
+
+
+# Function to add the song filters shared by delete-songs and update-songs; every one given must match
+def add_song_filters(parser):
+    parser.add_argument('--artist', metavar='NAME', help='Songs by this artist')
+    parser.add_argument('--genre', help='Songs by artists whose genre contains this text')
+    parser.add_argument('--bpm-min', type=int)
+    parser.add_argument('--bpm-max', type=int)
+    parser.add_argument('--ids', metavar='FILE', help='File of song IDs, or - for stdin')
+    parser.add_argument('--no-artist', action='store_true', help='Songs with no artist')
+
+
+# Function to add the --dry-run and --yes options of the batch commands
+def add_batch_options(parser):
+    parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would change')
+    parser.add_argument('--yes', action='store_true', help='Change them without asking')
+
+
+# Function to build the command line parser
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='soundplay',
+        description='SOUNDPLAY music database. Run without a command for the interactive menu.',
+    )
+    parser.add_argument('--db', help='SQLite database file (default: songdatabase.db in the current directory)')
+    parser.add_argument('--busy-timeout', type=float, metavar='SECONDS',
+                        help="Seconds to wait for another process's write lock before failing (default: 10)")
+    parser.add_argument('--pragma', action='append', type=pragma_setting, metavar='NAME=VALUE',
+                        help='SQLite PRAGMA for every connection, overriding the defaults, e.g. journal_mode=delete (repeatable)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Print the SQL statements, SQL time, rows and wall time of each operation at exit')
+    parser.add_argument('--profile-json', metavar='PATH', help='Also write the profile and every statement to a JSON file')
+    parser.set_defaults(func=cmd_menu, page_size=20, no_color=False)
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+
+    menu_parser = subparsers.add_parser('menu', help='Interactive menu (the default)')
+    menu_parser.add_argument('--page-size', type=int, default=20, help='Rows per page in the artist and song lists (default: 20)')
+    menu_parser.add_argument('--no-color', action='store_true', help='Plain song listings (also automatic when output is not a terminal or NO_COLOR is set)')
+    menu_parser.set_defaults(func=cmd_menu)
+
+    add_artist_parser = subparsers.add_parser('add-artist', help='Add an artist')
+    add_artist_parser.add_argument('name')
+    add_artist_parser.add_argument('--genre')
+    add_artist_parser.set_defaults(func=cmd_add_artist)
+
+    add_song_parser = subparsers.add_parser('add-song', help='Add a song by an existing artist')
+    add_song_parser.add_argument('title')
+    add_song_parser.add_argument('--artist', required=True)
+    add_song_parser.add_argument('--release-date')
+    add_song_parser.add_argument('--bpm')
+    add_song_parser.add_argument('--create-artist', action='store_true', help='Create the artist if it does not exist')
+    add_song_parser.add_argument('--genre', help='Genre for an artist created by --create-artist')
+    add_song_parser.set_defaults(func=cmd_add_song)
+
+    update_artist_parser = subparsers.add_parser('update-artist', help="Rename an artist or change their genre")
+    update_artist_parser.add_argument('name')
+    update_artist_parser.add_argument('--new-name')
+    update_artist_parser.add_argument('--genre')
+    update_artist_parser.set_defaults(func=cmd_update_artist)
+
+    delete_artist_parser = subparsers.add_parser('delete-artist', help='Delete an artist and their songs by name or ID')
+    delete_artist_parser.add_argument('artist', help='Artist name or ID')
+    delete_artist_parser.set_defaults(func=cmd_delete_artist)
+
+    delete_song_parser = subparsers.add_parser('delete-song', help='Delete a song by title or ID')
+    delete_song_parser.add_argument('song', help='Song title or ID')
+    delete_song_parser.set_defaults(func=cmd_delete_song)
+
+    list_parser = subparsers.add_parser('list', help='Print artists or songs as tab-separated lines')
+    list_parser.add_argument('what', choices=['artists', 'songs'])
+    list_parser.add_argument('--sort', choices=['title', 'bpm'], default='title', help='Sort order for songs')
+    list_parser.add_argument('--artist', help='Only songs by this artist')
+    list_parser.set_defaults(func=cmd_list)
+
+    bpm_parser = subparsers.add_parser('bpm', help='Songs within a tolerance of a target tempo, closest first')
+    bpm_parser.add_argument('target', type=float, help='Target BPM')
+    bpm_parser.add_argument('--tolerance', type=float, default=3.0, help='Allowed deviation in percent (default: 3)')
+    bpm_parser.add_argument('--genre', help='Only artists whose genre contains this text')
+    bpm_parser.add_argument('--limit', type=int, default=50)
+    bpm_parser.add_argument('--offset', type=int, default=0)
+    bpm_parser.add_argument('--exact-only', action='store_true', help='Skip half-time and double-time matches')
+    bpm_parser.set_defaults(func=cmd_bpm)
+
+    search_parser = subparsers.add_parser('search', help='Full-text search over song titles, artist names and genres')
+    search_parser.add_argument('query')
+    search_parser.add_argument('what', nargs='?', choices=['all', 'songs', 'artists'], default='all')
+    search_parser.add_argument('--limit', type=int, default=20, help='Maximum results of each kind (default: 20)')
+    search_parser.add_argument('--exact', action='store_true', help='No typo-tolerant fallback')
+    search_parser.set_defaults(func=cmd_search)
+
+    import_parser = subparsers.add_parser('import', help='Bulk import artists and songs from a CSV or JSONL file')
+    import_parser.add_argument('path', help='CSV or JSONL file with title, artist, genre, release_date and bpm columns')
+    import_parser.add_argument('--format', choices=['csv', 'jsonl'], help='File format (guessed from the extension by default)')
+    import_parser.add_argument('--batch-size', type=int, default=1000, help='Rows per transaction (default: 1000)')
+    import_parser.set_defaults(func=cmd_import)
+
+    scan_parser = subparsers.add_parser('scan', help='Detect the BPM of the WAV files in a folder and add them as songs')
+    scan_parser.add_argument('path', help='Folder to scan (with subfolders)')
+    scan_parser.add_argument('--workers', type=int, help='Worker processes (default: one per CPU)')
+    scan_parser.add_argument('--batch-size', type=int, default=200, help='Files per transaction (default: 200)')
+    scan_parser.add_argument('--overwrite', action='store_true', help='Replace BPMs that are already set')
+    scan_parser.add_argument('--rescan', action='store_true', help='Analyse files that have not changed since the last scan')
+    scan_parser.set_defaults(func=cmd_scan)
+
+    stats_parser = subparsers.add_parser('stats', help='Songs per genre, BPM histograms, top artists and release years')
+    stats_parser.add_argument('--format', choices=['table', 'json'], default='table')
+    stats_parser.add_argument('--top', type=int, default=10, help='Artists listed (default: 10)')
+    stats_parser.add_argument('--bin-width', type=int, default=10, help='BPM histogram bin width (default: 10)')
+    stats_parser.set_defaults(func=cmd_stats)
+
+    dedupe_parser = subparsers.add_parser('dedupe', help='Find and merge artists and songs stored more than once')
+    dedupe_parser.add_argument('--show', type=int, default=20, help='Groups of each kind listed (default: 20)')
+    dedupe_parser.add_argument('--all-suffixes', action='store_true',
+                               help='Also ignore suffixes like (Live) or (Remix), not only release ones like (Remastered)')
+    dedupe_parser.add_argument('--dry-run', action='store_true', help='Only list the duplicates')
+    dedupe_parser.add_argument('--yes', action='store_true', help='Merge without asking')
+    dedupe_parser.set_defaults(func=cmd_dedupe)
+
+    delete_songs_parser = subparsers.add_parser('delete-songs', help='Delete every song matching a filter')
+    add_song_filters(delete_songs_parser)
+    add_batch_options(delete_songs_parser)
+    delete_songs_parser.set_defaults(func=cmd_delete_songs)
+
+    update_songs_parser = subparsers.add_parser('update-songs', help='Change the BPM, release date or artist of every song matching a filter')
+    add_song_filters(update_songs_parser)
+    bpm_change = update_songs_parser.add_mutually_exclusive_group()
+    bpm_change.add_argument('--set-bpm', metavar='BPM')
+    bpm_change.add_argument('--clear-bpm', action='store_true', help='Remove the BPM')
+    update_songs_parser.add_argument('--set-release-date', metavar='DATE')
+    update_songs_parser.add_argument('--set-artist', metavar='NAME', help='Move the songs to this existing artist')
+    add_batch_options(update_songs_parser)
+    update_songs_parser.set_defaults(func=cmd_update_songs)
+
+    delete_artists_parser = subparsers.add_parser('delete-artists', help='Delete the chosen artists and all their songs')
+    delete_artists_parser.add_argument('names', nargs='*', metavar='name', help='Artist names')
+    delete_artists_parser.add_argument('--ids', metavar='FILE', help='File of artist IDs, or - for stdin')
+    delete_artists_parser.add_argument('--genre', help='Artists whose genre contains this text')
+    delete_artists_parser.add_argument('--without-songs', action='store_true', help='Only artists with no songs')
+    add_batch_options(delete_artists_parser)
+    delete_artists_parser.set_defaults(func=cmd_delete_artists)
+
+    serve_parser = subparsers.add_parser('serve', help='Serve artists and songs as a local HTTP/JSON API')
+    serve_parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    serve_parser.add_argument('--port', type=int, default=8080, help='Port to listen on, 0 for any free one (default: 8080)')
+    serve_parser.add_argument('--workers', type=int, default=4, help='Database worker threads (default: 4)')
+    serve_parser.add_argument('--queue-limit', type=int, default=256,
+                              help='Requests that may wait for a worker before the server answers 503 (default: 256)')
+    serve_parser.set_defaults(func=cmd_serve)
+
+    playlist_parser = subparsers.add_parser('playlist', help='Build a set that moves smoothly from one tempo to another')
+    playlist_parser.add_argument('start', type=float, help='BPM of the first track')
+    playlist_parser.add_argument('end', type=float, help='BPM of the last track')
+    playlist_parser.add_argument('--length', type=int, default=100, help='Number of tracks (default: 100)')
+    playlist_parser.add_argument('--max-step', type=float, default=3.0,
+                                 help='Largest BPM change between consecutive tracks (default: 3)')
+    playlist_parser.add_argument('--genre', action='append',
+                                 help='Only artists whose genre contains this text (repeatable: any of them)')
+    playlist_parser.add_argument('--artist-gap', type=int, default=10,
+                                 help='Tracks before an artist may appear again (default: 10)')
+    playlist_parser.add_argument('--seed', type=int, help='Pick the same songs on every run with the same seed')
+    playlist_parser.add_argument('--format', choices=['m3u', 'json'],
+                                 help='Output format (default: guessed from --output, or tab-separated lines)')
+    playlist_parser.add_argument('-o', '--output', metavar='PATH', help='Write the playlist to a file (.m3u, .m3u8 or .json), or - for stdout')
+    playlist_parser.set_defaults(func=cmd_playlist)
+
+    export_parser = subparsers.add_parser('export', help='Export songs with their artist to CSV, JSONL or a columnar snapshot')
+    export_parser.add_argument('path', help="Output file, or - for stdout (CSV and JSONL only)")
+    export_parser.add_argument('--format', choices=['csv', 'jsonl', 'snapshot'],
+                               help='Output format (guessed from the extension by default: .csv, .jsonl, .snap)')
+    export_parser.add_argument('--genre', help='Only artists whose genre contains this text')
+    export_parser.add_argument('--bpm-min', type=int)
+    export_parser.add_argument('--bpm-max', type=int)
+    export_parser.add_argument('--released-from', metavar='DATE', help='YYYY, YYYY-MM or YYYY-MM-DD')
+    export_parser.add_argument('--released-to', metavar='DATE', help='YYYY, YYYY-MM or YYYY-MM-DD (inclusive)')
+    export_parser.add_argument('--chunk-size', type=int, default=5000, help='Rows fetched and written at a time (default: 5000)')
+    export_parser.set_defaults(func=cmd_export)
+
+    migrate_parser = subparsers.add_parser('migrate', help='Upgrade the database schema in place')
+    migrate_parser.add_argument('--check', action='store_true', help='Fail if a hot query falls back to a full table scan')
+    migrate_parser.set_defaults(func=cmd_migrate)
+
+    return parser
+
+
+def run(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.db:
+        # These must be set before models is first imported
+        os.environ['SOUNDPLAY_DATABASE_URL'] = f'sqlite:///{args.db}'
+    if args.busy_timeout is not None:
+        os.environ['SOUNDPLAY_BUSY_TIMEOUT'] = str(args.busy_timeout)
+    if args.pragma:
+        os.environ['SOUNDPLAY_SQLITE_PRAGMAS'] = ','.join(args.pragma)
+    if args.profile_json:
+        args.profile = True
+    if args.profile:
+        return run_profiled(args)
+    return args.func(args)
+
+
+# Function to run a command with the SQL profiler attached and report at exit
+def run_profiled(args):
+    import models
+    import profiler
+    from artist_cache import cache
+
+    active = profiler.start(models.engine)
+    active.watch('artist cache', cache.stats)
+    try:
+        with active.operation(args.command or 'menu'):
+            return args.func(args)
+    finally:
+        active.report()
+        if args.profile_json:
+            active.write_json(args.profile_json)
+
+
+if __name__ == '__main__':
+    sys.exit(run())
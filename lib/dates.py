@@ -0,0 +1,67 @@
+import re
+from datetime import date
+
+# Free-text release dates, as the menu and importers store them, turned into YYYY, YYYY-MM or
+# YYYY-MM-DD so they sort and compare as dates. Used by `cli.py stats` and by the date filters
+# of `cli.py export`, so both read the same dates.
+
+MONTHS = {
+    name: number
+    for number, names in enumerate((
+        ('jan', 'january'), ('feb', 'february'), ('mar', 'march'), ('apr', 'april'), ('may',),
+        ('jun', 'june'), ('jul', 'july'), ('aug', 'august'), ('sep', 'sept', 'september'),
+        ('oct', 'october'), ('nov', 'november'), ('dec', 'december'),
+    ), start=1)
+    for name in names
+}
+
+# Release date layouts, tried in order: year first (YYYY, YYYY-MM, YYYY-MM-DD with -, / or .,
+# optionally followed by a time), day first (DD/MM/YYYY, the menu's own format, and MM/YYYY),
+# then month names ("March 2014", "3 March 2014", "March 3, 2014")
+DATE_PATTERNS = [
+    re.compile(r'^(?P<year>\d{4})(?:[-/.](?P<month>\d{1,2})(?:[-/.](?P<day>\d{1,2}))?)?(?:[t ].*)?$'),
+    re.compile(r'^(?:(?P<day>\d{1,2})[-/.])?(?P<month>\d{1,2})[-/.](?P<year>\d{4})$'),
+    re.compile(r'^(?:(?P<day>\d{1,2})\s+)?(?P<month_name>[a-z]+)\.?,?\s+(?P<year>\d{4})$'),
+    re.compile(r'^(?P<month_name>[a-z]+)\.?\s+(?P<day>\d{1,2})(?:st|nd|rd|th)?,?\s+(?P<year>\d{4})$'),
+]
+
+# Last resort for text such as "circa 1999" or "1999 (remastered)": a single year in it
+LONE_YEAR = re.compile(r'(?<!\d)(1\d{3}|2\d{3})(?!\d)')
+
+
+# Function to turn a free-text release date into YYYY, YYYY-MM or YYYY-MM-DD (which sort as dates), or None
+def normalise_release_date(text):
+    if text is None:
+        return None
+    text = text.strip().lower()
+    # Fast paths for dates that are already YYYY or YYYY-MM-DD, most of a typical catalog
+    if len(text) == 4 and text.isdigit():
+        return text if text >= '1000' else None
+    if len(text) == 10 and text[4] == '-':
+        try:
+            return date.fromisoformat(text).isoformat()
+        except ValueError:
+            pass
+    for pattern in DATE_PATTERNS:
+        match = pattern.match(text)
+        if match is None:
+            continue
+        parts = match.groupdict()
+        year = int(parts['year'])
+        month = MONTHS.get(parts['month_name']) if parts.get('month_name') else parts.get('month')
+        if parts.get('month_name') and month is None:
+            continue
+        if year < 1000:
+            return None
+        if month is None:
+            return f"{year:04d}"
+        day = parts.get('day')
+        try:
+            if day is None:
+                date(year, int(month), 1)
+                return f"{year:04d}-{int(month):02d}"
+            return date(year, int(month), int(day)).isoformat()
+        except ValueError:
+            return None
+    years = LONE_YEAR.findall(text)
+    return years[0] if len(years) == 1 else None
@@ -0,0 +1,325 @@
+import re
+import sys
+import time
+import unicodedata
+from collections import namedtuple, defaultdict
+from functools import lru_cache
+
+from sqlalchemy import MetaData, Table, Column, Integer, select, update, delete, insert, func, bindparam
+
+from models import engine, Artist, Song, ScannedFile
+from artist_cache import cache as artist_cache
+from importer import chunked, LOOKUP_CHUNK
+from listing import counted
+
+# `cli.py dedupe`: find artists and songs that are stored more than once under slightly
+# different names, and merge them.
+#
+# Names are compared by a normalised key: case, diacritics, punctuation and whitespace are
+# ignored, and a song title also loses bracketed or " - " suffixes that mark another release of
+# the same recording, like "(Remastered)", "[Radio Edit]" or "- 2011 Remaster". Suffixes that
+# mark a different recording ("(Live)", "(Remix)") are kept unless all_suffixes is set.
+#
+# Artists are grouped by key (their table is small). Songs are blocked by artist: a song only
+# ever matches songs of the same artist, after merging artists, so the key of a song is a hash
+# of (artist, normalised title) and one pass over the table with a dict of hashes finds every
+# candidate, instead of comparing songs pairwise. Songs with no artist are never matched: two
+# "Halo"s by unknown artists are not known to be one song. Candidates are then read back and
+# their keys compared in full, so a hash collision never merges anything.
+#
+# A merge keeps one row of each group: of artists, one whose name has no stray spaces and the
+# most songs; of songs, one whose title has no release suffix and no stray spaces. It runs in
+# one transaction: the other songs are deleted after copying over a missing BPM or release date,
+# files scanned as one of them now point at the song kept, and the songs of the other artists
+# move to the artist kept. Songs whose BPMs disagree are left unmerged and listed as conflicts,
+# since one of the BPMs would otherwise be lost.
+
+# Suffix words that mark another release or a credit, not another recording
+RELEASE_WORDS = re.compile(
+    r'\b(?:remaster(?:ed)?|deluxe|expanded|anniversary|edition|bonus track|explicit|clean|mono|stereo|'
+    r'radio edit|single edit|single version|album version|feat|ft|featuring)\b'
+)
+BRACKETED_SUFFIX = re.compile(r'\s*[(\[{]([^()\[\]{}]*)[)\]}]\s*$')
+DASH_SUFFIX = re.compile(r'\s+[-–—]\s+([^-–—]+)$')
+NON_WORD = re.compile(r'[\W_]+')
+
+# Distinct titles whose normalised form is remembered during a pass
+TITLE_CACHE_SIZE = 65536
+
+# Groups of each kind listed by write_plan() unless told otherwise
+GROUPS_SHOWN = 20
+
+Candidate = namedtuple('Candidate', 'id title songs')
+ArtistGroup = namedtuple('ArtistGroup', 'keep merged genre')  # genre: set on the artist kept if it has none
+SongRow = namedtuple('SongRow', 'id artist_id title bpm release_date')
+SongGroup = namedtuple('SongGroup', 'artist keep merged bpm release_date')  # bpm, release_date: copied to keep if missing
+
+# Temporary (old id -> id kept) tables the merge statements join against
+_merges = MetaData()
+ARTIST_MERGES = Table(
+    'dedupe_artist_merges', _merges,
+    Column('old', Integer, primary_key=True), Column('new', Integer, nullable=False),
+    prefixes=['TEMPORARY'],
+)
+SONG_MERGES = Table(
+    'dedupe_song_merges', _merges,
+    Column('old', Integer, primary_key=True), Column('new', Integer, nullable=False),
+    prefixes=['TEMPORARY'],
+)
+
+
+# Function to ignore case, diacritics, punctuation and runs of whitespace
+def fold(text):
+    if not text.isascii():
+        text = ''.join(char for char in unicodedata.normalize('NFKD', text) if not unicodedata.combining(char))
+    folded = NON_WORD.sub(' ', text.casefold()).strip()
+    # Names made only of punctuation are kept as they are
+    return folded or text.strip().casefold()
+
+
+def _tidy(text):
+    return text == ' '.join(text.split())
+
+
+def normalise_artist(title):
+    return fold(title)
+
+
+# Function to return the key a song title is matched by
+@lru_cache(maxsize=TITLE_CACHE_SIZE)
+def normalise_title(title, all_suffixes=False):
+    text = title.strip()
+    while True:
+        match = BRACKETED_SUFFIX.search(text) or DASH_SUFFIX.search(text)
+        if match is None or match.start() == 0:
+            break
+        if not all_suffixes and not RELEASE_WORDS.search(match.group(1).casefold()):
+            break
+        text = text[:match.start()]
+    return fold(text)
+
+
+class DedupePlan:
+    def __init__(self):
+        self.artist_groups = []
+        self.song_groups = []
+        self.conflicts = []  # SongGroups left unmerged because their BPMs disagree
+        self.artists = 0
+        self.songs = 0
+        self.elapsed = 0.0
+
+    @property
+    def artists_merged(self):
+        return sum(len(group.merged) for group in self.artist_groups)
+
+    @property
+    def songs_merged(self):
+        return sum(len(group.merged) for group in self.song_groups)
+
+    def __bool__(self):
+        return bool(self.artist_groups or self.song_groups)
+
+
+# Function to group the artists by normalised name; returns (groups, artist id -> id kept, titles by id)
+def _artist_groups(conn):
+    artists = Artist.__table__
+    songs = Song.__table__
+    # Counted on the artist_id index, without reading the songs themselves
+    counts = dict(conn.execute(select(songs.c.artist_id, func.count()).group_by(songs.c.artist_id)).all())
+    by_key = defaultdict(list)
+    titles = {}
+    for artist_id, title, genre in conn.execute(select(artists.c.id, artists.c.title, artists.c.genre)):
+        titles[artist_id] = title
+        by_key[normalise_artist(title)].append((Candidate(artist_id, title, counts.get(artist_id, 0)), genre))
+
+    groups = []
+    kept = {}
+    for members in by_key.values():
+        if len(members) < 2:
+            continue
+        # A name without stray spaces first, then the most songs, then the oldest
+        members.sort(key=lambda member: (not _tidy(member[0].title), -member[0].songs, member[0].id))
+        keep, genre = members[0]
+        other_genres = [other_genre for _, other_genre in members[1:] if other_genre]
+        groups.append(ArtistGroup(keep, [candidate for candidate, _ in members[1:]],
+                                  other_genres[0] if not genre and other_genres else None))
+        for candidate, _ in members[1:]:
+            kept[candidate.id] = keep.id
+    groups.sort(key=lambda group: group.keep.title.casefold())
+    return groups, kept, titles
+
+
+# Function to return lists of song IDs whose (artist kept, title key) hash is the same
+def _candidate_songs(conn, kept, all_suffixes):
+    songs = Song.__table__
+    first_of = {}
+    groups = defaultdict(list)
+    count = conn.execute(select(func.count()).select_from(songs)).scalar()
+    query = select(songs.c.id, songs.c.artist_id, songs.c.title).where(songs.c.artist_id.is_not(None))
+    for song_id, artist_id, title in conn.execute(query):
+        key = hash((kept.get(artist_id, artist_id), normalise_title(title, all_suffixes)))
+        first = first_of.setdefault(key, song_id)
+        if first != song_id:
+            groups[first].append(song_id)
+    return [[first] + others for first, others in groups.items()], count
+
+
+# Function to read the candidate songs back and split them into groups whose full keys match;
+# returns (groups to merge, groups whose BPMs disagree)
+def _song_groups(conn, candidates, kept, titles, all_suffixes):
+    songs = Song.__table__
+    rows = {}
+    ids = [song_id for group in candidates for song_id in group]
+    for chunk in chunked(ids, LOOKUP_CHUNK):
+        query = select(songs.c.id, songs.c.artist_id, songs.c.title, songs.c.bpm, songs.c.release_date)
+        for row in conn.execute(query.where(songs.c.id.in_(chunk))):
+            rows[row.id] = SongRow(*row)
+
+    groups = []
+    conflicts = []
+    for candidate in candidates:
+        by_key = defaultdict(list)
+        for song_id in candidate:
+            row = rows.get(song_id)
+            if row is not None and row.artist_id is not None:
+                artist_id = kept.get(row.artist_id, row.artist_id)
+                by_key[(artist_id, normalise_title(row.title, all_suffixes))].append(row)
+        for (artist_id, key), members in by_key.items():
+            if len(members) < 2:
+                continue
+            # A plain title first (one without a suffix), then one without stray spaces, then the oldest;
+            # what the others have that it lacks is copied over
+            members.sort(key=lambda row: (fold(row.title) != key, not _tidy(row.title), row.id))
+            keep = members[0]
+            bpms = {row.bpm for row in members if row.bpm is not None}
+            if len(bpms) > 1:
+                conflicts.append(SongGroup(titles.get(artist_id), keep, members[1:], None, None))
+                continue
+            release_date = next((row.release_date for row in members if row.release_date is not None), None)
+            groups.append(SongGroup(
+                titles.get(artist_id), keep, members[1:],
+                bpms.pop() if bpms and keep.bpm is None else None,
+                release_date if keep.release_date is None else None,
+            ))
+    for found in (groups, conflicts):
+        found.sort(key=lambda group: (-len(group.merged), group.keep.title.casefold(), group.keep.id))
+    return groups, conflicts
+
+
+# Function to find every group of duplicate artists and songs; changes nothing
+def find_duplicates(bind=None, all_suffixes=False):
+    bind = bind if bind is not None else engine
+    plan = DedupePlan()
+    started = time.perf_counter()
+    normalise_title.cache_clear()
+    with bind.connect() as conn:
+        plan.artist_groups, kept, titles = _artist_groups(conn)
+        plan.artists = len(titles)
+        candidates, plan.songs = _candidate_songs(conn, kept, all_suffixes)
+        plan.song_groups, plan.conflicts = _song_groups(conn, candidates, kept, titles, all_suffixes)
+    plan.elapsed = time.perf_counter() - started
+    return plan
+
+
+# Function to apply a plan in one transaction; returns (artists merged, songs merged)
+def merge(plan, bind=None):
+    bind = bind if bind is not None else engine
+    songs = Song.__table__
+    artists = Artist.__table__
+    scanned = ScannedFile.__table__
+    artist_merges = [{'old': other.id, 'new': group.keep.id} for group in plan.artist_groups for other in group.merged]
+    song_merges = [{'old': other.id, 'new': group.keep.id} for group in plan.song_groups for other in group.merged]
+
+    with bind.begin() as conn:
+        ARTIST_MERGES.create(conn)
+        SONG_MERGES.create(conn)
+        try:
+            if artist_merges:
+                conn.execute(insert(ARTIST_MERGES), artist_merges)
+            if song_merges:
+                conn.execute(insert(SONG_MERGES), song_merges)
+            # Rows kept that another process deleted since the plan was made leave their group as it is
+            conn.execute(delete(ARTIST_MERGES).where(ARTIST_MERGES.c.new.not_in(select(artists.c.id))))
+            conn.execute(delete(SONG_MERGES).where(SONG_MERGES.c.new.not_in(select(songs.c.id))))
+
+            fills = [
+                {'keep_id': group.keep.id, 'fill_bpm': group.bpm, 'fill_date': group.release_date}
+                for group in plan.song_groups if group.bpm is not None or group.release_date is not None
+            ]
+            if fills:
+                conn.execute(
+                    update(songs).where(songs.c.id == bindparam('keep_id')).values(
+                        bpm=func.coalesce(songs.c.bpm, bindparam('fill_bpm')),
+                        release_date=func.coalesce(songs.c.release_date, bindparam('fill_date')),
+                    ),
+                    fills,
+                )
+            conn.execute(
+                update(scanned).where(scanned.c.song_id.in_(select(SONG_MERGES.c.old))).values(
+                    song_id=select(SONG_MERGES.c.new).where(SONG_MERGES.c.old == scanned.c.song_id).scalar_subquery()
+                )
+            )
+            songs_merged = conn.execute(delete(songs).where(songs.c.id.in_(select(SONG_MERGES.c.old)))).rowcount
+
+            genres = [{'keep_id': group.keep.id, 'fill_genre': group.genre} for group in plan.artist_groups if group.genre]
+            if genres:
+                conn.execute(
+                    update(artists).where(artists.c.id == bindparam('keep_id'), artists.c.genre.is_(None))
+                    .values(genre=bindparam('fill_genre')),
+                    genres,
+                )
+            conn.execute(
+                update(songs).where(songs.c.artist_id.in_(select(ARTIST_MERGES.c.old))).values(
+                    artist_id=select(ARTIST_MERGES.c.new).where(ARTIST_MERGES.c.old == songs.c.artist_id).scalar_subquery()
+                )
+            )
+            artists_merged = conn.execute(delete(artists).where(artists.c.id.in_(select(ARTIST_MERGES.c.old)))).rowcount
+        finally:
+            SONG_MERGES.drop(conn)
+            ARTIST_MERGES.drop(conn)
+
+    # Names now belong to other artists, or to none
+    artist_cache.clear()
+    return artists_merged, songs_merged
+
+
+def _describe_song(row):
+    details = ', '.join(part for part in (
+        f"{row.bpm} BPM" if row.bpm is not None else None, row.release_date,
+    ) if part)
+    return f"#{row.id} '{row.title}'" + (f" ({details})" if details else '')
+
+
+# Function to print the groups of a plan (up to `shown` of each kind) and what merging them would do
+def write_plan(plan, out=None, shown=GROUPS_SHOWN):
+    out = out if out is not None else sys.stdout
+    if plan.artist_groups:
+        out.write(f"{counted(len(plan.artist_groups), 'artist')} stored under more than one name:\n")
+        for group in plan.artist_groups[:shown]:
+            others = ', '.join(f"#{other.id} '{other.title}' ({counted(other.songs, 'song')})" for other in group.merged)
+            out.write(f"  keep #{group.keep.id} '{group.keep.title}' ({counted(group.keep.songs, 'song')}), merge {others}\n")
+        if len(plan.artist_groups) > shown:
+            out.write(f"  ... and {len(plan.artist_groups) - shown:,} more\n")
+    if plan.song_groups:
+        out.write(f"{counted(len(plan.song_groups), 'song')} stored more than once (largest groups first):\n")
+        for group in plan.song_groups[:shown]:
+            others = ', '.join(_describe_song(row) for row in group.merged[:5])
+            if len(group.merged) > 5:
+                others += f" and {len(group.merged) - 5} more"
+            out.write(f"  {group.artist or 'Unknown Artist'}: keep {_describe_song(group.keep)}, merge {others}\n")
+        if len(plan.song_groups) > shown:
+            out.write(f"  ... and {len(plan.song_groups) - shown:,} more\n")
+    if plan.conflicts:
+        out.write(f"{counted(len(plan.conflicts), 'song')} stored more than once with different BPMs, left unmerged:\n")
+        for group in plan.conflicts[:shown]:
+            rows = ', '.join(_describe_song(row) for row in [group.keep] + group.merged[:5])
+            if len(group.merged) > 5:
+                rows += f" and {len(group.merged) - 5} more"
+            out.write(f"  {group.artist or 'Unknown Artist'}: {rows}\n")
+        if len(plan.conflicts) > shown:
+            out.write(f"  ... and {len(plan.conflicts) - shown:,} more\n")
+    out.write(
+        f"Checked {counted(plan.songs, 'song')} and {counted(plan.artists, 'artist')} in {plan.elapsed:.2f}s: "
+        f"{counted(plan.artists_merged, 'artist')} and {counted(plan.songs_merged, 'song')} would be merged into others.\n"
+    )
+    out.flush()
@@ -0,0 +1,176 @@
+import csv
+import json
+import os
+import re
+import sys
+from datetime import date
+from functools import lru_cache
+
+from sqlalchemy import select, func
+
+from models import engine, Artist, Song
+from snapshot import SnapshotWriter
+from dates import normalise_release_date
+
+# Streaming catalog export. One SELECT of songs joined with their artist, with every filter
+# in its WHERE clause, is read in fixed-size chunks (yield_per) and each chunk is written
+# before the next is fetched, so memory use does not depend on the size of the catalog.
+
+CHUNK_SIZE = 5000
+
+# Columns of the CSV and JSONL exports; title, artist, genre, release_date and bpm are the
+# columns `cli.py import` reads, so an export can be imported into another database
+FIELDS = ('id', 'title', 'artist', 'genre', 'release_date', 'bpm', 'artist_id')
+
+# Song columns of a snapshot and their types (see snapshot.py)
+SNAPSHOT_COLUMNS = (
+    ('id', 'I'),
+    ('artist_id', 'I'),
+    ('bpm', 'H'),
+    ('title', 'string'),
+    ('release_date', 'string'),
+)
+
+# Artist columns of a snapshot, one row per artist that has exported songs
+SNAPSHOT_ARTIST_COLUMNS = (
+    ('artist.id', 'I'),
+    ('artist.title', 'string'),
+    ('artist.genre', 'string'),
+)
+
+DATE_BOUND = re.compile(r'^\d{4}(-\d{2}(-\d{2})?)?$')
+
+# Release dates normalised per connection; a catalog has far fewer distinct dates than songs
+DATE_CACHE_SIZE = 65536
+
+
+# Function to guess the export format from a file extension
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if extension in ('.snap', '.snapshot'):
+        return 'snapshot'
+    return 'csv'
+
+
+# Function to add released_between(release_date, from, to) to a connection's SQL: 1 if the free-text
+# date, read with the same rules as the stats command (see dates.py), is within the bounds (either
+# may be NULL). Bounds compare as many characters as they have, so a --released-to of 1999 includes
+# 1999-12-31. Dates that can't be read are never within bounds
+def register_functions(conn):
+    normalise = lru_cache(maxsize=DATE_CACHE_SIZE)(normalise_release_date)
+
+    def released_between(text, released_from, released_to):
+        iso = normalise(text)
+        if iso is None:
+            return 0
+        return int((not released_from or iso[:len(released_from)] >= released_from)
+                   and (not released_to or iso[:len(released_to)] <= released_to))
+
+    conn.connection.driver_connection.create_function('released_between', 3, released_between, deterministic=True)
+
+
+# Function to check a --released-from/--released-to value
+def parse_date_bound(text):
+    if text is None:
+        return None
+    if not DATE_BOUND.match(text):
+        raise ValueError(f"Invalid date '{text}' (use YYYY, YYYY-MM or YYYY-MM-DD)")
+    parts = [int(part) for part in text.split('-')]
+    try:
+        date(*parts, *[1] * (3 - len(parts)))
+    except ValueError:
+        raise ValueError(f"Invalid date '{text}' (no such month or day)")
+    return text
+
+
+# Query for the exported songs in ID order; date bounds need register_functions() on the connection
+def export_query(genre=None, bpm_min=None, bpm_max=None, released_from=None, released_to=None):
+    songs = Song.__table__
+    artists = Artist.__table__
+    query = select(
+        songs.c.id, songs.c.title, artists.c.title, artists.c.genre,
+        songs.c.release_date, songs.c.bpm, songs.c.artist_id,
+    ).select_from(songs.outerjoin(artists, songs.c.artist_id == artists.c.id))
+
+    if genre:
+        query = query.where(artists.c.genre.like(f"%{genre}%"))
+    if bpm_min is not None:
+        query = query.where(songs.c.bpm >= bpm_min)
+    if bpm_max is not None:
+        query = query.where(songs.c.bpm <= bpm_max)
+    if released_from or released_to:
+        query = query.where(func.released_between(songs.c.release_date, released_from, released_to) == 1)
+    return query.order_by(songs.c.id)
+
+
+# Generator yielding lists of at most chunk_size rows
+def iter_chunks(query, chunk_size=CHUNK_SIZE, bind=None):
+    bind = bind if bind is not None else engine
+    with bind.connect() as conn:
+        register_functions(conn)
+        result = conn.execution_options(yield_per=chunk_size).execute(query)
+        for partition in result.partitions():
+            yield partition
+
+
+def write_csv(chunks, out):
+    writer = csv.writer(out)
+    writer.writerow(FIELDS)
+    count = 0
+    for chunk in chunks:
+        writer.writerows(chunk)
+        count += len(chunk)
+    return count
+
+
+def write_jsonl(chunks, out):
+    count = 0
+    for chunk in chunks:
+        out.write(''.join(json.dumps(dict(zip(FIELDS, row))) + '\n' for row in chunk))
+        count += len(chunk)
+    return count
+
+
+def write_snapshot(chunks, path):
+    writer = SnapshotWriter(SNAPSHOT_COLUMNS + SNAPSHOT_ARTIST_COLUMNS)
+    # Artists are few next to songs; each one is kept once and written after the songs
+    artists = {}
+    count = 0
+    try:
+        for chunk in chunks:
+            writer.extend('id', [row[0] for row in chunk])
+            writer.extend('artist_id', [row[6] or 0 for row in chunk])
+            writer.extend('bpm', [row[5] or 0 for row in chunk])
+            writer.extend('title', [row[1] for row in chunk])
+            writer.extend('release_date', [row[4] for row in chunk])
+            for row in chunk:
+                if row[6] is not None and row[6] not in artists:
+                    artists[row[6]] = (row[2], row[3])
+            count += len(chunk)
+        writer.extend('artist.id', list(artists))
+        writer.extend('artist.title', [title for title, _ in artists.values()])
+        writer.extend('artist.genre', [genre for _, genre in artists.values()])
+        writer.write(path, count)
+    finally:
+        writer.close()
+    return count
+
+
+# Function to export the filtered catalog to path ('-' for stdout); returns the number of songs
+def export(path, fmt=None, chunk_size=CHUNK_SIZE, bind=None, **filters):
+    fmt = fmt or detect_format(path)
+    chunks = iter_chunks(export_query(**filters), chunk_size, bind)
+    if fmt == 'snapshot':
+        if path == '-':
+            raise ValueError("A snapshot must be written to a file")
+        return write_snapshot(chunks, path)
+
+    write = write_jsonl if fmt == 'jsonl' else write_csv
+    if path == '-':
+        count = write(chunks, sys.stdout)
+        sys.stdout.flush()
+        return count
+    with open(path, 'w', newline='', encoding='utf-8') as out:
+        return write(chunks, out)
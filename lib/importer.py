@@ -0,0 +1,239 @@
+import csv
+import json
+import math
+import os
+import time
+
+from sqlalchemy import select, insert
+
+from models import engine, Artist, Song
+from artist_cache import cache as artist_cache
+
+# Column names accepted for each field in an import file
+FIELD_ALIASES = {
+    'title': ('title', 'song', 'song_title'),
+    'artist': ('artist', 'artist_name', 'artist_title'),
+    'genre': ('genre',),
+    'release_date': ('release_date', 'release date', 'released'),
+    'bpm': ('bpm', 'tempo'),
+}
+
+# Keep IN (...) lists well under SQLite's bound-parameter limit
+LOOKUP_CHUNK = 500
+
+
+class ImportStats:
+    def __init__(self):
+        self.rows = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.artists_created = 0
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def report(self):
+        return (
+            f"Imported {self.inserted} songs from {self.rows} rows in {self.elapsed:.2f}s "
+            f"({self.rows_per_sec:,.0f} rows/sec). "
+            f"Skipped {self.duplicates} duplicates and {self.invalid} invalid rows. "
+            f"Created {self.artists_created} artists."
+        )
+
+
+# Function to guess the file format from its extension
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    return 'csv'
+
+
+# Generator yielding raw dict rows from a CSV or JSONL file; a JSONL line that is not a JSON
+# object yields None, so it is counted as an invalid row instead of stopping the import
+def read_rows(path, fmt=None):
+    fmt = fmt or detect_format(path)
+    # utf-8-sig drops the byte order mark some spreadsheet programs put before the header
+    with open(path, newline='', encoding='utf-8-sig') as handle:
+        if fmt == 'jsonl':
+            for line in handle:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield row if isinstance(row, dict) else None
+        else:
+            yield from csv.DictReader(handle)
+
+
+def _field(row, name):
+    for alias in FIELD_ALIASES[name]:
+        value = row.get(alias)
+        if value not in (None, ''):
+            return value
+    return None
+
+
+# Function to turn a BPM into the nearest whole number; None if it is missing, not a number or not finite
+def _parse_bpm(value):
+    if value is None:
+        return None
+    try:
+        bpm = float(value)
+    except (TypeError, ValueError):
+        return None
+    return round(bpm) if math.isfinite(bpm) else None
+
+
+# Generator turning raw rows into clean records, None for rows that can't be imported: no title or
+# artist (or only whitespace), or a negative BPM
+def normalise_rows(rows):
+    for row in rows:
+        if not isinstance(row, dict):
+            yield None
+            continue
+        row = {str(key).strip().lower(): value for key, value in row.items()}
+        title = _field(row, 'title')
+        artist = _field(row, 'artist')
+        title = '' if title is None else str(title).strip()
+        artist = '' if artist is None else str(artist).strip()
+        bpm = _parse_bpm(_field(row, 'bpm'))
+        if not title or not artist or (bpm is not None and bpm < 0):
+            yield None
+            continue
+        release_date = _field(row, 'release_date')
+        genre = _field(row, 'genre')
+        yield {
+            'title': title,
+            'artist': artist,
+            'genre': None if genre is None else str(genre).strip(),
+            'release_date': None if release_date is None else str(release_date).strip(),
+            'bpm': bpm,
+        }
+
+
+# Generator grouping an iterable into lists of at most size items
+def chunked(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+class BulkImporter:
+    def __init__(self, bind=None, batch_size=1000):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        self.bind = bind if bind is not None else engine
+        self.batch_size = batch_size
+        self.artist_ids = {}     # artist title -> id
+        self.song_keys = set()   # (song title, artist id) already in the database or this import
+        self.loaded_artists = set()  # artist ids whose existing songs are in song_keys
+        # The shared artist cache holds the default database's artists, so it is only used for that one
+        self.shared_cache = artist_cache if self.bind is engine else None
+        self.looked_up = []      # (title, id, genre) read from the database in the current chunk
+        self.stats = ImportStats()
+
+    def run(self, records):
+        for chunk in chunked(records, self.batch_size):
+            valid = [record for record in chunk if record is not None]
+            self.stats.rows += len(chunk)
+            self.stats.invalid += len(chunk) - len(valid)
+            if valid:
+                self.looked_up = []
+                with self.bind.begin() as conn:
+                    self._import_chunk(conn, valid)
+                # Only artists that are committed go into the shared cache
+                if self.shared_cache is not None:
+                    for title, artist_id, genre in self.looked_up:
+                        self.shared_cache.put(title, artist_id, genre)
+        self.stats.finish()
+        return self.stats
+
+    def _import_chunk(self, conn, records):
+        self._resolve_artists(conn, records)
+        self._load_song_keys(conn, {self.artist_ids[record['artist']] for record in records})
+
+        new_songs = []
+        for record in records:
+            artist_id = self.artist_ids[record['artist']]
+            key = (record['title'], artist_id)
+            if key in self.song_keys:
+                self.stats.duplicates += 1
+                continue
+            self.song_keys.add(key)
+            new_songs.append({
+                'title': record['title'],
+                'artist_id': artist_id,
+                'release_date': record['release_date'],
+                'bpm': record['bpm'],
+            })
+
+        if new_songs:
+            conn.execute(insert(Song.__table__), new_songs)
+            self.stats.inserted += len(new_songs)
+
+    # Look up every unseen artist of the chunk in one pass and create the missing ones
+    def _resolve_artists(self, conn, records):
+        genres = {}
+        for record in records:
+            if record['artist'] not in self.artist_ids:
+                genres.setdefault(record['artist'], record['genre'])
+        if self.shared_cache is not None:
+            for title in list(genres):
+                entry = self.shared_cache.peek(title)
+                if entry is not None:
+                    self.artist_ids[title] = entry.id
+                    del genres[title]
+        if not genres:
+            return
+
+        self._select_artist_ids(conn, list(genres))
+        missing = [
+            {'title': title, 'genre': genre}
+            for title, genre in genres.items()
+            if title not in self.artist_ids
+        ]
+        if missing:
+            conn.execute(insert(Artist.__table__), missing)
+            self.stats.artists_created += len(missing)
+            self._select_artist_ids(conn, [artist['title'] for artist in missing])
+
+    def _select_artist_ids(self, conn, titles):
+        table = Artist.__table__
+        for batch in chunked(titles, LOOKUP_CHUNK):
+            query = select(table.c.id, table.c.title, table.c.genre).where(table.c.title.in_(batch))
+            for artist_id, title, genre in conn.execute(query):
+                self.artist_ids[title] = artist_id
+                self.looked_up.append((title, artist_id, genre))
+
+    # Pull in the songs already stored for artists this import has not touched yet
+    def _load_song_keys(self, conn, artist_ids):
+        pending = [artist_id for artist_id in artist_ids if artist_id not in self.loaded_artists]
+        if not pending:
+            return
+        table = Song.__table__
+        for batch in chunked(pending, LOOKUP_CHUNK):
+            query = select(table.c.title, table.c.artist_id).where(table.c.artist_id.in_(batch))
+            self.song_keys.update((title, artist_id) for title, artist_id in conn.execute(query))
+        self.loaded_artists.update(pending)
+
+
+# Function to stream a CSV/JSONL file into the database
+def import_file(path, fmt=None, batch_size=1000, bind=None):
+    importer = BulkImporter(bind=bind, batch_size=batch_size)
+    return importer.run(normalise_rows(read_rows(path, fmt)))
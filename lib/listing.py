@@ -0,0 +1,129 @@
+import os
+import sys
+from itertools import chain
+
+from sqlalchemy import func, false, String
+
+from models import session, Artist, Song
+from artist_cache import cache as artist_cache
+
+# Streaming song listings. Each listing is one column-only SELECT (artist names come from
+# a join, not from lazy-loading song.artist per row), read in chunks with yield_per and
+# written to the output a chunk of lines at a time.
+
+CHUNK_SIZE = 1000
+
+
+# Function to write a count with its noun, e.g. "1 song" or "1,234 songs"
+def counted(number, noun):
+    return f"{number:,} {noun}{'s' if number != 1 else ''}"
+
+
+# Function to decide whether to colour output: never for pipes/files or when NO_COLOR is set
+def use_color(out=None, color=None):
+    if color is not None:
+        return color
+    out = out if out is not None else sys.stdout
+    return out.isatty() and 'NO_COLOR' not in os.environ
+
+
+# Function to build a "Label: {0}, Label: {1}" template once, instead of colouring every value of every row
+def line_template(labels, color):
+    if color:
+        from termcolor import colored
+        fields = [f"{colored(label + ':', 'yellow')} {colored('{' + str(i) + '}', 'green')}" for i, label in enumerate(labels)]
+    else:
+        fields = [f"{label}: {{{i}}}" for i, label in enumerate(labels)]
+    return ', '.join(fields)
+
+
+# Function to write formatted rows in chunks; returns the number of rows written
+def write_lines(rows, format_line, out=None, chunk_size=CHUNK_SIZE):
+    out = out if out is not None else sys.stdout
+    count = 0
+    buffer = []
+    for row in rows:
+        buffer.append(format_line(row))
+        if len(buffer) >= chunk_size:
+            out.write('\n'.join(buffer) + '\n')
+            count += len(buffer)
+            buffer.clear()
+    if buffer:
+        out.write('\n'.join(buffer) + '\n')
+        count += len(buffer)
+    out.flush()
+    return count
+
+
+# Query for (bpm, title, artist, release date, id) ordered by BPM, with the display defaults applied in SQL
+def songs_by_bpm_query():
+    return (
+        session.query(
+            func.coalesce(Song.bpm, 'N/A', type_=String),
+            Song.title,
+            func.coalesce(Artist.title, 'Unknown Artist', type_=String),
+            Song.release_date,
+            Song.id,
+        )
+        .outerjoin(Artist, Song.artist_id == Artist.id)
+        .order_by(Song.bpm)
+    )
+
+
+# Query for (id, title, release date, bpm) of one artist's songs
+def songs_by_artist_query(artist_id):
+    return (
+        session.query(Song.id, Song.title, Song.release_date, Song.bpm)
+        .filter(Song.artist_id == artist_id)
+        .order_by(Song.title)
+    )
+
+
+# Query for (id, title, artist, release date, bpm), optionally for one artist, by title or BPM
+def songs_query(sort='title', artist_title=None):
+    query = (
+        session.query(Song.id, Song.title, Artist.title, Song.release_date, Song.bpm)
+        .outerjoin(Artist, Song.artist_id == Artist.id)
+    )
+    if artist_title:
+        # Filtering on the cached artist ID lets SQLite use the songs' artist_id index
+        artist = artist_cache.get(artist_title)
+        query = query.filter(Song.artist_id == artist.id if artist is not None else false())
+    return query.order_by(Song.bpm if sort == 'bpm' else Song.title)
+
+
+# Function to return (first row, iterator over all rows) so callers can tell an empty listing apart
+def stream(query, chunk_size=CHUNK_SIZE):
+    rows = iter(query.yield_per(chunk_size))
+    first = next(rows, None)
+    if first is None:
+        return None, iter(())
+    return first, chain([first], rows)
+
+
+# Function to write a query's rows under an optional header; returns the number of rows (0 writes nothing)
+def write_listing(query, labels, header=None, out=None, color=None, chunk_size=CHUNK_SIZE):
+    out = out if out is not None else sys.stdout
+    first, rows = stream(query, chunk_size)
+    if first is None:
+        return 0
+    color = use_color(out, color)
+    if header:
+        if color:
+            from termcolor import colored
+            header = colored(header, 'green')
+        out.write(header + '\n')
+    template = line_template(labels, color)
+    return write_lines(rows, lambda row: template.format(*row), out, chunk_size)
+
+
+BPM_LABELS = ('BPM', 'Title', 'Artist', 'Release Date', 'ID')
+ARTIST_SONG_LABELS = ('ID', 'Title', 'Release Date', 'BPM')
+
+
+def write_songs_by_bpm(header=None, out=None, color=None, chunk_size=CHUNK_SIZE):
+    return write_listing(songs_by_bpm_query(), BPM_LABELS, header, out, color, chunk_size)
+
+
+def write_songs_by_artist(artist_id, header=None, out=None, color=None, chunk_size=CHUNK_SIZE):
+    return write_listing(songs_by_artist_query(artist_id), ARTIST_SONG_LABELS, header, out, color, chunk_size)
@@ -0,0 +1,469 @@
+import inquirer
+from termcolor import colored
+import pyfiglet
+from sqlalchemy.exc import IntegrityError
+
+from models import session, session_scope, init_db, Artist, Song
+import operations
+import listing
+import tempo
+import search
+from pagination import KeysetPager
+
+#Function to let the user pick from search hits when an exact lookup failed; returns the chosen id or None
+def choose_suggestion(text, hits, label):
+    if not hits:
+        return None
+    choices = [(label(hit), hit.id) for hit in hits]
+    #Not None: inquirer starts on the choice whose value equals its default, which is None
+    choices.append(("None of these", BACK))
+    choice = inquirer.prompt([
+        inquirer.List('choice', message=colored(f"'{text}' not found. Did you mean", "yellow"), choices=choices)
+    ])['choice']
+    return None if choice == BACK else choice
+
+#Function to find an artist by name (or ID), offering close matches when the name isn't exact
+def resolve_artist(text, allow_id=False):
+    artist = operations.find_artist_by_name_or_id(text) if allow_id else operations.find_artist(text)
+    if artist is not None or not text:
+        return artist
+    hits = search.search_artists(text, limit=5).hits
+    artist_id = choose_suggestion(text, hits, lambda hit: f"{hit.title} ({hit.genre or 'no genre'})")
+    return session.get(Artist, artist_id) if artist_id is not None else None
+
+#Function to find a song by title or ID, offering close matches when the title isn't exact
+def resolve_song(text):
+    song = operations.find_song_by_title_or_id(text)
+    if song is not None or not text:
+        return song
+    hits = search.search_songs(text, limit=5).hits
+    song_id = choose_suggestion(text, hits, lambda hit: f"{hit.title} - {hit.artist or 'Unknown Artist'} (ID {hit.id})")
+    return session.get(Song, song_id) if song_id is not None else None
+
+#Function to find or create an artist
+def find_or_create_artist(title, genre):
+    artist, created = operations.get_or_create_artist(title, genre)
+
+    if created:
+        print(colored(f"Artist '{title}' added with ID {artist.id}", "green"))
+    else:
+        print(colored(f"Artist '{title}' already exists with ID {artist.id}", "red"))
+
+    return artist
+
+#Function to create an artist
+def create_artist():
+    title = input(colored('Artist Name: ', "green"))
+    genre = input(colored('Genre: ', "green"))
+
+    find_or_create_artist(title, genre)
+
+#Function to find or create a song
+def find_or_create_song(title, artist_name, release_date, bpm):
+    artist = operations.find_artist_id(artist_name)
+
+    if artist is None:
+        print(colored(f"Artist '{artist_name}' not found. Song not created", "red"))
+        return
+    song, created = operations.get_or_create_song(title, artist.id, release_date, bpm)
+
+    if created:
+        print(colored(f"Song '{title}' added with ID {song.id}", "green" ))
+    else:
+        print(colored(f"Song '{title}' already exists with ID {song.id}", "red"))
+
+    #Function to create a song
+def create_song():
+    title = input(colored('Song Title: ', 'green'))
+    artist_name = input(colored('Select Artist or enter "new" to create a new artist: ', "green"))
+
+    if artist_name.lower() == "new":
+        #Create a new artist
+        new_artist_name = input(colored('New Artist Name: ', "green"))
+        new_artist_genre = input(colored('Genre: ', "green"))
+
+        if not new_artist_name:
+            print(colored("Artist Name cannot be empty.", "red"))
+            return
+            
+        find_or_create_artist(new_artist_name, new_artist_genre)
+        artist_name = new_artist_name
+    else:
+        artist = resolve_artist(artist_name)
+        if artist is None:
+            print(colored("Invalid Artist Name.", "red"))
+            return
+        artist_name = artist.title
+ 
+    release_date = input(colored ('Release Date: ', "green"))
+    bpm = input(colored('BPM (optional): ', "green"))
+
+    if not title:
+        print(colored("Song Title cannot be empty.", "red"))
+        return 
+        
+    if not release_date:
+        print(colored("Release Date cannot be empty.", "red"))
+        
+    try:
+        bpm = operations.parse_bpm(bpm)
+    except ValueError:
+        print(colored("Invalid BPM input. BPM set to None.", "red"))
+        bpm = None
+        
+    find_or_create_song(title, artist_name, release_date, bpm)
+
+#Function to update an artist
+def update_artist():
+    artist_name = input(colored('Enter Artist Name to update:', "green"))
+    artist = resolve_artist(artist_name)
+
+    if artist:
+        new_title = input('New Artist Name: ')
+        new_genre = input('New Genre: ')
+        old_title = artist.title
+        #Leave a field unchanged when its answer is blank
+        try:
+            operations.update_artist(artist, title=new_title or None, genre=new_genre or None)
+        except IntegrityError:
+            session.rollback()
+            print(colored(f"Artist '{new_title}' already exists", "red"))
+            return
+        print(colored(f"Artist Name {old_title} updated.", "green"))
+    else:
+        print(colored(f"Artist '{artist_name}' not found.", "red"))
+
+
+#FUNCTION TO DELETE AN ARTIST BY NAME OR ID
+def delete_artist():
+    artist_input = input('Enter Artist Name or ID to delete:  ')
+    artist = resolve_artist(artist_input, allow_id=True)
+    
+    if artist:
+        songs = operations.delete_artist(artist)
+        print(f"Artist {artist.title} (ID; {artist.id}) deleted with {songs} song{'s' if songs != 1 else ''}.")
+    else:
+        print(colored(f"Artist '{artist_input}' not found.", "red"))
+
+# Function to delete a song by title or ID
+def delete_song():
+    song_input = input('Enter Song Title or ID to delete: ')
+    song = resolve_song(song_input)
+    
+    if song:
+        operations.delete_song(song)
+        print(f"Song '{song.title}' (ID: {song.id}) deleted.")
+    else:
+        print(colored(f"Song '{song_input}' not found.", "red"))
+
+#Function to list songs by a selected artist
+def list_songs_by_artist(artist):
+    if not listing.write_songs_by_artist(artist.id, header=f"Songs by {artist.title}:", color=COLOR):
+        print(colored(f"No songs found for {artist.title}.", "red"))
+
+#Number of rows per page in the artist and song lists (cli.py menu --page-size)
+PAGE_SIZE = 20
+
+#Colour for the song listings: None colours only when writing to a terminal (cli.py menu --no-color)
+COLOR = None
+
+#Menu entries and their names in the cli.py --profile summary
+OPERATIONS = {
+    'create_artist': 'Add Artist',
+    'create_song': 'Add Song',
+    'update_artist': 'Update Artist',
+    'delete_artist': 'Delete Artist',
+    'delete_song': 'Delete Song',
+    'list_artists': 'List Artists',
+    'list_songs': 'List Songs',
+    'list_songs_by_bpm': 'List Songs by BPM',
+    'tempo_match': 'Tempo Match',
+}
+
+#Navigation entries added under each page; rows are chosen by their id
+NEXT_PAGE = 'next'
+PREV_PAGE = 'prev'
+JUMP = 'jump'
+BACK = 'back'
+
+#Function to show one page and return the chosen id or navigation entry
+def choose_from_page(pager, label, message):
+    choices = [(label(row), row.id) for row in pager.rows]
+    if pager.has_next:
+        choices.append(("-> Next page", NEXT_PAGE))
+    if pager.has_prev:
+        choices.append(("<- Previous page", PREV_PAGE))
+    choices.append(("Jump to...", JUMP))
+    choices.append(("Back", BACK)) #Add a "Back" option
+    return inquirer.prompt([
+        inquirer.List('choice', message=colored(message, "green"), choices=choices)
+    ])['choice']
+
+#Function to move the pager for a navigation entry; returns False for "Back"
+def navigate(pager, choice):
+    if choice == NEXT_PAGE:
+        pager.next()
+    elif choice == PREV_PAGE:
+        pager.prev()
+    elif choice == JUMP:
+        pager.seek(input(colored("Jump to titles starting with: ", "green")))
+    elif choice == BACK:
+        return False
+    return True
+
+# Function to list artists
+def list_artists():
+    query = session.query(Artist.id, Artist.title)
+    pager = KeysetPager(query, Artist.title, Artist.id, PAGE_SIZE)
+    if not pager.first():
+        print(colored("No artists found in the database.", "red"))
+        return
+
+    # Print a bigger "List of Artists" text
+    ascii_banner = pyfiglet.figlet_format("Artists", font = "big")
+    print(colored(ascii_banner, "red"))
+
+    while True:
+        choice = choose_from_page(pager, lambda row: row.title, "Select an artist:")
+        if isinstance(choice, str):
+            if not navigate(pager, choice):
+                return #Go back to the previous menu
+            continue
+
+        artist = session.get(Artist, choice)
+        if artist:
+            #Display artist.id, artist.title, and artist.genre in green and "Id:", "Name:", "Genre:" in green
+            print(
+                f"{colored('Id:', 'yellow')} {colored(artist.id, 'green')}, "
+                f"{colored('Name:', 'yellow')} {colored(artist.title, 'green')}, "
+                f"{colored('Genre:', 'yellow')} {colored(artist.genre, 'green')}"
+            )
+
+            # Option to list songs for the selected artist
+            list_songs_option = input(colored("List songs for this artist? (y/n): ", "green"))
+            if list_songs_option.lower() == "y":
+                list_songs_by_artist(artist)
+        else:
+            print(colored(f"Artist with ID {choice} not found.", "red"))
+
+# Function to list songs alphabetically
+def list_songs():
+    #The artist name comes from the same query, so a page costs one SELECT
+    query = (
+        session.query(Song.id, Song.title, Artist.title.label('artist_title'))
+        .outerjoin(Artist, Song.artist_id == Artist.id)
+    )
+    pager = KeysetPager(query, Song.title, Song.id, PAGE_SIZE)
+    if not pager.first():
+        print(colored("No songs found in the database.", "red"))
+        return
+
+    ascii_banner = pyfiglet.figlet_format("Songs", font="big")
+    print(colored(ascii_banner, "red"))
+
+    while True:
+        choice = choose_from_page(
+            pager,
+            lambda row: f"{row.title} ({row.artist_title or 'Unknown Artist'})",
+            "Select a song:",
+        )
+        if isinstance(choice, str):
+            if not navigate(pager, choice):
+                return #Go back to the previous menu
+            continue
+
+        song = session.get(Song, choice)
+        if song:
+            artist_name = song.artist.title if song.artist else "Unknown Artist"
+            print(
+                colored(f"{colored('ID:', 'yellow')} {colored(song.id, 'green')}, "
+                        f"{colored('Title:', 'yellow')} {colored(song.title, 'green')}, "
+                        f"{colored('Artist:', 'yellow')} {colored(artist_name, 'green')}, "
+                        f"{colored('Release Date:', 'yellow')} {colored(song.release_date, 'green')}, "
+                        f"{colored('BPM:', 'yellow')} {colored(song.bpm, 'green')}",
+                        "green")
+            )
+        else:
+            print(colored(f"Song with ID {choice} not found.", "red"))
+        
+# Function to list songs by BPM
+def list_songs_by_bpm():
+    if not listing.write_songs_by_bpm(header="List of Songs by BPM:", color=COLOR):
+        print(colored("No songs found in the database.", "red"))
+
+
+# Function to list songs that mix well with a target tempo, including half and double time
+def tempo_match():
+    target = input(colored('Target BPM: ', "green"))
+    tolerance = input(colored('Tolerance in % (default 3): ', "green"))
+    genre = input(colored('Genre (optional): ', "green"))
+
+    try:
+        matches = tempo.find_compatible(
+            float(target), tolerance=float(tolerance or 3), genre=genre or None, limit=PAGE_SIZE
+        )
+    except ValueError:
+        print(colored("Invalid BPM or tolerance.", "red"))
+        return
+
+    if not matches:
+        print(colored(f"No songs found near {target} BPM.", "red"))
+        return
+    for match in matches:
+        print(
+            f"{colored('BPM:', 'yellow')} {colored(match.bpm, 'green')} ({match.relation}, {match.deviation:.1f}%), "
+            f"{colored('Title:', 'yellow')} {colored(match.title, 'green')}, "
+            f"{colored('Artist:', 'yellow')} {colored(match.artist, 'green')}, "
+            f"{colored('ID:', 'yellow')} {colored(match.id, 'green')}"
+        )
+
+
+# Function to manage the main menu 
+
+def main():
+    #Every entry runs in its own short-lived session (models.session_scope), so nothing is held open
+    #between entries while the menu waits for input
+    while True:
+        ascii_banner = pyfiglet.figlet_format("SOUNDPLAY")
+        print(colored(ascii_banner, "green"))
+        print(colored("Choose an operations:", "green"))
+        print(colored("1. Add Artist", "light_yellow"))
+        print(colored("2. Add Song", "light_yellow"))
+        print(colored("3. Update Artist", "light_yellow"))
+        print(colored("4. Delete Artist", "light_yellow"))
+        print(colored("5. Delete Song", "light_yellow")) #Add the option to delete a song
+        print(colored("6. Lists", "light_yellow")) #Create a submenu for listing operations
+        print(colored("7. Exit", "light_yellow")) #Update the exit option
+
+        choice = input(colored("Enter your choice (1-7): ", "green"))
+        if choice == '1' :
+            with session_scope():
+                create_artist()
+            ascii_banner = pyfiglet.figlet_format("Artist is Added!! ")
+            print(colored(ascii_banner, "red"))
+        elif choice == '2' :
+            with session_scope():
+                create_song()
+            ascii_banner = pyfiglet.figlet_format("Song is Added!!")
+            print(colored(ascii_banner, "red"))
+        elif choice == '3':
+            with session_scope():
+                update_artist()
+        elif choice == '4':
+            with session_scope():
+                delete_artist()
+        elif choice == '5':
+            with session_scope():
+                delete_song()
+        elif choice == '6':
+            list_operations() # Call the new function for listing operations
+        elif choice == '7':
+            print(r'''
+               ⣀⠀⣘⣩⣅⣤⣤⣄⣠⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠄⢈⣻⣿⣿⢷⣾⣭⣯⣯⡳⣤⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣧⠻⠿⡻⢿⠿⡾⣽⣿⣳⣧⡷⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠈⢰⡶⢈⠐⡀⠀⠀⠁⠀⠀⠀⠈⢿⡽⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢫⢅⢠⣥⣐⡀⠀⠀⠀⠀⠀⠀⢸⢳⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠠⠆⠡⠱⠒⠖⣙⠂⠈⠵⣖⡂⠄⢸⠉⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢻⠆⠀⠰⡈⢆⣑⠂⠀⠀⠀⠀⠀⠏⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢗⠀⠱⡈⢆⠙⠉⠃⠀⠀⠀⠀⠃⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠦⡡⢘⠩⠯⠒⠀⠀⠀⢀⠐⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⡄⢔⡢⢡⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠁⢆⠸⡁⠋⠃⠁⠀⢀⢠⣄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢰⡰⠌⣒⠡⠄⠀⢀⠔⠁⣸⣿⣷⣤⣀⡄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⣐⣤⡄⠀⠀⠘⢚⣒⢂⠇⣜⠒⠉⠀⢀⣿⣿⣿⣿⣿⣿⣿⣷⣶⣶⣦⣔⣀⢄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⡀⢀⢠⣤⣶⣿⣿⣿⡆⠀⠀⠐⡂⠌⠐⠝⠀⠀⠀⢀⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⣤⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⢨⣶⣿⣿⣿⣿⣿⣿⣿⣿⣤⡶⢐⡑⣊⠀⡴⢤⣀⣀⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⢸⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡏⠀⠷⡈⠀⠶⢶⣰⣸⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣆⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⢾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣯⣉⠑⠚⣙⡒⠒⠲⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡁⠀⠀⠀⠀⠀⠀⠀⠀
+⣸⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡷⠶⠀⠀⠤⣬⣍⣹⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣄⠀⠀⠀⠀⠀⠀⠀⠀
+⣸⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣛⣙⠀⢠⠲⠖⠶⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡄⠀⠀⠀⠀⠀⠀⠀
+⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣯⣭⣰⢘⣙⣛⣲⣿⣿⣿⣿⡿⡻⠿⠿⠿⠿⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⣦⡀⠀⠀⠀⠀
+⢿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⠶⢾⡠⢤⣭⣽⣿⣿⣿⣿⡟⣱⠦⠄⠤⠐⡄⠹⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣶⣤⡀⠀
+⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡛⣻⡕⠶⠶⣿⣿⣿⣿⣿⣿⣗⣎⠒⣀⠃⡐⢀⠙⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⠀
+⢻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣭⣹⣏⣛⣛⣿⣿⣿⣿⣿⣿⣿⣞⣍⣉⢉⠰⠀⠠⢹⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠅
+⣽⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠶⢼⡧⢤⣽⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣯⣣⣡⣛⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣅
+⡿⣷⣽⡿⠛⠋⠉⣉⡐⠶⣾⣾⣟⣻⡕⠶⣾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣹⣫⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠗
+⢸⣿⣟⣥⡶⢘⡻⢶⡹⣛⣼⣿⣯⣽⢯⣙⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⠿⠿⣿⣿⣿⣿⣿⣿⡿⠿⠟⠁⠀
+⠘⢟⣾⣿⣿⣚⠷⣳⢳⣫⣽⣿⣛⣾⡷⢾⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣆⠀⠀⠁⠀⠈⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠙⢋⣿⣿⣯⣙⣯⣵⣿⣿⣯⣽⣟⣻⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡯⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠉⠛⢻⠟⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⢸⣿⣿⣿⣟⡟⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⡄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⣡⣿⣿⣿⣿⡗⣮⢻⣽⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣿⣷⠀
+''')
+            ascii_banner = pyfiglet.figlet_format("GoodBye!!")
+            print(colored(ascii_banner, "red"))
+
+            break
+        else:
+            print(colored("Invalid choice. Please enter a valid option (1-7).", "red"))
+
+
+
+    pass
+# Function to manage the list operations submenu
+def list_operations():
+    while True:
+        print(colored("List Operations:", "green"))
+        print(colored("1. Artists", "light_yellow"))
+        print(colored("2. Songs", "light_yellow"))
+        print(colored("3. BPM", "light_yellow"))
+        print(colored("4. Tempo Match", "light_yellow"))
+        print(colored("5. Back to Main Menu", "light_yellow"))
+
+        choice = input(colored("Enter your choice (1-5): ", "green"))
+
+        if choice == '1':
+            with session_scope():
+                list_artists()
+        elif choice == '2':
+            with session_scope():
+                list_songs()
+        elif choice == '3':
+            ascii_banner = pyfiglet.figlet_format("BPM!!")
+            print(colored(ascii_banner, "red"))
+            with session_scope():
+                list_songs_by_bpm()
+        elif choice == '4':
+            with session_scope():
+                tempo_match()
+        elif choice == '5':
+            break
+        else:
+            print(colored("Invalid choice. Please enter a valid option (1-5).", "red"))
+            print(r'''
+                  ⣀⣀⠤⠴⠖⠒⠒⠉⠉⠁⠐⠲⢤⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣀⡤⠖⠊⠉⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠉⠳⣄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⠞⠉⠀⠀⠀⠀⠀⠀⠀⠀⠀⣀⠀⠀⠀⢀⡀⠀⠀⠀⠀⠈⢣⣄⡀⣀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⢀⡴⠋⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠈⠛⠷⢦⣴⣿⣿⣶⣶⣖⣲⣾⣿⣿⡛⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⡰⠋⠀⢀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⡼⠋⠁⠀⠈⠳⡀⠀⠉⢻⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⢀⡞⠁⠀⠀⣾⠃⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⡴⠋⠀⠀⠀⠀⡀⠀⠙⢦⠈⢦⣇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⡰⠋⠀⠀⠀⣰⣋⣤⣤⣄⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⡞⠀⠀⠀⠀⢠⣏⣈⡦⠀⠈⢳⠀⠻⡄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⡄⠀⠀⠀⣠⣶⠟⠁⠀⠀⠀⠉⠛⠦⣄⠀⠀⠀⠀⠀⠘⡇⠀⠀⠀⠀⠀⠀⠉⠀⠀⠀⠀⢣⠀⢹⣄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⢸⡇⠀⠀⢚⣿⣿⠀⠀⠀⠀⠀⠀⠀⠀⠀⡏⠀⠀⠀⠀⠀⠙⢦⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢸⠄⠀⢿⢦⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⢸⠃⠀⢠⡿⠃⠃⡴⠲⡀⠀⠀⠀⠀⠀⣸⠁⠀⢀⣀⣤⣄⣀⣀⡙⠢⣄⣀⠀⠀⠀⠀⢀⣠⠟⠀⠀⠘⡎⢧⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⡆⡇⠀⠀⠈⠀⣼⠀⠓⠚⠀⠀⠀⠀⢀⡴⠃⢀⡴⠋⠁⠈⢧⠀⢠⠟⠑⢶⣍⡙⠛⠛⠛⠉⠀⠀⠀⠀⠀⠸⢼⡇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⣇⡇⠀⠀⠀⣠⠻⣄⠀⠀⠀⠀⢀⣴⠏⠀⡰⢳⡀⠀⠀⠀⢈⡷⠃⠀⠀⠈⢢⣉⣙⣻⠟⠲⣤⠀⠀⠀⠀⠀⢸⡇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⣿⡇⠀⠀⠸⠃⠀⠉⠓⠒⠒⠒⠋⠁⠀⢰⠃⠀⢷⣄⡠⠴⠋⠀⠀⠀⠀⠀⠀⠈⠉⠀⠀⠀⠈⢧⠀⠀⠀⠀⢸⡇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⡏⠇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⡿⠀⠀⡞⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢳⡤⠀⠀⠘⡇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⡇⡆⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⡇⢀⡾⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣀⡶⠏⠀⠀⠀⠀⡇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠃⢻⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢰⠏⠁⠀⠀⠀⠀⠀⠀⠀⣀⣀⡤⠤⠴⠲⠒⠒⠚⠉⠁⠀⠀⠀⠀⠀⠀⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⢰⡘⡇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣼⠀⠀⠀⠀⢀⣠⠴⠖⠋⠉⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠈⢇⢸⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⠇⠀⢀⡠⠖⠋⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠈⠺⣇⠀⠀⠀⠀⠀⠀⠀⠀⢀⡟⢀⠴⠋⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⡇⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⡔⠒⠲⣶⣶⠒⠹⣿⠉⠙⢶⡀
+⠀⠀⠀⢿⣆⠀⠀⠀⠀⠀⠀⠀⡾⠖⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣀⣀⢀⣀⣀⣠⠤⣶⠶⠶⣦⡀⠀⠀⢀⡇⢀⡶⠛⠙⢶⠀⠀⠀⠀⠀⢠⠇⠀⠀⢸⠇⠀⠀⣸⠀⠀⠀⢣
+⠀⠀⠀⢸⡍⠣⡀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⣤⢦⣤⠀⠀⠀⠀⠀⠀⡟⠀⠀⠙⣿⠁⠀⢻⠀⠀⠈⢷⠀⠀⣸⠇⠌⠀⠀⠀⢸⡇⠀⠀⠀⠀⡼⠀⠀⠀⣼⠀⠀⢠⡏⠀⠀⠀⢸
+⠀⠀⠀⠀⠇⠀⠈⠒⢤⣀⠀⠀⠀⠀⠀⢰⠏⠀⠀⠸⡇⠀⠀⠀⠀⢸⡇⠀⠀⠀⡏⠀⠀⣼⠀⠀⠀⢸⡆⣰⠏⠀⡇⠀⠀⠀⢸⡇⠀⠀⢀⡴⠁⠀⠀⣼⠋⠀⣰⠟⠀⠀⠀⠀⡞
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠁⠀⠀⠀⠀⡿⠀⠀⠀⠀⡇⠀⠀⠀⢀⡾⠀⠀⢀⡼⠁⠀⣴⠏⠀⠀⠀⢸⡷⠃⠀⠀⡇⠀⠀⠀⠐⠓⠚⠉⠁⠀⠀⠀⠊⠀⠀⠠⠋⠀⠀⠀⠀⣸⠇
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣗⠀⠀⠀⠀⣧⣤⠤⠖⠛⠁⠀⢠⠛⠁⠀⡼⠋⠀⠀⠀⢀⡞⠁⠀⠀⠀⣧⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣀⣤⠞⠃⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣿⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣠⠞⠀⠀⠀⠀⣠⡿⠀⠀⠀⠀⠀⠀⠀⠀⢀⣤⠂⠀⠀⠀⠀⣠⠞⠋⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣿⡄⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⣴⠟⠁⠀⢀⣠⡴⠚⠁⠀⠀⠀⠀⠀⠀⢀⣤⡶⠛⠁⠀⠀⢀⣠⠞⠁⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⣠⠞⠋⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣀⡴⠛⠂⠒⠒⠈⠉⠀⠀⠀⠀⠀⠀⠀⠀⢀⡴⠟⠁⠀⣀⣤⠶⠞⠉⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠠⠴⠒⠋⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⣀⣠⠶⠚⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢠⠞⢁⠀⠐⠈⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠂⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠠⠶⠛⠉⠁⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⢀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀⠀
+''')
+
+
+if __name__ == '__main__':
+    init_db()
+    main()
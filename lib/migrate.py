@@ -0,0 +1,302 @@
+import sqlite3
+
+from sqlalchemy import inspect
+
+from models import engine, Base, Artist, Song, ScannedFile
+
+
+class MigrationError(Exception):
+    pass
+
+
+def _table_columns(conn, table):
+    return {row[1]: row for row in conn.exec_driver_sql(f"PRAGMA table_info({table})")}
+
+
+def _has_unique_title(conn, table):
+    for index in conn.exec_driver_sql(f"PRAGMA index_list({table})"):
+        name, unique = index[1], index[2]
+        if unique:
+            columns = [row[2] for row in conn.exec_driver_sql(f"PRAGMA index_info('{name}')")]
+            if columns == ['title']:
+                return True
+    return False
+
+
+# Function to copy a table into a fresh copy built from the canonical model definition
+def _rebuild_table(conn, model, select_sql):
+    table = model.__table__
+    old_name = f"{table.name}_old"
+    # Legacy rename leaves foreign keys in other tables pointing at the original name
+    conn.exec_driver_sql("PRAGMA legacy_alter_table = ON")
+    conn.exec_driver_sql(f"ALTER TABLE {table.name} RENAME TO {old_name}")
+    conn.exec_driver_sql("PRAGMA legacy_alter_table = OFF")
+    # Indexes move with the renamed table, drop them so the new table can reuse the names
+    for index in table.indexes:
+        conn.exec_driver_sql(f"DROP INDEX IF EXISTS {index.name}")
+    table.create(conn)
+    conn.exec_driver_sql(f"INSERT INTO {table.name} {select_sql.format(old=old_name)}")
+    conn.exec_driver_sql(f"DROP TABLE {old_name}")
+
+
+# Migration 1: bring databases created by the old OneToMany.py schema in line with models.py
+def canonical_tables(conn):
+    existing = inspect(conn).get_table_names()
+    if 'artist_table' not in existing or 'songs_table' not in existing:
+        Base.metadata.create_all(conn)
+        return
+
+    artist_columns = _table_columns(conn, 'artist_table')
+    if not artist_columns['title'][3] or not _has_unique_title(conn, 'artist_table'):
+        duplicate = conn.exec_driver_sql(
+            "SELECT title FROM artist_table GROUP BY title HAVING COUNT(*) > 1 OR title IS NULL LIMIT 1"
+        ).first()
+        if duplicate:
+            raise MigrationError(
+                f"artist_table has a missing or duplicated title ({duplicate[0]!r}); fix it before migrating"
+            )
+        _rebuild_table(conn, Artist, "SELECT id, title, genre FROM {old}")
+
+    song_columns = _table_columns(conn, 'songs_table')
+    if not song_columns['title'][3]:
+        # Old rows may have no title; keep them rather than losing data
+        _rebuild_table(
+            conn, Song,
+            "SELECT id, COALESCE(title, 'Untitled'), release_date, bpm, artist_id FROM {old}",
+        )
+
+
+def _create_indexes(conn, *names):
+    for index in Song.__table__.indexes:
+        if index.name in names:
+            index.create(conn, checkfirst=True)
+
+
+# Migration 2: indexes for song lookups by title, artist and BPM
+def song_indexes(conn):
+    _create_indexes(conn, 'ix_songs_table_artist_id', 'ix_songs_table_title_artist_id', 'ix_songs_table_bpm')
+
+
+# Migration 3: index on songs_table(title) for keyset pagination on (title, id)
+def song_title_index(conn):
+    _create_indexes(conn, 'ix_songs_table_title')
+
+
+# Migration 4: FTS5 search tables over song titles, artist names and genres, kept in sync by triggers.
+# songs_fts copies the artist name and genre onto every song so one MATCH covers all three.
+# No prefix= indexes: they made every song insert about a third slower for little gain on queries.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE songs_fts USING fts5(title, artist, genre, tokenize = 'unicode61 remove_diacritics 2');
+CREATE VIRTUAL TABLE artists_fts USING fts5(title, genre, tokenize = 'unicode61 remove_diacritics 2');
+CREATE VIRTUAL TABLE songs_fts_vocab USING fts5vocab(songs_fts, 'row');
+CREATE VIRTUAL TABLE artists_fts_vocab USING fts5vocab(artists_fts, 'row');
+"""
+
+SONG_SEARCH_TRIGGERS = """
+CREATE TRIGGER songs_fts_insert AFTER INSERT ON songs_table BEGIN
+    INSERT INTO songs_fts (rowid, title, artist, genre)
+    VALUES (new.id, new.title,
+            (SELECT title FROM artist_table WHERE id = new.artist_id),
+            (SELECT genre FROM artist_table WHERE id = new.artist_id));
+END;
+CREATE TRIGGER songs_fts_delete AFTER DELETE ON songs_table BEGIN
+    DELETE FROM songs_fts WHERE rowid = old.id;
+END;
+CREATE TRIGGER songs_fts_update AFTER UPDATE OF id, title, artist_id ON songs_table BEGIN
+    DELETE FROM songs_fts WHERE rowid = old.id;
+    INSERT INTO songs_fts (rowid, title, artist, genre)
+    VALUES (new.id, new.title,
+            (SELECT title FROM artist_table WHERE id = new.artist_id),
+            (SELECT genre FROM artist_table WHERE id = new.artist_id));
+END;
+"""
+
+ARTIST_SEARCH_TRIGGERS = """
+CREATE TRIGGER artists_fts_insert AFTER INSERT ON artist_table BEGIN
+    INSERT INTO artists_fts (rowid, title, genre) VALUES (new.id, new.title, new.genre);
+END;
+CREATE TRIGGER artists_fts_delete AFTER DELETE ON artist_table BEGIN
+    DELETE FROM artists_fts WHERE rowid = old.id;
+END;
+CREATE TRIGGER artists_fts_update AFTER UPDATE OF id, title, genre ON artist_table BEGIN
+    DELETE FROM artists_fts WHERE rowid = old.id;
+    INSERT INTO artists_fts (rowid, title, genre) VALUES (new.id, new.title, new.genre);
+    UPDATE songs_fts SET artist = new.title, genre = new.genre
+    WHERE rowid IN (SELECT id FROM songs_table WHERE artist_id = new.id);
+END;
+"""
+
+SEARCH_BACKFILL = """
+INSERT INTO songs_fts (rowid, title, artist, genre)
+SELECT s.id, s.title, a.title, a.genre FROM songs_table s LEFT JOIN artist_table a ON a.id = s.artist_id;
+INSERT INTO artists_fts (rowid, title, genre) SELECT id, title, genre FROM artist_table;
+"""
+
+
+# Function to run a script one statement at a time inside the migration's transaction
+# (executescript would commit it); trigger bodies contain ';' so split on complete statements
+def _run_script(conn, script):
+    statement = ''
+    for line in script.splitlines(keepends=True):
+        statement += line
+        if sqlite3.complete_statement(statement):
+            conn.exec_driver_sql(statement)
+            statement = ''
+
+
+def search_tables(conn):
+    _run_script(conn, SEARCH_SCHEMA + SONG_SEARCH_TRIGGERS + ARTIST_SEARCH_TRIGGERS + SEARCH_BACKFILL)
+
+
+# Migration 5: the scan command's record of the audio files it has analysed
+def scanned_files(conn):
+    ScannedFile.__table__.create(conn, checkfirst=True)
+
+
+# Function to return (referenced table, ON DELETE action) of the foreign key on table.column, or None
+def _foreign_key(conn, table, column):
+    for row in conn.exec_driver_sql(f"PRAGMA foreign_key_list({table})"):
+        if row[3] == column:
+            return row[2], row[6]
+    return None
+
+
+# Migration 6: foreign keys with ON DELETE rules (enforced by the foreign_keys PRAGMA in models.py):
+# deleting an artist deletes their songs, and deleting a song unlinks the files scanned as it.
+# SQLite can't add a constraint to a table, so both tables are rebuilt. Songs left behind by
+# artists deleted before this keep their data, without the dangling artist ID
+def foreign_keys(conn):
+    if _foreign_key(conn, 'songs_table', 'artist_id') != ('artist_table', 'CASCADE'):
+        _rebuild_table(conn, Song, "SELECT id, title, release_date, bpm, artist_id FROM {old}")
+        # The search triggers were dropped with the old table; the search rows kept their song IDs
+        _run_script(conn, SONG_SEARCH_TRIGGERS)
+    if _foreign_key(conn, 'scanned_files', 'song_id') != ('songs_table', 'SET NULL'):
+        _rebuild_table(conn, ScannedFile, "SELECT path, size, mtime_ns, song_id, bpm, error FROM {old}")
+    # The update trigger clears the artist of these songs in the search table too
+    conn.exec_driver_sql("UPDATE songs_table SET artist_id = NULL WHERE artist_id NOT IN (SELECT id FROM artist_table)")
+    conn.exec_driver_sql("UPDATE scanned_files SET song_id = NULL WHERE song_id NOT IN (SELECT id FROM songs_table)")
+
+
+# Migration 7: widen ix_songs_table_bpm from (bpm) to (bpm, id, artist_id), a covering index for
+# the playlist command's tempo index; the (bpm, id) order the tempo queries walk stays the same
+def covering_bpm_index(conn):
+    columns = [row[2] for row in conn.exec_driver_sql("PRAGMA index_info(ix_songs_table_bpm)")]
+    if columns != ['bpm', 'id', 'artist_id']:
+        conn.exec_driver_sql("DROP INDEX IF EXISTS ix_songs_table_bpm")
+        _create_indexes(conn, 'ix_songs_table_bpm')
+
+
+# Ordered list of (version, description, function); never reorder or renumber
+MIGRATIONS = [
+    (1, 'canonical artist_table/songs_table schema', canonical_tables),
+    (2, 'indexes on songs_table artist_id, (title, artist_id) and bpm', song_indexes),
+    (3, 'index on songs_table title for keyset pagination', song_title_index),
+    (4, 'FTS5 search over song titles, artist names and genres', search_tables),
+    (5, 'scanned_files table for resumable audio folder scans', scanned_files),
+    (6, 'foreign keys: cascade song deletes from artists, unlink scanned files from deleted songs', foreign_keys),
+    (7, 'covering index on songs_table (bpm, id, artist_id) for playlists', covering_bpm_index),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    return conn.exec_driver_sql("PRAGMA user_version").scalar()
+
+
+# Function to apply every migration newer than the database's user_version
+def migrate(bind=None):
+    bind = bind if bind is not None else engine
+    applied = []
+    # Up-to-date databases (the usual case on start-up) only need this read
+    with bind.connect() as conn:
+        if current_version(conn) == LATEST_VERSION:
+            return applied
+    with bind.connect() as conn:
+        # Tables are rebuilt with foreign keys off, as SQLite requires: with them on, renaming or
+        # dropping a table rewrites or cascades into the tables that refer to it. The setting can
+        # only change outside a transaction, and foreign_key_check below vouches for the result
+        enforced = conn.exec_driver_sql("PRAGMA foreign_keys").scalar()
+        conn.exec_driver_sql("PRAGMA foreign_keys = OFF")
+        conn.commit()
+        try:
+            with conn.begin():
+                # pysqlite runs DDL outside of transactions unless one is opened explicitly;
+                # doing so makes a failed migration roll back completely
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+                version = current_version(conn)
+                if version > LATEST_VERSION:
+                    raise MigrationError(
+                        f"Database is at version {version}, newer than this code ({LATEST_VERSION})"
+                    )
+                for number, description, step in MIGRATIONS:
+                    if number <= version:
+                        continue
+                    step(conn)
+                    # PRAGMA does not accept bound parameters
+                    conn.exec_driver_sql(f"PRAGMA user_version = {int(number)}")
+                    applied.append((number, description))
+                problem = conn.exec_driver_sql("PRAGMA foreign_key_check").first()
+                if problem:
+                    raise MigrationError(f"A row of {problem[0]} refers to a missing row of {problem[2]}")
+        finally:
+            conn.exec_driver_sql(f"PRAGMA foreign_keys = {int(enforced)}")
+            conn.commit()
+    return applied
+
+
+# The queries behind the menu and the importer; each must be served by an index
+HOT_QUERIES = [
+    ('artist by title', "SELECT * FROM artist_table WHERE title = ?", ('x',)),
+    ('artists ordered by title', "SELECT * FROM artist_table ORDER BY title", ()),
+    ('song by title', "SELECT * FROM songs_table WHERE title = ?", ('x',)),
+    ('songs ordered by title', "SELECT * FROM songs_table ORDER BY title", ()),
+    ('songs by artist', "SELECT * FROM songs_table WHERE artist_id = ?", (1,)),
+    ('song by title and artist', "SELECT * FROM songs_table WHERE title = ? AND artist_id = ?", ('x', 1)),
+    ('songs ordered by bpm', "SELECT * FROM songs_table ORDER BY bpm", ()),
+    ('tempo band', "SELECT id FROM songs_table WHERE bpm >= ? AND bpm <= ? ORDER BY bpm, id LIMIT 50", (120, 128)),
+    ('tempo band downwards', "SELECT id FROM songs_table WHERE bpm < ? AND bpm >= ? ORDER BY bpm DESC, id DESC LIMIT 50", (124, 120)),
+    ('artist page', "SELECT id, title FROM artist_table WHERE (title, id) > (?, ?) ORDER BY title, id LIMIT 21", ('x', 1)),
+    ('song page', "SELECT id, title FROM songs_table WHERE (title, id) > (?, ?) ORDER BY title, id LIMIT 21", ('x', 1)),
+    ('previous song page', "SELECT id, title FROM songs_table WHERE (title, id) < (?, ?) ORDER BY title DESC, id DESC LIMIT 21", ('x', 1)),
+    ('scanned files in a folder', "SELECT path, size, mtime_ns FROM scanned_files WHERE path >= ? AND path < ?", ('/a/', '/a0')),
+    ('scanned files of a song', "SELECT path FROM scanned_files WHERE song_id = ?", (1,)),
+    ('tempo index', "SELECT bpm, id, artist_id FROM songs_table WHERE bpm >= ? AND bpm <= ?", (120, 128)),
+    ('tempo sample', "SELECT id, artist_id FROM songs_table WHERE bpm = ? AND id >= ? ORDER BY id LIMIT 220", (120, 1)),
+]
+
+
+# Function to copy the schema (no rows, no statistics) into an in-memory database
+def _schema_probe(bind):
+    with bind.connect() as conn:
+        statements = [row[0] for row in conn.exec_driver_sql(
+            "SELECT sql FROM sqlite_master WHERE sql IS NOT NULL AND name NOT LIKE 'sqlite_%' ORDER BY rowid"
+        )]
+    probe = sqlite3.connect(':memory:')
+    for statement in statements:
+        try:
+            probe.execute(statement)
+        except sqlite3.OperationalError as error:
+            # Shadow tables are created by their virtual table's own statement
+            if 'already exists' not in str(error):
+                raise
+    return probe
+
+
+# Function to return (name, plan detail) for every hot query that scans a table or sorts in a temp b-tree.
+# Plans are taken from an empty copy of the schema so the answer depends on the indexes, not on how
+# many rows the database happens to hold.
+def check_query_plans(bind=None, queries=HOT_QUERIES):
+    bind = bind if bind is not None else engine
+    probe = _schema_probe(bind)
+    problems = []
+    try:
+        for name, sql, params in queries:
+            for row in probe.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+                detail = row[-1]
+                full_scan = detail.startswith('SCAN') and 'INDEX' not in detail
+                if full_scan or 'TEMP B-TREE' in detail:
+                    problems.append((name, detail))
+    finally:
+        probe.close()
+    return problems
@@ -0,0 +1,141 @@
+import os
+from contextlib import contextmanager
+
+from sqlalchemy import create_engine, event, Column, Integer, String, Text, ForeignKey, Index
+from sqlalchemy.orm import sessionmaker, relationship, scoped_session
+from sqlalchemy.orm import declarative_base
+
+#SOUNDPLAY_DATABASE_URL (or `cli.py --db`) points the tool at another database file
+DATABASE_URL = os.environ.get('SOUNDPLAY_DATABASE_URL', 'sqlite:///songdatabase.db')
+
+#PRAGMAs run on every new connection. WAL lets readers carry on while a writer commits
+#(and a writer proceed while readers are open), and with WAL synchronous=normal is still safe
+#against corruption while only syncing at checkpoints. cache_size is negative for KiB.
+#foreign_keys makes SQLite enforce the foreign keys below and run their ON DELETE rules
+#SOUNDPLAY_SQLITE_PRAGMAS (or `cli.py --pragma`) overrides them, e.g. "journal_mode=delete,synchronous=full"
+SQLITE_PRAGMAS = {
+    'journal_mode': 'wal',
+    'synchronous': 'normal',
+    'cache_size': -65536,
+    'mmap_size': 268435456,
+    'temp_store': 'memory',
+    'foreign_keys': 'on',
+}
+
+#Seconds a connection waits for another one's write lock before "database is locked";
+#SOUNDPLAY_BUSY_TIMEOUT (or `cli.py --busy-timeout`) overrides it
+BUSY_TIMEOUT = 10.0
+
+#Function to parse "name=value,name=value" PRAGMA settings
+def parse_pragmas(text):
+    pragmas = {}
+    for item in filter(None, (part.strip() for part in text.split(','))):
+        name, separator, value = item.partition('=')
+        if not separator or not name.strip().isidentifier() or not value.strip().replace('-', '').isalnum():
+            raise ValueError(f"Invalid PRAGMA setting '{item}' (expected name=value)")
+        pragmas[name.strip().lower()] = value.strip()
+    return pragmas
+
+#Function to create an engine for url with the given PRAGMAs (merged over SQLITE_PRAGMAS) and busy timeout
+def make_engine(url=None, pragmas=None, busy_timeout=None):
+    url = url or DATABASE_URL
+    settings = dict(SQLITE_PRAGMAS)
+    settings.update(pragmas if pragmas is not None else parse_pragmas(os.environ.get('SOUNDPLAY_SQLITE_PRAGMAS', '')))
+    if busy_timeout is None:
+        busy_timeout = float(os.environ.get('SOUNDPLAY_BUSY_TIMEOUT', BUSY_TIMEOUT))
+
+    #pysqlite's timeout is SQLite's busy timeout
+    new_engine = create_engine(url, connect_args={'timeout': busy_timeout})
+
+    @event.listens_for(new_engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in settings.items():
+            #The journal mode is stored in the database file, and changing it needs a lock that other
+            #processes may be holding, so it is only set when it differs
+            if name == 'journal_mode' and cursor.execute("PRAGMA journal_mode").fetchone()[0] == str(value).lower():
+                continue
+            #PRAGMA does not accept bound parameters; parse_pragmas only lets names and plain values through
+            cursor.execute(f"PRAGMA {name} = {value}")
+        cursor.close()
+
+    return new_engine
+
+#Create the database engine and session
+engine = make_engine()
+Session = sessionmaker(bind=engine)
+
+#`session` stands in for the current thread's Session, so modules can keep using it directly.
+#Each operation should run inside session_scope(), which gives it a fresh session and then
+#commits or rolls back and closes it, instead of one session living for the whole process
+session = scoped_session(Session)
+
+#Context manager for one short-lived unit of work on the scoped session
+@contextmanager
+def session_scope():
+    try:
+        yield session
+        session.commit()
+    except BaseException:
+        session.rollback()
+        raise
+    finally:
+        session.remove()
+
+#Create the base class for declarative models
+Base = declarative_base()
+
+#Define the Artist and Song classes
+class Artist(Base):
+    __tablename__ = 'artist_table'
+    id = Column(Integer, primary_key=True)
+    title = Column(String, unique=True, nullable=False)
+    genre = Column(String)
+    #Deleting an artist deletes their songs; the database does it (see Song.artist_id), so the
+    #songs are not loaded first
+    songs = relationship('Song' ,backref='artist', cascade='all', passive_deletes=True)
+
+class Song(Base):
+    __tablename__ = 'songs_table'
+    id = Column(Integer, primary_key=True)
+    title = Column(String, nullable=False)
+    release_date = Column(Text)
+    bpm = Column(Integer)
+    artist_id = Column(Integer, ForeignKey('artist_table.id', ondelete='CASCADE'))
+
+    #Indexes for the lookups and sort orders the CLI uses; the title index is
+    #(title, rowid) underneath, which is exactly the keyset order of the list views.
+    #The BPM index also carries id and artist_id, so the playlist command reads a tempo
+    #range from the index alone (see playlist.py) and the (bpm, id) order is unchanged
+    __table_args__ = (
+        Index('ix_songs_table_artist_id', 'artist_id'),
+        Index('ix_songs_table_title_artist_id', 'title', 'artist_id'),
+        Index('ix_songs_table_bpm', 'bpm', 'id', 'artist_id'),
+        Index('ix_songs_table_title', 'title'),
+    )
+
+#One row per audio file seen by `cli.py scan` (see scanner.py), so a later scan can skip files whose
+#size and modification time haven't changed. song_id is the song the file was matched to, if any,
+#and becomes NULL if that song is deleted
+class ScannedFile(Base):
+    __tablename__ = 'scanned_files'
+    path = Column(String, primary_key=True)
+    size = Column(Integer, nullable=False)
+    mtime_ns = Column(Integer, nullable=False)
+    song_id = Column(Integer, ForeignKey('songs_table.id', ondelete='SET NULL'))
+    bpm = Column(Integer)
+    error = Column(Text)
+
+    #Deleting a song looks up the files scanned as it
+    __table_args__ = (
+        Index('ix_scanned_files_song_id', 'song_id'),
+    )
+
+#Function to create the tables if they don't exist and apply any pending migrations (see migrate.py);
+#called once per run instead of at import time
+def init_db(bind=None):
+    from migrate import migrate
+
+    bind = bind if bind is not None else engine
+    Base.metadata.create_all(bind)
+    migrate(bind)
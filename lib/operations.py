@@ -0,0 +1,125 @@
+from sqlalchemy import func
+
+from models import session, Artist, Song
+from artist_cache import cache as artist_cache
+
+# Database operations shared by the interactive menu and the scriptable subcommands.
+# They never print or prompt; callers decide how to report the result.
+#
+# Artists are resolved by name through the artist cache (see artist_cache.py), and the
+# operations that create, rename or delete an artist keep it up to date once they commit.
+
+
+# Function to return the cached (id, genre) of the artist with this exact name, or None;
+# costs no SELECT once the artist is cached
+def find_artist_id(title):
+    return artist_cache.get(title)
+
+
+# Function to find an artist by exact name
+def find_artist(title):
+    entry = artist_cache.get(title)
+    if entry is None:
+        return None
+    artist = session.get(Artist, entry.id)
+    if artist is not None and artist.title == title:
+        return artist
+    # Renamed or deleted by another process since it was cached
+    artist_cache.discard(title)
+    entry = artist_cache.get(title)
+    return session.get(Artist, entry.id) if entry is not None else None
+
+
+# Function to find an artist by ID (all digits) or by name
+def find_artist_by_name_or_id(text):
+    if text.isdigit():
+        return session.query(Artist).filter(Artist.id == int(text)).first()
+    return find_artist(text)
+
+
+# Function to find a song by ID (all digits) or by title
+def find_song_by_title_or_id(text):
+    if text.isdigit():
+        return session.query(Song).filter(Song.id == int(text)).first()
+    return session.query(Song).filter(Song.title == text).first()
+
+
+# Function to return (artist, created)
+def get_or_create_artist(title, genre):
+    artist = find_artist(title)
+    if artist is not None:
+        return artist, False
+
+    artist = Artist(title=title, genre=genre)
+    session.add(artist)
+    session.commit()
+    artist_cache.put(artist.title, artist.id, artist.genre)
+    return artist, True
+
+
+# Function to return (song, created) for a song by an existing artist, given the artist's ID
+def get_or_create_song(title, artist_id, release_date, bpm):
+    song = session.query(Song).filter(Song.title == title, Song.artist_id == artist_id).first()
+    if song is not None:
+        return song, False
+
+    song = Song(
+        title=title,
+        artist_id=artist_id,
+        release_date=release_date,
+        bpm=bpm
+    )
+    session.add(song)
+    session.commit()
+    return song, True
+
+
+# Function to rename an artist and/or change their genre; None leaves a field unchanged
+def update_artist(artist, title=None, genre=None):
+    old_title = artist.title
+    if title is not None:
+        artist.title = title
+    if genre is not None:
+        artist.genre = genre
+    # Read before committing, which expires the attributes
+    entry = (artist.title, artist.id, artist.genre)
+    session.commit()
+    artist_cache.discard(old_title)
+    artist_cache.put(*entry)
+    return artist
+
+
+# Function to change a song's title, release date and/or BPM; None leaves a field unchanged
+def update_song(song, title=None, release_date=None, bpm=None):
+    if title is not None:
+        song.title = title
+    if release_date is not None:
+        song.release_date = release_date
+    if bpm is not None:
+        song.bpm = bpm
+    session.commit()
+    return song
+
+
+# Function to delete an artist and, through the foreign key's cascade, their songs; returns the number of songs deleted
+def delete_artist(artist):
+    title = artist.title
+    songs = session.query(func.count(Song.id)).filter(Song.artist_id == artist.id).scalar()
+    session.delete(artist)
+    session.commit()
+    artist_cache.discard(title)
+    return songs
+
+
+def delete_song(song):
+    session.delete(song)
+    session.commit()
+
+
+# Function to turn BPM text into an int; empty means no BPM, anything else non-numeric is an error
+def parse_bpm(text):
+    if text is None or text == '':
+        return None
+    if not str(text).isdigit():
+        raise ValueError(f"Invalid BPM '{text}'")
+    return int(text)
@@ -0,0 +1,86 @@
+from sqlalchemy import tuple_
+
+
+# Keyset (seek) pagination over a query ordered by (title, id).
+# Each page is fetched with WHERE (title, id) > (last title, last id) ... LIMIT page_size + 1,
+# so only one page of rows is held in memory and every page costs the same no matter how
+# deep into the catalog it is. The query must select the title and id columns.
+class KeysetPager:
+    def __init__(self, query, title_column, id_column, page_size=20):
+        if page_size < 1:
+            raise ValueError("page_size must be at least 1")
+        self.query = query
+        self.title_column = title_column
+        self.id_column = id_column
+        self.page_size = page_size
+        self.rows = []
+        self.has_next = False
+        self.has_prev = False
+
+    def _key(self, row):
+        return (row._mapping[self.title_column], row._mapping[self.id_column])
+
+    def _forward(self, condition):
+        query = self.query
+        if condition is not None:
+            query = query.filter(condition)
+        return query.order_by(self.title_column, self.id_column).limit(self.page_size + 1).all()
+
+    def _backward(self, condition):
+        query = self.query
+        if condition is not None:
+            query = query.filter(condition)
+        rows = query.order_by(self.title_column.desc(), self.id_column.desc()).limit(self.page_size + 1).all()
+        rows.reverse()
+        return rows
+
+    def _exists_before(self, key):
+        query = self.query.filter(tuple_(self.title_column, self.id_column) < key)
+        return query.order_by(self.title_column.desc(), self.id_column.desc()).limit(1).first() is not None
+
+    def _load_forward(self, condition, has_prev):
+        rows = self._forward(condition)
+        self.has_next = len(rows) > self.page_size
+        self.rows = rows[:self.page_size]
+        self.has_prev = has_prev
+        return self.rows
+
+    # Function to load the first page
+    def first(self):
+        return self._load_forward(None, False)
+
+    # Function to load the page after a (title, id) key, e.g. one handed out as a cursor
+    def after(self, key):
+        return self._load_forward(tuple_(self.title_column, self.id_column) > tuple(key), True)
+
+    # Function to load the page after the current one
+    def next(self):
+        if not self.rows or not self.has_next:
+            return self.rows
+        key = self._key(self.rows[-1])
+        return self._load_forward(tuple_(self.title_column, self.id_column) > key, True)
+
+    def _load_backward(self, condition):
+        rows = self._backward(condition)
+        self.has_prev = len(rows) > self.page_size
+        self.rows = rows[-self.page_size:]
+        self.has_next = condition is not None
+        return self.rows
+
+    # Function to load the page before the current one
+    def prev(self):
+        if not self.rows or not self.has_prev:
+            return self.rows
+        return self._load_backward(tuple_(self.title_column, self.id_column) < self._key(self.rows[0]))
+
+    # Function to load the last page
+    def last(self):
+        return self._load_backward(None)
+
+    # Function to load the page starting at the first title >= prefix (the last page if there is none)
+    def seek(self, prefix):
+        rows = self._load_forward(self.title_column >= prefix, False)
+        if not rows:
+            return self.last()
+        self.has_prev = self._exists_before(self._key(rows[0]))
+        return rows
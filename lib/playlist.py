@@ -0,0 +1,281 @@
+import json
+import random
+import time
+from collections import namedtuple, deque, Counter
+
+import numpy as np
+from sqlalchemy import MetaData, Table, Column, Integer, select, insert, func, or_
+
+from models import engine, Artist, Song, ScannedFile
+from stats import parse_numbers
+
+# Tempo-smooth playlists for `cli.py playlist`: a set of tracks that moves from a start tempo to
+# an end tempo, each track within max_step BPM of the one before, and no artist repeated within
+# the last artist_gap tracks.
+#
+# The songs in the tempo range are read into a TempoIndex, three NumPy arrays (BPM, song ID,
+# artist ID) sorted by BPM, with the start of each distinct tempo's run of songs. A set of 100
+# tracks needs only a few songs of each tempo, while a large catalog has tens of thousands, so
+# each tempo is sampled: one short read of the covering index on songs_table (bpm, id,
+# artist_id) from a random song ID onwards, wrapping around to the lowest IDs. Only if no set
+# can be built from the sample is every song in the range read, straight from the same index
+# as two group_concat() strings that NumPy parses in one call each.
+#
+# The set is built greedily: track i aims for the tempo on the straight line from start to end,
+# and takes a random unused song of the nearest tempo that is no more than max_step from the
+# previous track and can still reach the end tempo in the tracks that are left. Start and end are
+# targets, not exact values: the first track is within max_step of start and the last within
+# max_step of end, so fractional tempos work with the whole-number BPMs in the catalog. Only the
+# tracks picked are read back with their titles, artists and scanned files.
+
+DEFAULT_LENGTH = 100
+DEFAULT_MAX_STEP = 3.0
+DEFAULT_ARTIST_GAP = 10
+
+# Songs sampled per tempo for each track of the set (and each artist kept out by the artist gap)
+SAMPLE_PER_TRACK = 2
+
+# Artists of the genres asked for, which the sampling reads join against
+PLAYLIST_ARTISTS = Table(
+    'playlist_artists', MetaData(),
+    Column('id', Integer, primary_key=True),
+    prefixes=['TEMPORARY'],
+)
+
+Track = namedtuple('Track', 'id title artist genre bpm path')
+
+# The tracks in order, the number of songs in the index, and the time spent reading the index and
+# then picking the tracks (including reading them back)
+Playlist = namedtuple('Playlist', 'start end max_step tracks candidates index_ms search_ms')
+
+
+class TempoIndex:
+    # bpm, song_ids and artist_ids are arrays of the same length; missing artists are 0. complete is
+    # False when some tempos hold only a sample of their songs
+    def __init__(self, bpm, song_ids, artist_ids, complete=True):
+        self.complete = complete
+        # Rows read from the BPM index are already in (bpm, id) order; checking is much cheaper than sorting
+        steps = np.diff(bpm)
+        if not (np.all(steps >= 0) and np.all(np.diff(song_ids)[steps == 0] > 0)):
+            order = np.lexsort((song_ids, bpm))
+            bpm, song_ids, artist_ids = bpm[order], song_ids[order], artist_ids[order]
+        self.bpm = bpm.astype(np.uint16)
+        self.song_ids = song_ids.astype(np.uint32)
+        self.artist_ids = artist_ids.astype(np.uint32)
+        # Distinct tempos, and where each one's songs start (plus the end of the last run)
+        self.tempos, starts = np.unique(self.bpm, return_index=True)
+        self.bounds = np.append(starts, len(self.bpm))
+
+    def __len__(self):
+        return len(self.bpm)
+
+    # Function to read the songs with a BPM from low to high (by artists whose genre contains one of genres)
+    @classmethod
+    def load(cls, conn, low, high, genres=None):
+        # Song IDs fit in 32 bits (as in snapshots), so the BPM and ID share one number
+        packed, artists = conn.exec_driver_sql(
+            "SELECT group_concat((bpm << 32) | id), group_concat(ifnull(artist_id, 0)) "
+            "FROM songs_table WHERE bpm >= ? AND bpm <= ?",
+            (int(np.ceil(low)), int(np.floor(high))),
+        ).one()
+        packed = parse_numbers(packed)
+        artist_ids = parse_numbers(artists)
+        if genres:
+            wanted = [row[0] for row in conn.execute(_genre_artists(genres))]
+            keep = np.isin(artist_ids, np.array(wanted, dtype=np.int64))
+            packed = packed[keep]
+            artist_ids = artist_ids[keep]
+        return cls(packed >> 32, packed & 0xFFFFFFFF, artist_ids)
+
+    # Function to read at most per_tempo songs of each tempo from low to high (by artists whose genre
+    # contains one of genres), from a random song ID onwards
+    @classmethod
+    def sample(cls, conn, low, high, per_tempo, rng, genres=None):
+        # Separate subqueries, as SQLite only reads min() or max() off the end of an index one at a time
+        first_id, last_id = conn.exec_driver_sql(
+            "SELECT (SELECT min(id) FROM songs_table), (SELECT max(id) FROM songs_table)"
+        ).one()
+        query = "SELECT id, ifnull(artist_id, 0) FROM songs_table WHERE bpm = ? AND id {} ?"
+        if genres:
+            # Looked up once, not once per tempo. sqlite3 runs CREATE outside the transaction but DROP
+            # inside it, so a read that was rolled back leaves the table on its pooled connection
+            PLAYLIST_ARTISTS.drop(conn, checkfirst=True)
+            PLAYLIST_ARTISTS.create(conn)
+            conn.execute(insert(PLAYLIST_ARTISTS).from_select(['id'], _genre_artists(genres)))
+            query += " AND artist_id IN (SELECT id FROM playlist_artists)"
+        query += " ORDER BY id LIMIT ?"
+
+        bpm, song_ids, artist_ids = [], [], []
+        complete = True
+        try:
+            for tempo in range(int(np.ceil(low)), int(np.floor(high)) + 1):
+                if first_id is None:
+                    break
+                start = rng.randint(first_id, last_id)
+                rows = conn.exec_driver_sql(query.format('>='), (tempo, start, per_tempo)).all()
+                if len(rows) < per_tempo:
+                    rows += conn.exec_driver_sql(query.format('<'), (tempo, start, per_tempo - len(rows))).all()
+                if len(rows) == per_tempo:
+                    complete = False
+                # Wrapped-around rows come after the others; TempoIndex puts each tempo back in ID order
+                bpm.extend([tempo] * len(rows))
+                for song_id, artist_id in rows:
+                    song_ids.append(song_id)
+                    artist_ids.append(artist_id)
+        finally:
+            if genres:
+                PLAYLIST_ARTISTS.drop(conn)
+        return cls(np.array(bpm, dtype=np.int64), np.array(song_ids, dtype=np.int64),
+                   np.array(artist_ids, dtype=np.int64), complete)
+
+
+def _genre_artists(genres):
+    artists = Artist.__table__
+    return select(artists.c.id).where(or_(*(artists.c.genre.like(f"%{genre}%") for genre in genres)))
+
+
+# Function to return the position in the index of an unused song with a tempo from low to high,
+# nearest the target first, whose artist is not in recent; None if there is none
+def _pick(index, target, low, high, used, recent, rng):
+    first = np.searchsorted(index.tempos, low, 'left')
+    last = np.searchsorted(index.tempos, high, 'right')
+    nearest = np.argsort(np.abs(index.tempos[first:last].astype(np.float64) - target), kind='stable')
+    for tempo in nearest + first:
+        begin, end = int(index.bounds[tempo]), int(index.bounds[tempo + 1])
+        size = end - begin
+        # Start at a random song of the run, so sets differ from run to run
+        offset = rng.randrange(size)
+        for step in range(size):
+            position = begin + (offset + step) % size
+            if position in used:
+                continue
+            artist = int(index.artist_ids[position])
+            if artist and artist in recent:
+                continue
+            return position
+    return None
+
+
+# Function to return the index positions of a set of `length` songs from start to end BPM
+def plan_set(index, start, end, length=DEFAULT_LENGTH, max_step=DEFAULT_MAX_STEP,
+             artist_gap=DEFAULT_ARTIST_GAP, rng=None):
+    rng = rng if rng is not None else random.Random()
+    slope = (end - start) / (length - 1) if length > 1 else 0.0
+    if abs(slope) > max_step:
+        raise ValueError(f"Going from {start:g} to {end:g} BPM in {length} tracks takes steps of "
+                         f"{abs(slope):.2f} BPM, more than the maximum step of {max_step:g}")
+
+    positions = []
+    used = set()
+    # Artists of the last artist_gap tracks, counted so an artist leaves once all of their tracks have
+    recent = Counter()
+    window = deque()
+    previous = None
+    for number in range(length):
+        remaining = length - 1 - number
+        # Close enough to the end tempo for the last track to get within a step of it, and a step away
+        # from the previous track (or the start tempo)
+        low = end - max_step * (remaining + 1)
+        high = end + max_step * (remaining + 1)
+        anchor = start if previous is None else previous
+        low = max(low, anchor - max_step)
+        high = min(high, anchor + max_step)
+
+        position = _pick(index, start + slope * number, low, high, used, recent, rng)
+        if position is None:
+            raise ValueError(f"No song fits track {number + 1} ({low:g}-{high:g} BPM); try a larger "
+                             f"maximum step, a shorter set, a smaller artist gap or other genres")
+        positions.append(position)
+        used.add(position)
+        previous = float(index.bpm[position])
+
+        artist = int(index.artist_ids[position])
+        window.append(artist)
+        if artist:
+            recent[artist] += 1
+        if len(window) > artist_gap:
+            gone = window.popleft()
+            if gone:
+                recent[gone] -= 1
+                if not recent[gone]:
+                    del recent[gone]
+    return positions
+
+
+# Function to read the title, artist, genre, BPM and a scanned file of each song, in the order given
+def load_tracks(conn, song_ids):
+    songs = Song.__table__
+    artists = Artist.__table__
+    scanned = ScannedFile.__table__
+    path = select(func.min(scanned.c.path)).where(scanned.c.song_id == songs.c.id).scalar_subquery()
+    query = select(songs.c.id, songs.c.title, artists.c.title, artists.c.genre, songs.c.bpm, path).select_from(
+        songs.outerjoin(artists, songs.c.artist_id == artists.c.id)
+    ).where(songs.c.id.in_(song_ids))
+    tracks = {row[0]: Track(*row) for row in conn.execute(query)}
+    return [tracks[song_id] for song_id in song_ids]
+
+
+# Function to build a set from start to end BPM out of the catalog; genres limits it to artists whose
+# genre contains one of them, and seed makes the choice of songs repeatable
+def build_playlist(start, end, length=DEFAULT_LENGTH, max_step=DEFAULT_MAX_STEP, genres=None,
+                   artist_gap=DEFAULT_ARTIST_GAP, seed=None, bind=None):
+    if start <= 0 or end <= 0:
+        raise ValueError("Start and end BPM must be positive")
+    if length < 1:
+        raise ValueError("A playlist needs at least 1 track")
+    if max_step <= 0:
+        raise ValueError("The maximum step must be positive")
+    if artist_gap < 0:
+        raise ValueError("The artist gap cannot be negative")
+    bind = bind if bind is not None else engine
+    rng = random.Random(seed)
+    low, high = min(start, end) - max_step, max(start, end) + max_step
+
+    # One read transaction, so the tracks read back are the songs that were indexed
+    with bind.connect() as conn:
+        started = time.perf_counter()
+        index = TempoIndex.sample(conn, low, high, SAMPLE_PER_TRACK * (length + artist_gap), rng, genres)
+        index_ms = (time.perf_counter() - started) * 1000
+        try:
+            positions = plan_set(index, start, end, length, max_step, artist_gap, rng)
+        except ValueError:
+            if index.complete:
+                raise
+            # The songs left out of the sample may still make a set
+            loading = time.perf_counter()
+            index = TempoIndex.load(conn, low, high, genres)
+            index_ms += (time.perf_counter() - loading) * 1000
+            positions = plan_set(index, start, end, length, max_step, artist_gap, rng)
+        tracks = load_tracks(conn, [int(index.song_ids[position]) for position in positions])
+        total_ms = (time.perf_counter() - started) * 1000
+    return Playlist(start, end, max_step, tracks, len(index), index_ms, total_ms - index_ms)
+
+
+def detect_format(path):
+    return 'json' if path.lower().endswith('.json') else 'm3u'
+
+
+# Function to write an extended M3U playlist; songs with no scanned file are listed as comments,
+# which players skip. Returns the number of those
+def write_m3u(playlist, out):
+    missing = 0
+    out.write("#EXTM3U\n")
+    out.write(f"#PLAYLIST:{playlist.start:g} to {playlist.end:g} BPM\n")
+    for track in playlist.tracks:
+        name = f"{track.artist or 'Unknown Artist'} - {track.title}"
+        if track.path:
+            out.write(f"#EXTINF:-1,{name}\n{track.path}\n")
+        else:
+            out.write(f"# {name} ({track.bpm} BPM, song {track.id}): no audio file\n")
+            missing += 1
+    return missing
+
+
+def write_json(playlist, out):
+    json.dump({
+        'start_bpm': playlist.start,
+        'end_bpm': playlist.end,
+        'max_step': playlist.max_step,
+        'tracks': [dict(position=number, **track._asdict()) for number, track in enumerate(playlist.tracks, 1)],
+    }, out, indent=2)
+    out.write('\n')
@@ -0,0 +1,226 @@
+import json
+import re
+import sys
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from sqlalchemy import event
+
+# Opt-in SQL and timing instrumentation for `cli.py --profile`. Listeners are attached to the
+# engine only when profiling is switched on, so a normal run executes no extra code per statement.
+#
+# Every statement is charged to the innermost running operation (a subcommand, or a menu entry
+# such as "List Artists"). Its time includes fetching the rows, because SQLite does most of the
+# work of a SELECT while the rows are being fetched, not when the statement is executed.
+
+# Slowest statements listed for each operation in the summary
+SLOWEST = 3
+
+# Longest statement and parameter text shown in the summary (the JSON trace has it in full)
+STATEMENT_CHARS = 100
+PARAMETER_CHARS = 200
+
+OUTSIDE = '(outside operations)'
+
+# The profiler of this run, or None when profiling is off
+ACTIVE = None
+
+
+class StatementRecord:
+    __slots__ = ('operation', 'statement', 'parameters', 'offset', 'elapsed', 'rows')
+
+    def __init__(self, operation, statement, parameters, offset, elapsed):
+        self.operation = operation
+        self.statement = statement
+        self.parameters = parameters
+        self.offset = offset
+        self.elapsed = elapsed
+        self.rows = 0
+
+
+# DBAPI cursor wrapper counting the rows fetched by a statement and the time spent fetching them
+class CountingCursor:
+    def __init__(self, cursor, record):
+        self._cursor = cursor
+        self._record = record
+
+    def _fetched(self, rows, started):
+        self._record.elapsed += time.perf_counter() - started
+        self._record.rows += rows
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = self._cursor.fetchone()
+        self._fetched(0 if row is None else 1, started)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = self._cursor.fetchmany() if size is None else self._cursor.fetchmany(size)
+        self._fetched(len(rows), started)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = self._cursor.fetchall()
+        self._fetched(len(rows), started)
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class Profiler:
+    def __init__(self, engine):
+        self.engine = engine
+        self.started = time.perf_counter()
+        self.records = []
+        self.stack = []
+        self.calls = {}  # operation -> [calls, wall time]
+        self.counters = {}  # name -> function returning a dict of counters, such as cache hits
+
+    def install(self):
+        event.listen(self.engine, 'before_cursor_execute', self._before_execute)
+        event.listen(self.engine, 'after_cursor_execute', self._after_execute)
+
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('profile_started', []).append(time.perf_counter())
+
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['profile_started'].pop()
+        record = StatementRecord(
+            self.stack[-1] if self.stack else OUTSIDE,
+            statement,
+            parameters,
+            started - self.started,
+            time.perf_counter() - started,
+        )
+        self.records.append(record)
+        if cursor.description is not None and context is not None:
+            # The result object is built from context.cursor right after this event,
+            # so its fetches go through the wrapper
+            context.cursor = CountingCursor(cursor, record)
+
+    # Context manager charging statements run inside it to the named operation
+    @contextmanager
+    def operation(self, name):
+        self.stack.append(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            calls = self.calls.setdefault(name, [0, 0.0])
+            calls[0] += 1
+            calls[1] += time.perf_counter() - started
+
+    # Function to replace module functions by wrappers that profile them as operations
+    def instrument(self, module, operations):
+        for function_name, operation_name in operations.items():
+            setattr(module, function_name, self._wrap(getattr(module, function_name), operation_name))
+
+    def _wrap(self, function, name):
+        @wraps(function)
+        def profiled(*args, **kwargs):
+            with self.operation(name):
+                return function(*args, **kwargs)
+        return profiled
+
+    # Function to include the counters returned by stats() in the report and the JSON trace
+    def watch(self, name, stats):
+        self.counters[name] = stats
+
+    # Function to return per-operation totals, in the order the operations first ran
+    def summary(self):
+        operations = {}
+        for record in self.records:
+            stats = operations.setdefault(record.operation, _new_stats(record.operation))
+            stats['statements'] += 1
+            stats['sql_ms'] += record.elapsed * 1000
+            stats['rows'] += record.rows
+            stats['slowest'].append(record)
+        for name, (calls, wall_time) in self.calls.items():
+            stats = operations.setdefault(name, _new_stats(name))
+            stats['calls'] = calls
+            stats['wall_ms'] = wall_time * 1000
+        for stats in operations.values():
+            slowest = sorted(stats['slowest'], key=lambda record: record.elapsed, reverse=True)[:SLOWEST]
+            stats['slowest'] = [
+                {'ms': record.elapsed * 1000, 'rows': record.rows, 'statement': record.statement,
+                 'parameters': _parameters_text(record.parameters)}
+                for record in slowest
+            ]
+        return list(operations.values())
+
+    # Function to print the summary table and each operation's slowest statements
+    def report(self, out=None):
+        out = out if out is not None else sys.stderr
+        operations = self.summary()
+        wall_ms = (time.perf_counter() - self.started) * 1000
+        sql_ms = sum(stats['sql_ms'] for stats in operations)
+        out.write(f"\nProfile: {len(self.records)} statements, {sql_ms:.1f} ms in SQL, {wall_ms:.1f} ms wall time\n")
+        out.write(f"{'Operation':24} {'Calls':>6} {'Wall ms':>10} {'Statements':>11} {'SQL ms':>10} {'Rows':>9}\n")
+        for stats in operations:
+            out.write(
+                f"{stats['operation'][:24]:24} {stats['calls']:6} {stats['wall_ms']:10.1f} "
+                f"{stats['statements']:11} {stats['sql_ms']:10.1f} {stats['rows']:9}\n"
+            )
+        for stats in operations:
+            if not stats['slowest']:
+                continue
+            out.write(f"\nSlowest statements in {stats['operation']}:\n")
+            for slow in stats['slowest']:
+                statement = _one_line(slow['statement'])
+                if len(statement) > STATEMENT_CHARS:
+                    statement = statement[:STATEMENT_CHARS - 3] + '...'
+                parameters = slow['parameters']
+                if len(parameters) > PARAMETER_CHARS:
+                    parameters = parameters[:PARAMETER_CHARS - 3] + '...'
+                out.write(f"  {slow['ms']:9.2f} ms {slow['rows']:7} rows  {statement}  {parameters}\n")
+        for name, stats in self.counters.items():
+            values = ', '.join(
+                f"{key} {value:.1%}" if isinstance(value, float) else f"{key} {value}"
+                for key, value in stats().items()
+            )
+            out.write(f"\n{name.capitalize()}: {values}\n")
+        out.flush()
+
+    # Function to write the summary and every statement, in the order they ran, as JSON
+    def write_json(self, path):
+        trace = {
+            'wall_ms': (time.perf_counter() - self.started) * 1000,
+            'operations': self.summary(),
+            'counters': {name: stats() for name, stats in self.counters.items()},
+            'statements': [
+                {'operation': record.operation, 'offset_ms': record.offset * 1000, 'ms': record.elapsed * 1000,
+                 'rows': record.rows, 'statement': record.statement,
+                 'parameters': _parameters_text(record.parameters)}
+                for record in self.records
+            ],
+        }
+        with open(path, 'w') as handle:
+            json.dump(trace, handle, indent=2)
+
+
+def _new_stats(name):
+    return {'operation': name, 'calls': 0, 'wall_ms': 0.0, 'statements': 0, 'sql_ms': 0.0, 'rows': 0, 'slowest': []}
+
+
+def _one_line(statement):
+    return re.sub(r'\s+', ' ', statement).strip()
+
+
+def _parameters_text(parameters):
+    # executemany passes a list of parameter sets; report how many there were and the first
+    if isinstance(parameters, list) and len(parameters) > 1:
+        return f"{len(parameters)} x {parameters[0]!r}"
+    return repr(parameters)
+
+
+# Function to switch profiling on for this run and return the profiler
+def start(engine):
+    global ACTIVE
+    ACTIVE = Profiler(engine)
+    ACTIVE.install()
+    return ACTIVE
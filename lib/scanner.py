@@ -0,0 +1,234 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from sqlalchemy import select, insert, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import engine, Artist, Song, ScannedFile
+from artist_cache import cache as artist_cache
+from importer import chunked
+import audio
+
+# `cli.py scan`: walk a music folder, detect the tempo of every WAV file in a pool of worker
+# processes (see audio.py) and write the results to the catalog a batch at a time, one
+# transaction per batch.
+#
+# Each file becomes a song (or updates the song it matches): title, artist, genre and release
+# date come from the file's INFO tags when it has them; otherwise "Artist - Title.wav" is split
+# into both, and the first folder below the scanned one is taken as the artist. Every file is
+# recorded in scanned_files with its size and modification time, so scanning the same folder
+# again, or after an interrupted scan, only analyses new and changed files.
+
+AUDIO_EXTENSIONS = ('.wav', '.wave')
+
+# Files written per transaction
+BATCH_SIZE = 200
+
+# Failed files listed in the report; all of them are recorded in scanned_files.error
+FAILURES_SHOWN = 20
+
+
+class ScanStats:
+    def __init__(self, workers):
+        self.workers = workers
+        self.files = 0
+        self.unchanged = 0
+        self.analysed = 0
+        self.failed = 0
+        self.no_bpm = 0
+        self.inserted = 0
+        self.updated = 0
+        self.artists_created = 0
+        self.cpu_seconds = 0.0
+        self.failures = []  # (path, error), the first FAILURES_SHOWN
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def finish(self):
+        self.elapsed = time.perf_counter() - self.started
+
+    @property
+    def files_per_sec(self):
+        return (self.analysed + self.failed) / self.elapsed if self.elapsed else 0.0
+
+    # Files analysed per second of worker CPU time: the rate one core sustains, however many are used
+    @property
+    def files_per_cpu_sec(self):
+        return (self.analysed + self.failed) / self.cpu_seconds if self.cpu_seconds else 0.0
+
+    def report(self):
+        return (
+            f"Scanned {self.files} files in {self.elapsed:.2f}s with {self.workers} "
+            f"worker{'s' if self.workers != 1 else ''}: "
+            f"analysed {self.analysed + self.failed} ({self.files_per_sec:,.1f} files/sec, "
+            f"{self.files_per_sec / self.workers:,.1f} per worker, {self.files_per_cpu_sec:,.1f} per CPU second), "
+            f"skipped {self.unchanged} unchanged. "
+            f"{self.failed} failed and {self.no_bpm} had no clear beat. "
+            f"Added {self.inserted} songs, set the BPM of {self.updated} and created {self.artists_created} artists."
+        )
+
+
+# Generator yielding (path, size, mtime_ns) for every WAV file under root, without following symlinked folders
+def walk(root):
+    directories = [root]
+    while directories:
+        directory = directories.pop()
+        try:
+            entries = sorted(os.scandir(directory), key=lambda entry: entry.name)
+        except OSError:
+            continue
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                directories.append(entry.path)
+            elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in AUDIO_EXTENSIONS:
+                info = entry.stat()
+                yield entry.path, info.st_size, info.st_mtime_ns
+
+
+# Function to return (title, artist, genre, release date) for a file: its tags first, then its name and folder
+def describe(path, root, tags):
+    title = os.path.splitext(os.path.basename(path))[0].strip()
+    artist = None
+    named_artist, separator, named_title = title.partition(' - ')
+    # "01 - Title" is a track number, not an artist
+    if separator and named_title.strip() and not named_artist.strip().isdigit():
+        artist, title = named_artist.strip(), named_title.strip()
+    elif separator and named_title.strip():
+        title = named_title.strip()
+    relative = os.path.relpath(os.path.dirname(path), root)
+    if artist is None and relative != os.curdir:
+        artist = relative.split(os.sep)[0]
+    return tags.get('title') or title, tags.get('artist') or artist, tags.get('genre'), tags.get('date')
+
+
+class Scanner:
+    def __init__(self, bind=None, workers=None, batch_size=BATCH_SIZE, overwrite=False, rescan=False):
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if workers is not None and workers < 1:
+            raise ValueError("workers must be at least 1")
+        self.bind = bind if bind is not None else engine
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.overwrite = overwrite  # replace BPMs that are already set
+        self.rescan = rescan        # analyse unchanged files too
+        self.root = None
+        self.files = {}             # path -> (size, mtime_ns) of the files being analysed
+        self.artist_ids = {}        # artist title -> id
+        # The shared artist cache holds the default database's artists, so it is only used for that one
+        self.shared_cache = artist_cache if self.bind is engine else None
+        self.looked_up = []         # (title, id, genre) read or created in the current batch
+        self.stats = ScanStats(self.workers)
+
+    def run(self, root):
+        self.root = os.path.abspath(root)
+        if not os.path.isdir(self.root):
+            raise ValueError(f"{root} is not a folder")
+        found = list(walk(self.root))
+        known = {} if self.rescan else self._known_files()
+        self.files = {path: (size, mtime_ns) for path, size, mtime_ns in found if known.get(path) != (size, mtime_ns)}
+        self.stats.files = len(found)
+        self.stats.unchanged = len(found) - len(self.files)
+
+        for batch in chunked(self._analyse(sorted(self.files)), self.batch_size):
+            self.looked_up = []
+            with self.bind.begin() as conn:
+                self._write_batch(conn, batch)
+            # Only artists that are committed go into the shared cache
+            if self.shared_cache is not None:
+                for title, artist_id, genre in self.looked_up:
+                    self.shared_cache.put(title, artist_id, genre)
+        self.stats.finish()
+        return self.stats
+
+    # Function to return {path: (size, mtime_ns)} of the files already scanned under the root
+    def _known_files(self):
+        table = ScannedFile.__table__
+        prefix = self.root if self.root.endswith(os.sep) else self.root + os.sep
+        # Every path starting with prefix sorts between it and prefix with its last character bumped
+        below = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        query = select(table.c.path, table.c.size, table.c.mtime_ns).where(table.c.path >= prefix, table.c.path < below)
+        with self.bind.connect() as conn:
+            return {path: (size, mtime_ns) for path, size, mtime_ns in conn.execute(query)}
+
+    # Generator yielding audio.analyse() results in path order, from a process pool when there is more than one worker
+    def _analyse(self, paths):
+        if self.workers == 1 or len(paths) < 2:
+            yield from map(audio.analyse, paths)
+            return
+        pool = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            yield from pool.map(audio.analyse, paths)
+        finally:
+            # Drop the queued files if the scan stops early (an error or Ctrl-C)
+            pool.shutdown(cancel_futures=True)
+
+    def _write_batch(self, conn, results):
+        scanned = []
+        for result in results:
+            self.stats.cpu_seconds += result['cpu']
+            song_id = None
+            if result['error'] is not None:
+                self.stats.failed += 1
+                if len(self.stats.failures) < FAILURES_SHOWN:
+                    self.stats.failures.append((result['path'], result['error']))
+            else:
+                self.stats.analysed += 1
+                if result['bpm'] is None:
+                    self.stats.no_bpm += 1
+                song_id = self._upsert_song(conn, result)
+            size, mtime_ns = self.files[result['path']]
+            scanned.append({
+                'path': result['path'], 'size': size, 'mtime_ns': mtime_ns,
+                'song_id': song_id, 'bpm': result['bpm'], 'error': result['error'],
+            })
+
+        statement = sqlite_insert(ScannedFile.__table__)
+        conn.execute(statement.on_conflict_do_update(
+            index_elements=['path'],
+            set_={name: statement.excluded[name] for name in ('size', 'mtime_ns', 'song_id', 'bpm', 'error')},
+        ), scanned)
+
+    # Function to insert the file's song, or set the BPM of the song it matches; returns the song's ID
+    def _upsert_song(self, conn, result):
+        title, artist, genre, release_date = describe(result['path'], self.root, result['tags'])
+        artist_id = self._artist_id(conn, artist, genre) if artist else None
+        songs = Song.__table__
+        same_artist = songs.c.artist_id == artist_id if artist_id is not None else songs.c.artist_id.is_(None)
+        song = conn.execute(
+            select(songs.c.id, songs.c.bpm).where(songs.c.title == title, same_artist).limit(1)
+        ).first()
+        bpm = result['bpm']
+        if song is None:
+            self.stats.inserted += 1
+            return conn.execute(insert(songs).values(
+                title=title, artist_id=artist_id, release_date=release_date, bpm=bpm,
+            )).inserted_primary_key[0]
+        if bpm is not None and bpm != song.bpm and (song.bpm is None or self.overwrite):
+            conn.execute(update(songs).where(songs.c.id == song.id).values(bpm=bpm))
+            self.stats.updated += 1
+        return song.id
+
+    def _artist_id(self, conn, title, genre):
+        if title in self.artist_ids:
+            return self.artist_ids[title]
+        entry = self.shared_cache.peek(title) if self.shared_cache is not None else None
+        if entry is not None:
+            artist_id = entry.id
+        else:
+            table = Artist.__table__
+            row = conn.execute(select(table.c.id, table.c.genre).where(table.c.title == title)).first()
+            if row is None:
+                artist_id = conn.execute(insert(table).values(title=title, genre=genre)).inserted_primary_key[0]
+                self.stats.artists_created += 1
+            else:
+                artist_id, genre = row
+            self.looked_up.append((title, artist_id, genre))
+        self.artist_ids[title] = artist_id
+        return artist_id
+
+
+def scan_folder(path, workers=None, batch_size=BATCH_SIZE, overwrite=False, rescan=False, bind=None):
+    scanner = Scanner(bind=bind, workers=workers, batch_size=batch_size, overwrite=overwrite, rescan=rescan)
+    return scanner.run(path)
@@ -0,0 +1,107 @@
+import re
+import unicodedata
+from collections import namedtuple
+from difflib import SequenceMatcher
+
+from sqlalchemy import text
+
+from models import session
+
+# Search over the FTS5 tables created by migration 4 (songs_fts, artists_fts).
+# Every word of the query must match the start of a word in the title, artist or genre
+# ("one mor" finds "One More Time"), ranked with bm25 so title hits beat artist and genre hits.
+# When nothing matches, each word missing from the index vocabulary is replaced by the most
+# similar indexed word with the same first letter ("pnuk" -> "punk") and the search is run again.
+
+SongHit = namedtuple('SongHit', 'id title artist genre')
+ArtistHit = namedtuple('ArtistHit', 'id title genre')
+
+# corrected is the rewritten query when the typo-tolerant fallback was used, otherwise None
+SearchResult = namedtuple('SearchResult', 'hits corrected')
+
+# Minimum difflib similarity ratio (0-1) for a vocabulary word to replace a misspelt one
+MIN_SIMILARITY = 0.7
+
+SONG_SEARCH = text(
+    "SELECT rowid, title, artist, genre FROM songs_fts WHERE songs_fts MATCH :query "
+    "ORDER BY bm25(songs_fts, 10.0, 5.0, 1.0) LIMIT :limit"
+)
+ARTIST_SEARCH = text(
+    "SELECT rowid, title, genre FROM artists_fts WHERE artists_fts MATCH :query "
+    "ORDER BY bm25(artists_fts, 10.0, 1.0) LIMIT :limit"
+)
+
+
+# Function to split a query into lowercase words without accents, the way the FTS tokenizer does
+def words(query):
+    decomposed = unicodedata.normalize('NFKD', query.lower())
+    stripped = ''.join(char for char in decomposed if not unicodedata.combining(char))
+    return re.findall(r'\w+', stripped)
+
+
+def _match_expression(terms):
+    # Quoted so FTS5 operators (AND, NEAR, -, ...) in user input are taken literally
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+# Function to return the indexed word closest to term, or None if nothing is similar enough
+def closest_word(vocab_table, term):
+    if term.isdigit():
+        return None
+    known = session.execute(
+        text(f"SELECT 1 FROM {vocab_table} WHERE term = :term"), {'term': term}
+    ).first()
+    if known:
+        return term
+
+    # Only words with the same first letter and a similar length are compared. The term range is
+    # answered from the FTS index itself, so this stays fast however large the vocabulary is
+    candidates = session.execute(
+        text(
+            f"SELECT term, doc FROM {vocab_table} WHERE term >= :start AND term < :stop "
+            "AND length(term) BETWEEN :low AND :high"
+        ),
+        {
+            'start': term[0],
+            'stop': chr(ord(term[0]) + 1),
+            'low': max(1, len(term) - 2),
+            'high': len(term) + 2,
+        },
+    )
+    matcher = SequenceMatcher(b=term)
+    best, best_score = None, (MIN_SIMILARITY, 0)
+    for candidate, documents in candidates:
+        matcher.set_seq1(candidate)
+        # quick_ratio is an upper bound of ratio and much cheaper; ties go to the more common word
+        if matcher.quick_ratio() < best_score[0]:
+            continue
+        score = (matcher.ratio(), documents)
+        if score >= best_score:
+            best, best_score = candidate, score
+    return best
+
+
+def _search(statement, vocab_table, make_hit, query, limit, fuzzy):
+    terms = words(query)
+    if not terms:
+        return SearchResult([], None)
+
+    rows = session.execute(statement, {'query': _match_expression(terms), 'limit': limit}).all()
+    if rows or not fuzzy:
+        return SearchResult([make_hit(*row) for row in rows], None)
+
+    corrected = [closest_word(vocab_table, term) or term for term in terms]
+    if corrected == terms:
+        return SearchResult([], None)
+    rows = session.execute(statement, {'query': _match_expression(corrected), 'limit': limit}).all()
+    return SearchResult([make_hit(*row) for row in rows], ' '.join(corrected))
+
+
+# Function to search songs by title, artist name and genre
+def search_songs(query, limit=20, fuzzy=True):
+    return _search(SONG_SEARCH, 'songs_fts_vocab', SongHit, query, limit, fuzzy)
+
+
+# Function to search artists by name and genre
+def search_artists(query, limit=20, fuzzy=True):
+    return _search(ARTIST_SEARCH, 'artists_fts_vocab', ArtistHit, query, limit, fuzzy)
@@ -0,0 +1,576 @@
+import asyncio
+import base64
+import binascii
+import json
+import re
+import sys
+import time
+import traceback
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qsl
+
+from sqlalchemy.exc import IntegrityError
+
+from models import engine, session, session_scope, Artist, Song
+from pagination import KeysetPager
+import operations
+import tempo
+
+# `cli.py serve`: the catalog as a local HTTP/JSON API, on asyncio and the standard library.
+#
+#   GET    /artists                 artists by name          POST /artists   {"title", "genre"}
+#   GET    /artists/{id}            one artist               PATCH, DELETE
+#   GET    /artists/{id}/songs      the artist's songs
+#   GET    /songs                   songs by title or BPM    POST /songs     {"title", "artist", "release_date", "bpm"}
+#   GET    /songs/{id}              one song                 PATCH, DELETE
+#   GET    /tempo?bpm=124           tempo-compatible songs, closest first
+#
+# The event loop only parses requests and writes responses. Database work runs in a fixed pool
+# of worker threads, each request in its own session_scope(), and at most queue_limit requests
+# wait for a worker; beyond that the server answers 503 straight away instead of queueing.
+#
+# Lists are paged by keyset: a page ends with a "next" cursor that encodes the sort key of its
+# last row, and passing it back as ?after= seeks straight to the following page.
+#
+# Every GET response carries an ETag made of the catalog's generation and the request target.
+# The generation moves on whenever any connection (a worker, another process) commits, which a
+# connection of the server's own sees as a change in PRAGMA data_version. A request whose
+# If-None-Match still matches gets a 304 without touching the worker pool or running a query.
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+DEFAULT_WORKERS = 4
+
+# Requests allowed to wait for a worker before new ones are turned away with 503
+QUEUE_LIMIT = 256
+
+PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Largest request head (request line and headers) and body accepted
+MAX_HEAD_BYTES = 16 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+
+# Seconds an idle keep-alive connection is kept open
+KEEPALIVE_TIMEOUT = 15
+
+# Largest ID SQLite can store; larger path IDs can't exist and are answered with 404, and cursors
+# holding larger numbers with 400
+MAX_ID = 2 ** 63 - 1
+
+Route = namedtuple('Route', 'method pattern handler')
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message, **details):
+        super().__init__(message)
+        self.status = status
+        self.payload = dict(error=message, **details)
+
+
+# Function to turn a list of key values into an opaque URL-safe cursor
+def encode_cursor(values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode('ascii')
+
+
+# Function to check a number read from JSON fits an SQLite integer column and is not negative
+def _whole_number(value):
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= MAX_ID
+
+
+# Function to turn a cursor back into [sort key, id]; the sort key must be of key_type (str or int),
+# or None if nullable
+def decode_cursor(text, key_type, nullable=False):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(text + '=' * (-len(text) % 4)))
+    except (binascii.Error, ValueError):
+        raise HTTPError(400, "Invalid cursor")
+    if not isinstance(values, list) or len(values) != 2 or not _whole_number(values[1]):
+        raise HTTPError(400, "Invalid cursor")
+    key = values[0]
+    if key is None:
+        valid = nullable
+    elif key_type is int:
+        valid = _whole_number(key)
+    else:
+        valid = isinstance(key, key_type)
+    if not valid:
+        raise HTTPError(400, "Invalid cursor")
+    return values
+
+
+def int_param(params, name, default, low, high):
+    text = params.get(name)
+    if text is None or text == '':
+        return default
+    try:
+        value = int(text)
+    except ValueError:
+        raise HTTPError(400, f"{name} must be a whole number")
+    if not low <= value <= high:
+        raise HTTPError(400, f"{name} must be between {low} and {high}")
+    return value
+
+
+def float_param(params, name, default=None):
+    text = params.get(name)
+    if text is None or text == '':
+        if default is None:
+            raise HTTPError(400, f"{name} is required")
+        return default
+    try:
+        return float(text)
+    except ValueError:
+        raise HTTPError(400, f"{name} must be a number")
+
+
+# Function to read an optional text field of a JSON body; required fields must be present and not blank
+def text_field(body, name, required=False):
+    value = body.get(name)
+    if value is None:
+        if required:
+            raise HTTPError(400, f"{name} is required")
+        return None
+    if not isinstance(value, str) or (required and not value.strip()):
+        raise HTTPError(400, f"{name} must be a non-empty string" if required else f"{name} must be a string")
+    return value
+
+
+def bpm_field(body):
+    try:
+        return operations.parse_bpm(body.get('bpm'))
+    except ValueError as exc:
+        raise HTTPError(400, str(exc))
+
+
+def artist_item(artist):
+    return {'id': artist.id, 'title': artist.title, 'genre': artist.genre}
+
+
+def song_item(row):
+    return {
+        'id': row.id, 'title': row.title, 'artist_id': row.artist_id, 'artist': row.artist,
+        'release_date': row.release_date, 'bpm': row.bpm,
+    }
+
+
+# Query for songs with their artist's name, as song_item() reads them
+def songs_query():
+    return (
+        session.query(Song.id, Song.title, Song.artist_id, Artist.title.label('artist'), Song.release_date, Song.bpm)
+        .outerjoin(Artist, Song.artist_id == Artist.id)
+    )
+
+
+# Function to return (rows, next cursor) for the page of a (title, id)-ordered query after ?after=
+def keyset_page(query, title_column, id_column, params):
+    limit = int_param(params, 'limit', PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    pager = KeysetPager(query, title_column, id_column, limit)
+    if params.get('after'):
+        rows = pager.after(decode_cursor(params['after'], str))
+    else:
+        rows = pager.first()
+    return rows, encode_cursor([rows[-1].title, rows[-1].id]) if pager.has_next else None
+
+
+# Function to return (rows, next cursor) for a page of songs in BPM order: songs with a BPM by
+# (bpm, id) on the bpm index, then songs without one by id. A cursor of [null, id] is in the second part
+def bpm_page(query, params):
+    limit = int_param(params, 'limit', PAGE_SIZE, 1, MAX_PAGE_SIZE)
+    key = decode_cursor(params['after'], int, nullable=True) if params.get('after') else None
+
+    rows = []
+    if key is None or key[0] is not None:
+        pager = KeysetPager(query.filter(Song.bpm.isnot(None)), Song.bpm, Song.id, limit)
+        rows = pager.after(key) if key is not None else pager.first()
+        if pager.has_next:
+            return rows, encode_cursor([rows[-1].bpm, rows[-1].id])
+        key = [None, 0]
+
+    # One extra row tells whether there is a page after this one
+    room = limit - len(rows)
+    missing = query.filter(Song.bpm.is_(None), Song.id > key[1]).order_by(Song.id).limit(room + 1).all()
+    taken = missing[:room]
+    rows += taken
+    if len(missing) > room:
+        return rows, encode_cursor([None, taken[-1].id if taken else key[1]])
+    return rows, None
+
+
+def songs_page(query, params):
+    sort = params.get('sort', 'title')
+    if sort == 'title':
+        rows, cursor = keyset_page(query, Song.title, Song.id, params)
+    elif sort == 'bpm':
+        rows, cursor = bpm_page(query, params)
+    else:
+        raise HTTPError(400, "sort must be title or bpm")
+    return 200, {'items': [song_item(row) for row in rows], 'next': cursor}
+
+
+def get_artist_or_404(artist_id):
+    artist = session.get(Artist, artist_id)
+    if artist is None:
+        raise HTTPError(404, f"Artist {artist_id} not found")
+    return artist
+
+
+def get_song_or_404(song_id):
+    song = session.get(Song, song_id)
+    if song is None:
+        raise HTTPError(404, f"Song {song_id} not found")
+    return song
+
+
+# The handlers run in a worker thread inside session_scope() and return (status, JSON payload or None)
+
+def list_artists(params, body):
+    query = session.query(Artist.id, Artist.title, Artist.genre)
+    rows, cursor = keyset_page(query, Artist.title, Artist.id, params)
+    return 200, {'items': [artist_item(row) for row in rows], 'next': cursor}
+
+
+def create_artist(params, body):
+    title = text_field(body, 'title', required=True)
+    artist, created = operations.get_or_create_artist(title, text_field(body, 'genre'))
+    if not created:
+        raise HTTPError(409, f"Artist '{title}' already exists", id=artist.id)
+    return 201, artist_item(artist)
+
+
+def get_artist(params, body, artist_id):
+    return 200, artist_item(get_artist_or_404(artist_id))
+
+
+def update_artist(params, body, artist_id):
+    title, genre = text_field(body, 'title'), text_field(body, 'genre')
+    if title is not None and not title.strip():
+        raise HTTPError(400, "title must be a non-empty string")
+    artist = get_artist_or_404(artist_id)
+    return 200, artist_item(operations.update_artist(artist, title=title, genre=genre))
+
+
+def delete_artist(params, body, artist_id):
+    operations.delete_artist(get_artist_or_404(artist_id))
+    return 204, None
+
+
+def artist_songs(params, body, artist_id):
+    get_artist_or_404(artist_id)
+    return songs_page(songs_query().filter(Song.artist_id == artist_id), params)
+
+
+def list_songs(params, body):
+    query = songs_query()
+    if params.get('artist'):
+        artist = operations.find_artist_id(params['artist'])
+        if artist is None:
+            return 200, {'items': [], 'next': None}
+        query = query.filter(Song.artist_id == artist.id)
+    return songs_page(query, params)
+
+
+def create_song(params, body):
+    title = text_field(body, 'title', required=True)
+    release_date = text_field(body, 'release_date')
+    bpm = bpm_field(body)
+    if body.get('artist_id') is not None:
+        if not isinstance(body['artist_id'], int):
+            raise HTTPError(400, "artist_id must be a whole number")
+        artist_id = body['artist_id']
+        if session.get(Artist, artist_id) is None:
+            raise HTTPError(422, f"Artist {artist_id} not found")
+    else:
+        name = text_field(body, 'artist', required=True)
+        artist = operations.find_artist_id(name)
+        if artist is None:
+            raise HTTPError(422, f"Artist '{name}' not found")
+        artist_id = artist.id
+
+    song, created = operations.get_or_create_song(title, artist_id, release_date, bpm)
+    if not created:
+        raise HTTPError(409, f"Song '{title}' already exists for this artist", id=song.id)
+    return 201, get_song(params, body, song.id)[1]
+
+
+def get_song(params, body, song_id):
+    row = songs_query().filter(Song.id == song_id).first()
+    if row is None:
+        raise HTTPError(404, f"Song {song_id} not found")
+    return 200, song_item(row)
+
+
+def update_song(params, body, song_id):
+    title = text_field(body, 'title')
+    if title is not None and not title.strip():
+        raise HTTPError(400, "title must be a non-empty string")
+    release_date, bpm = text_field(body, 'release_date'), bpm_field(body)
+    operations.update_song(get_song_or_404(song_id), title=title, release_date=release_date, bpm=bpm)
+    return get_song(params, body, song_id)
+
+
+def delete_song(params, body, song_id):
+    operations.delete_song(get_song_or_404(song_id))
+    return 204, None
+
+
+def tempo_matches(params, body):
+    try:
+        matches = tempo.find_compatible(
+            float_param(params, 'bpm'),
+            tolerance=float_param(params, 'tolerance', 3.0),
+            genre=params.get('genre') or None,
+            limit=int_param(params, 'limit', PAGE_SIZE, 1, MAX_PAGE_SIZE),
+            offset=int_param(params, 'offset', 0, 0, sys.maxsize),
+            half_double=params.get('half_double', 'true').lower() not in ('0', 'false', 'no'),
+        )
+    except ValueError as exc:
+        raise HTTPError(400, str(exc))
+    return 200, {'items': [dict(match._asdict(), deviation=round(match.deviation, 2)) for match in matches]}
+
+
+ROUTES = [
+    Route('GET', re.compile(r'/artists'), list_artists),
+    Route('POST', re.compile(r'/artists'), create_artist),
+    Route('GET', re.compile(r'/artists/(\d+)'), get_artist),
+    Route('PATCH', re.compile(r'/artists/(\d+)'), update_artist),
+    Route('DELETE', re.compile(r'/artists/(\d+)'), delete_artist),
+    Route('GET', re.compile(r'/artists/(\d+)/songs'), artist_songs),
+    Route('GET', re.compile(r'/songs'), list_songs),
+    Route('POST', re.compile(r'/songs'), create_song),
+    Route('GET', re.compile(r'/songs/(\d+)'), get_song),
+    Route('PATCH', re.compile(r'/songs/(\d+)'), update_song),
+    Route('DELETE', re.compile(r'/songs/(\d+)'), delete_song),
+    Route('GET', re.compile(r'/tempo'), tempo_matches),
+]
+
+
+# Tracks the catalog's generation with PRAGMA data_version, which changes on a connection each time
+# another connection commits. Used only from the event loop, so the connection stays on one thread
+class CatalogVersion:
+    def __init__(self, bind):
+        self.connection = bind.raw_connection()
+        self.data_version = None
+        self.generation = 0
+        # Generations restart at every launch, so ETags also carry the launch time
+        self.launch = format(time.time_ns() // 1000, 'x')
+
+    def current(self):
+        cursor = self.connection.cursor()
+        try:
+            data_version = cursor.execute("PRAGMA data_version").fetchone()[0]
+        finally:
+            cursor.close()
+        if data_version != self.data_version:
+            self.data_version = data_version
+            self.generation += 1
+        return f"{self.launch}.{self.generation}"
+
+    def close(self):
+        self.connection.close()
+
+
+# Function to tell whether an If-None-Match header matches an ETag (weak comparison)
+def etag_matches(header, etag):
+    if header is None:
+        return False
+    if header.strip() == '*':
+        return True
+    opaque = etag.removeprefix('W/')
+    return any(tag.strip().removeprefix('W/') == opaque for tag in header.split(','))
+
+
+# Function to return (route, path arguments); raises HTTPError 404 or 405
+def match_route(method, path):
+    allowed = []
+    for route in ROUTES:
+        match = route.pattern.fullmatch(path)
+        if match is None:
+            continue
+        if route.method == method:
+            ids = [int(value) for value in match.groups()]
+            if any(value > MAX_ID for value in ids):
+                raise HTTPError(404, f"Not found: {path}")
+            return route, ids
+        allowed.append(route.method)
+    if allowed:
+        raise HTTPError(405, f"{method} is not allowed on {path}", allow=allowed)
+    raise HTTPError(404, f"No such endpoint: {path}")
+
+
+class Server:
+    def __init__(self, host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, queue_limit=QUEUE_LIMIT):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if queue_limit < 0:
+            raise ValueError("queue_limit cannot be negative")
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='soundplay-db')
+        self.version = CatalogVersion(engine)
+        self.pending = 0  # requests running in or waiting for the worker pool
+        self.requests = 0
+        self.not_modified = 0
+        self.rejected = 0
+
+    # Function to run a handler in the calling worker thread, in its own session
+    @staticmethod
+    def _run(handler, params, body, path_args):
+        try:
+            with session_scope():
+                return handler(params, body, *path_args)
+        except IntegrityError as exc:
+            raise HTTPError(409, f"Conflicts with an existing row: {exc.orig}")
+
+    # Function to return (status, extra headers, payload) for one request
+    async def respond(self, method, target, headers, body):
+        url = urlsplit(target)
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+        route, path_args = match_route(method, url.path.rstrip('/') or '/')
+
+        etag = None
+        if method == 'GET':
+            etag = f'W/"{self.version.current()}.{zlib.crc32(target.encode()):08x}"'
+            if etag_matches(headers.get('if-none-match'), etag):
+                self.not_modified += 1
+                return 304, {'ETag': etag}, None
+
+        if body:
+            try:
+                body = json.loads(body)
+            except ValueError:
+                raise HTTPError(400, "Request body is not valid JSON")
+            if not isinstance(body, dict):
+                raise HTTPError(400, "Request body must be a JSON object")
+        else:
+            body = {}
+
+        if self.pending >= self.workers + self.queue_limit:
+            self.rejected += 1
+            raise HTTPError(503, "Server busy, try again", retry_after=1)
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            status, payload = await loop.run_in_executor(self.executor, self._run, route.handler, params, body, path_args)
+        finally:
+            self.pending -= 1
+        return status, {'ETag': etag} if etag and status == 200 else {}, payload
+
+    # Function to read one request; returns (method, target, version, headers, body), or None once the client is gone
+    async def read_request(self, reader):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), KEEPALIVE_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+            return None
+        except asyncio.LimitOverrunError:
+            raise HTTPError(431, "Request head too large")
+
+        lines = head.decode('latin-1').split('\r\n')
+        parts = lines[0].split(' ')
+        if len(parts) != 3 or not parts[2].startswith('HTTP/1.'):
+            raise HTTPError(400, "Malformed request line")
+        method, target, version = parts
+        headers = {}
+        for line in lines[1:]:
+            if line:
+                name, separator, value = line.partition(':')
+                if not separator:
+                    raise HTTPError(400, "Malformed header")
+                headers[name.strip().lower()] = value.strip()
+
+        if 'chunked' in headers.get('transfer-encoding', '').lower():
+            raise HTTPError(411, "Chunked request bodies are not supported; send Content-Length")
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HTTPError(400, "Invalid Content-Length")
+        if not 0 <= length <= MAX_BODY_BYTES:
+            raise HTTPError(413, f"Request body larger than {MAX_BODY_BYTES} bytes")
+        try:
+            body = await reader.readexactly(length) if length else b''
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return None
+        return method, target, version, headers, body
+
+    async def handle_connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = False
+                try:
+                    request = await self.read_request(reader)
+                    if request is None:
+                        break
+                    method, target, version, headers, body = request
+                    connection = headers.get('connection', '').lower()
+                    keep_alive = connection == 'keep-alive' if version == 'HTTP/1.0' else connection != 'close'
+                    self.requests += 1
+                    status, extra, payload = await self.respond(method, target, headers, body)
+                except HTTPError as exc:
+                    status, extra, payload = exc.status, {}, exc.payload
+                    if 'allow' in payload:
+                        extra['Allow'] = ', '.join(payload.pop('allow'))
+                    if 'retry_after' in payload:
+                        extra['Retry-After'] = str(payload.pop('retry_after'))
+                except Exception:
+                    traceback.print_exc()
+                    status, extra, payload = 500, {}, {'error': "Internal server error"}
+                    keep_alive = False
+
+                writer.write(self.encode_response(status, extra, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    @staticmethod
+    def encode_response(status, extra, payload, keep_alive):
+        body = b'' if payload is None else json.dumps(payload, separators=(',', ':')).encode()
+        lines = [f"HTTP/1.1 {status} {HTTPStatus(status).phrase}"]
+        if payload is not None:
+            lines.append("Content-Type: application/json")
+        lines.append(f"Content-Length: {len(body)}")
+        if 'ETag' in extra:
+            # Clients may keep the response but must check it is current (which a 304 answers cheaply)
+            lines.append("Cache-Control: no-cache")
+        lines.extend(f"{name}: {value}" for name, value in extra.items())
+        lines.append("Connection: keep-alive" if keep_alive else "Connection: close")
+        return ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+    async def serve_forever(self, ready=None):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port, limit=MAX_HEAD_BYTES)
+        self.port = server.sockets[0].getsockname()[1]
+        if ready is not None:
+            ready(self)
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+        self.version.close()
+
+    def report(self):
+        return (
+            f"Served {self.requests} requests: {self.not_modified} not modified (304), "
+            f"{self.rejected} turned away while busy (503)."
+        )
+
+
+# Function to serve the API until interrupted; ready(server) is called once it is listening
+def serve(host=DEFAULT_HOST, port=DEFAULT_PORT, workers=DEFAULT_WORKERS, queue_limit=QUEUE_LIMIT, ready=None):
+    server = Server(host, port, workers, queue_limit)
+    try:
+        asyncio.run(server.serve_forever(ready))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+    return server
@@ -0,0 +1,213 @@
+import json
+import mmap
+import shutil
+import struct
+import sys
+import tempfile
+from array import array
+
+# Compact columnar snapshot of a song export, for analytics.
+#
+# Layout: the magic bytes, a little-endian uint32 header length, a JSON header, then one
+# section per column, each starting on an 8-byte boundary. Offsets in the header are relative
+# to the start of the first section:
+#
+#   {"version": 1, "rows": 3, "columns": {
+#       "bpm": {"type": "H", "count": 3, "offset": 24},
+#       "title": {"type": "string", "count": 3, "offsets": 40, "data": 56, "length": 27}, ...}}
+#
+# Numeric columns are little-endian arrays in array-module type codes ("I" = uint32,
+# "H" = uint16), with 0 standing for NULL (IDs start at 1, and a BPM of 0 is not stored).
+# A string column is a uint32 array of count + 1 offsets into a block of UTF-8 text, so
+# string i is data[offsets[i]:offsets[i + 1]]; NULL is stored as an empty string.
+#
+# Snapshot() maps the file into memory and hands out zero-copy memoryviews, which can be
+# used directly or wrapped with numpy.frombuffer().
+
+MAGIC = b'SNDSNAP1'
+VERSION = 1
+ALIGNMENT = 8
+
+MAX_UINT32 = 2 ** 32 - 1
+
+
+def _align(position):
+    return (position + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _little_endian(values):
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+# A numeric column collected in a temporary file, so memory does not grow with the row count
+class NumberSpill:
+    def __init__(self, typecode):
+        self.typecode = typecode
+        self.file = tempfile.TemporaryFile()
+        self.count = 0
+
+    def extend(self, values):
+        try:
+            chunk = array(self.typecode, values)
+        except OverflowError:
+            raise ValueError(f"Value too large for a '{self.typecode}' snapshot column") from None
+        _little_endian(chunk).tofile(self.file)
+        self.count += len(chunk)
+
+    def sections(self):
+        return [('offset', self.file)]
+
+    def header(self):
+        return {'type': self.typecode, 'count': self.count}
+
+
+# A string column collected as offsets plus UTF-8 text in two temporary files
+class StringSpill:
+    def __init__(self):
+        self.offsets = NumberSpill('I')
+        self.data = tempfile.TemporaryFile()
+        self.length = 0
+        self.offsets.extend([0])
+
+    @property
+    def count(self):
+        return self.offsets.count - 1
+
+    def extend(self, values):
+        encoded = [(value or '').encode('utf-8') for value in values]
+        ends = []
+        for text in encoded:
+            self.length += len(text)
+            ends.append(self.length)
+        if self.length > MAX_UINT32:
+            raise ValueError("Snapshot string column is larger than 4 GiB")
+        self.offsets.extend(ends)
+        self.data.write(b''.join(encoded))
+
+    def sections(self):
+        return [('offsets', self.offsets.file), ('data', self.data)]
+
+    def header(self):
+        return {'type': 'string', 'count': self.count, 'length': self.length}
+
+
+class SnapshotWriter:
+    # columns: list of (name, typecode), where the typecode is an array-module code or 'string'
+    def __init__(self, columns):
+        self.columns = {
+            name: StringSpill() if typecode == 'string' else NumberSpill(typecode)
+            for name, typecode in columns
+        }
+
+    # Function to append a chunk of values to one column
+    def extend(self, name, values):
+        self.columns[name].extend(values)
+
+    # Function to write the snapshot file; rows is the length of the song columns
+    def write(self, path, rows):
+        header = {'version': VERSION, 'rows': rows, 'columns': {}}
+        position = 0
+        layout = []
+        for name, spill in self.columns.items():
+            entry = spill.header()
+            for key, handle in spill.sections():
+                size = handle.seek(0, 2)
+                entry[key] = position
+                layout.append((handle, size))
+                position = _align(position + size)
+            header['columns'][name] = entry
+        encoded = json.dumps(header).encode('utf-8')
+
+        with open(path, 'wb') as out:
+            out.write(MAGIC)
+            out.write(struct.pack('<I', len(encoded)))
+            out.write(encoded)
+            out.write(b'\0' * (_align(out.tell()) - out.tell()))
+            start = out.tell()
+            for handle, size in layout:
+                handle.seek(0)
+                shutil.copyfileobj(handle, out)
+                out.write(b'\0' * (_align(out.tell() - start) - (out.tell() - start)))
+
+    def close(self):
+        for spill in self.columns.values():
+            for _, handle in spill.sections():
+                handle.close()
+
+
+# Read-only view of a string column: len(), indexing and iteration decode one string at a time
+class StringColumn:
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('string column index out of range')
+        return str(self.data[self.offsets[index]:self.offsets[index + 1]], 'utf-8')
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+class Snapshot:
+    def __init__(self, path):
+        if sys.byteorder == 'big':
+            raise ValueError("Snapshots are little-endian and can't be mapped on this machine")
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError(f"{path} is not a snapshot") from None
+        if self._map[:len(MAGIC)] != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a snapshot")
+        (length,) = struct.unpack_from('<I', self._map, len(MAGIC))
+        header_start = len(MAGIC) + 4
+        header = json.loads(self._map[header_start:header_start + length])
+        if header['version'] != VERSION:
+            self.close()
+            raise ValueError(f"Unsupported snapshot version {header['version']}")
+        self.rows = header['rows']
+        self.columns = header['columns']
+        self._start = _align(header_start + length)
+        self._view = memoryview(self._map)
+
+    def _array(self, offset, typecode, count):
+        start = self._start + offset
+        size = array(typecode).itemsize
+        return self._view[start:start + count * size].cast(typecode)
+
+    # Function to return a column: a memoryview for numbers, a StringColumn for strings
+    def column(self, name):
+        spec = self.columns[name]
+        if spec['type'] == 'string':
+            start = self._start + spec['data']
+            return StringColumn(
+                self._array(spec['offsets'], 'I', spec['count'] + 1),
+                self._view[start:start + spec['length']],
+            )
+        return self._array(spec['offset'], spec['type'], spec['count'])
+
+    # Every memoryview handed out must be released (or garbage collected) before closing
+    def close(self):
+        if getattr(self, '_view', None) is not None:
+            self._view.release()
+            self._view = None
+        self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,228 @@
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+from sqlalchemy import select, func
+
+from models import engine, Artist, Song
+from dates import normalise_release_date
+
+# Catalog analytics for `cli.py stats`: songs and artists per genre, a BPM histogram per genre,
+# the artists with the most songs and the distribution of release years.
+#
+# The song columns involved (artist_id, bpm, release_date) are read in one pass over the table
+# and aggregated with NumPy. SQLite can only GROUP BY an unindexed column by sorting every row,
+# which takes seconds on a large catalog, and fetching a million rows as Python tuples is about
+# as slow. Instead each column of a chunk of rows comes back as a single group_concat() string
+# that NumPy parses in one call, so no per-row Python objects are created (and no ORM objects).
+# Release dates are free text: only their distinct values are normalised.
+
+# Songs per group_concat() chunk (by rowid range), which bounds memory on very large catalogs
+CHUNK_ROWS = 250_000
+
+# Between release dates in the group_concat() string; not a character that appears in them
+DATE_SEPARATOR = '\x1f'
+
+NO_GENRE = '(no genre)'
+
+# Function to parse a comma-separated group_concat() of integers into an int64 array in one call.
+# np.fromstring stops quietly at anything that is not a number, so the count is checked against
+# the separators; a short result is an error rather than missing rows
+def parse_numbers(text):
+    if not text:
+        return np.zeros(0, dtype=np.int64)
+    numbers = np.fromstring(text, dtype=np.int64, sep=',')
+    if len(numbers) != text.count(',') + 1:
+        raise ValueError(f"Expected {text.count(',') + 1} comma-separated integers, read {len(numbers)}")
+    return numbers
+
+
+# Function to read (artist ids, bpms, Counter of release dates) for every song; missing artists and BPMs
+# are 0 and -1, missing release dates are left out of the Counter
+def read_song_columns(conn, chunk_rows=CHUNK_ROWS):
+    songs = Song.__table__
+    low, high = conn.execute(select(func.min(songs.c.id), func.max(songs.c.id))).one()
+    artist_ids, bpms = [], []
+    release_dates = Counter()
+    if low is None:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), release_dates
+
+    # The aggregates see the rows of one scan in the same order, so the artist and BPM columns
+    # line up. Release dates are only counted, so NULLs can be skipped (group_concat does)
+    query = select(
+        func.group_concat(func.coalesce(songs.c.artist_id, 0)),
+        func.group_concat(func.coalesce(songs.c.bpm, -1)),
+        func.group_concat(songs.c.release_date, DATE_SEPARATOR),
+    )
+    for start in range(low - 1, high, chunk_rows):
+        ids, tempos, dates = conn.execute(
+            query.where(songs.c.id > start, songs.c.id <= start + chunk_rows)
+        ).one()
+        artist_ids.append(parse_numbers(ids))
+        bpms.append(parse_numbers(tempos))
+        if dates is not None:
+            release_dates.update(dates.split(DATE_SEPARATOR))
+    return np.concatenate(artist_ids), np.concatenate(bpms), release_dates
+
+
+# Function to return (genre names, genre index per artist id, titles by artist id) for every artist.
+# Genres are grouped ignoring case and surrounding spaces, under their first spelling; index 0 is NO_GENRE
+def read_artists(conn, max_id):
+    artists = Artist.__table__
+    names = [NO_GENRE]
+    codes = {}
+    titles = {}
+    genre_of = np.zeros(max_id + 1, dtype=np.int64)
+    for artist_id, title, genre in conn.execute(select(artists.c.id, artists.c.title, artists.c.genre)):
+        titles[artist_id] = title
+        key = genre.strip().casefold() if genre else ''
+        if not key:
+            continue
+        if key not in codes:
+            codes[key] = len(names)
+            names.append(genre.strip())
+        if artist_id <= max_id:
+            genre_of[artist_id] = codes[key]
+    return names, genre_of, titles
+
+
+# Function to compute the whole report as a JSON-ready dict
+def catalog_stats(top=10, bin_width=10, bind=None):
+    if top < 1 or bin_width < 1:
+        raise ValueError("top and bin_width must be at least 1")
+    bind = bind if bind is not None else engine
+    started = time.perf_counter()
+    with bind.connect() as conn:
+        artist_ids, bpms, release_dates = read_song_columns(conn)
+        artist_count = conn.execute(select(func.count()).select_from(Artist.__table__)).scalar()
+        max_id = max(int(artist_ids.max()) if len(artist_ids) else 0,
+                     conn.execute(select(func.max(Artist.__table__.c.id))).scalar() or 0)
+        names, genre_of, titles = read_artists(conn, max_id)
+
+    # Songs without an artist have artist id 0, which has no genre
+    song_genres = genre_of[artist_ids]
+    songs_per_genre = np.bincount(song_genres, minlength=len(names))
+    songs_per_artist = np.bincount(artist_ids, minlength=max_id + 1)
+    songs_per_artist[0] = 0
+    artists_per_genre = np.bincount(genre_of[list(titles)], minlength=len(names)) if titles else np.zeros(len(names), dtype=np.int64)
+
+    has_bpm = bpms >= 0
+    tempo_genres = song_genres[has_bpm]
+    bins = bpms[has_bpm] // bin_width
+    first_bin = int(bins.min()) if len(bins) else 0
+    bin_count = int(bins.max()) - first_bin + 1 if len(bins) else 0
+    histogram = np.bincount(
+        tempo_genres * bin_count + (bins - first_bin), minlength=len(names) * bin_count,
+    ).reshape(len(names), bin_count)
+    bpm_totals = np.bincount(tempo_genres, weights=bpms[has_bpm], minlength=len(names))
+    bpm_songs = np.bincount(tempo_genres, minlength=len(names))
+
+    genre_order = [int(code) for code in np.argsort(-songs_per_genre, kind='stable') if songs_per_genre[code]]
+    ranked = np.argsort(-songs_per_artist, kind='stable')[:top]
+
+    normalised = {}
+    missing = len(artist_ids) - sum(release_dates.values())
+    unrecognised = 0
+    years = Counter()
+    for text, count in release_dates.items():
+        iso = normalise_release_date(text)
+        if iso is None:
+            if text.strip():
+                unrecognised += count
+            else:
+                missing += count
+            continue
+        normalised[iso] = normalised.get(iso, 0) + count
+        years[int(iso[:4])] += count
+
+    return {
+        'songs': int(len(artist_ids)),
+        'artists': int(artist_count),
+        'genres': [
+            {
+                'genre': names[code],
+                'songs': int(songs_per_genre[code]),
+                'artists': int(artists_per_genre[code]),
+                'songs_with_bpm': int(bpm_songs[code]),
+                'average_bpm': round(float(bpm_totals[code] / bpm_songs[code]), 1) if bpm_songs[code] else None,
+            }
+            for code in genre_order
+        ],
+        'bpm_histogram': {
+            'bin_width': bin_width,
+            'bins': [(first_bin + i) * bin_width for i in range(bin_count)],
+            'genres': {names[code]: [int(count) for count in histogram[code]] for code in genre_order},
+            'songs_without_bpm': int(len(bpms) - has_bpm.sum()),
+        },
+        'top_artists': [
+            {
+                'id': int(artist_id),
+                'title': titles.get(int(artist_id)),
+                'genre': names[genre_of[artist_id]],
+                'songs': int(songs_per_artist[artist_id]),
+            }
+            for artist_id in ranked if songs_per_artist[artist_id]
+        ],
+        'release_years': [{'year': year, 'songs': years[year]} for year in sorted(years)],
+        'release_dates': {
+            'dated': sum(normalised.values()),
+            'missing': missing,
+            'unrecognised': unrecognised,
+            'earliest': min(normalised) if normalised else None,
+            'latest': max(normalised) if normalised else None,
+        },
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 1),
+    }
+
+
+# Function to write rows as a plain text table, numbers aligned right
+def write_table(headers, rows, out):
+    cells = [[str(value) for value in headers]]
+    cells += [['' if value is None else str(value) for value in row] for row in rows]
+    widths = [max(len(row[i]) for row in cells) for i in range(len(headers))]
+    numeric = [all(isinstance(row[i], (int, float)) or row[i] is None for row in rows) for i in range(len(headers))]
+    for row in cells:
+        out.write('  '.join(
+            cell.rjust(width) if right else cell.ljust(width)
+            for cell, width, right in zip(row, widths, numeric)
+        ).rstrip() + '\n')
+
+
+# Function to print the report as tables
+def write_report(stats, out=None):
+    out = out if out is not None else sys.stdout
+    dates = stats['release_dates']
+    out.write(f"{stats['songs']:,} songs by {stats['artists']:,} artists\n\nSongs per genre\n")
+    write_table(
+        ('Genre', 'Songs', 'Artists', 'With BPM', 'Avg BPM'),
+        [(g['genre'], g['songs'], g['artists'], g['songs_with_bpm'], g['average_bpm']) for g in stats['genres']],
+        out,
+    )
+
+    histogram = stats['bpm_histogram']
+    out.write(f"\nBPM histogram ({histogram['bin_width']} BPM bins, {histogram['songs_without_bpm']:,} songs without BPM)\n")
+    write_table(
+        ('BPM',) + tuple(histogram['genres']),
+        [
+            (f"{low}-{low + histogram['bin_width'] - 1}",) + tuple(counts[i] for counts in histogram['genres'].values())
+            for i, low in enumerate(histogram['bins'])
+        ],
+        out,
+    )
+
+    out.write("\nArtists with the most songs\n")
+    write_table(
+        ('ID', 'Artist', 'Genre', 'Songs'),
+        [(a['id'], a['title'], a['genre'], a['songs']) for a in stats['top_artists']],
+        out,
+    )
+
+    span = f" from {dates['earliest']} to {dates['latest']}" if dates['dated'] else ''
+    out.write(
+        f"\nRelease years ({dates['dated']:,} dated{span}, "
+        f"{dates['missing']:,} missing, {dates['unrecognised']:,} unrecognised)\n"
+    )
+    write_table(('Year', 'Songs'), [(y['year'], y['songs']) for y in stats['release_years']], out)
+    out.write(f"\nComputed in {stats['elapsed_ms'] / 1000:.2f}s\n")
+    out.flush()
@@ -0,0 +1,85 @@
+import heapq
+from collections import namedtuple
+from itertools import islice
+
+from sqlalchemy import select
+
+from models import session, Artist, Song
+
+# Tempo-compatible song lookup. A target of 124 BPM with 3% tolerance matches 120.3-127.7 BPM,
+# plus half time (60.1-63.9) and double time (240.6-255.4). Each band is read outwards from
+# its centre with two range scans on ix_songs_table_bpm (one up, one down), and the streams
+# are merged by how far each song is from the target, so a query reads at most
+# offset + limit rows per stream no matter how big the catalog is.
+
+#deviation is the distance from the target in percent, after scaling half/double time songs
+TempoMatch = namedtuple('TempoMatch', 'id title artist genre bpm relation deviation')
+
+# (relation, multiplier applied to the target)
+RELATIONS = (
+    ('exact', 1.0),
+    ('half', 0.5),
+    ('double', 2.0),
+)
+
+# From this tolerance (in percent) up, the exact band reaches into the half and double time
+# bands and a song would be returned twice; 1 + x = 2 * (1 - x) at x = 1/3
+MAX_HALF_DOUBLE_TOLERANCE = 100 / 3
+
+
+def _base_query(genre):
+    songs = Song.__table__
+    artists = Artist.__table__
+    query = select(songs.c.id, songs.c.title, artists.c.title, artists.c.genre, songs.c.bpm).select_from(
+        songs.outerjoin(artists, songs.c.artist_id == artists.c.id)
+    )
+    if genre:
+        # Tested on the joined artist row while walking the bpm index, so the walk still stops after
+        # `limit` matches. LIKE is case-insensitive for ASCII; genres are free text such as "Pop. Afrobeat"
+        query = query.where(artists.c.genre.like(f"%{genre}%"))
+    return query
+
+
+# Generator of matches in one direction from the centre of a band, nearest first
+def _band_stream(conn, genre, relation, centre, low, high, upwards, limit, target):
+    bpm = Song.__table__.c.bpm
+    song_id = Song.__table__.c.id
+    query = _base_query(genre)
+    if upwards:
+        query = query.where(bpm >= centre, bpm <= high).order_by(bpm, song_id)
+    else:
+        query = query.where(bpm < centre, bpm >= low).order_by(bpm.desc(), song_id.desc())
+    scale = target / centre
+    # Plain Core rows; these are read-only results, not ORM objects
+    for row in conn.execute(query.limit(limit)):
+        deviation = abs(row[4] * scale - target) / target * 100
+        yield TempoMatch(*row, relation, deviation)
+
+
+# Function to return songs within tolerance percent of target (and of its half/double time),
+# closest first; ties keep exact before half before double
+def find_compatible(target, tolerance=3.0, genre=None, limit=50, offset=0, half_double=True):
+    if target <= 0:
+        raise ValueError("Target BPM must be positive")
+    if tolerance < 0:
+        raise ValueError("Tolerance cannot be negative")
+    if half_double and tolerance >= MAX_HALF_DOUBLE_TOLERANCE:
+        raise ValueError(f"Tolerance must be under {MAX_HALF_DOUBLE_TOLERANCE:.1f}% with half and double time "
+                         f"matches, or the tempo bands overlap")
+    if limit < 0 or offset < 0:
+        raise ValueError("Limit and offset cannot be negative")
+    if limit == 0:
+        return []
+
+    wanted = offset + limit
+    conn = session.connection()
+    streams = []
+    for relation, multiplier in RELATIONS if half_double else RELATIONS[:1]:
+        centre = target * multiplier
+        low = centre * (1 - tolerance / 100)
+        high = centre * (1 + tolerance / 100)
+        for upwards in (True, False):
+            streams.append(_band_stream(conn, genre, relation, centre, low, high, upwards, wanted, target))
+
+    merged = heapq.merge(*streams, key=lambda match: match.deviation)
+    return list(islice(merged, offset, offset + limit))
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+
+import pytest
+from sqlalchemy import insert
+
+# The modules in lib/ import each other as siblings, as they do when run as `python lib/cli.py`
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+# models builds its default engine on import; keep it away from the real songdatabase.db
+os.environ.setdefault('SOUNDPLAY_DATABASE_URL', f"sqlite:///{os.path.join(tempfile.gettempdir(), 'soundplay-tests.db')}")
+
+
+# Fixture returning a function that creates a database holding the given artist and song rows and
+# points the scoped session at it; the session goes back to the default engine afterwards, and the
+# artist cache (which holds the IDs of one database) is emptied before and after
+@pytest.fixture
+def catalog(tmp_path):
+    import models
+    from models import make_engine, init_db, session, Artist, Song
+    from artist_cache import cache
+
+    engines = []
+    cache.clear()
+
+    def build(artists=(), songs=()):
+        engine = make_engine(f"sqlite:///{tmp_path / f'catalog_{len(engines)}.db'}")
+        engines.append(engine)
+        init_db(engine)
+        with engine.begin() as conn:
+            if artists:
+                conn.execute(insert(Artist.__table__), list(artists))
+            if songs:
+                conn.execute(insert(Song.__table__), list(songs))
+        session.remove()
+        session.configure(bind=engine)
+        return engine
+
+    yield build
+    session.remove()
+    session.configure(bind=models.engine)
+    cache.clear()
+    for engine in engines:
+        engine.dispose()
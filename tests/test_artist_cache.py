@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import event
+
+import operations
+from models import session
+from artist_cache import ArtistCache, cache
+
+
+@pytest.fixture
+def artists(catalog):
+    return catalog(
+        [{'id': 1, 'title': 'ASA', 'genre': 'afrobeat'}, {'id': 2, 'title': 'Daft Punk', 'genre': 'house'}],
+        [{'title': 'Jailer', 'artist_id': 1, 'bpm': 92}],
+    )
+
+
+# Function to run action() and return (its result, the statements it executed)
+def executed(engine, action):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.lstrip())
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        result = action()
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return result, statements
+
+
+# Function to run action() and return (its result, the number of SELECTs it executed)
+def selects(engine, action):
+    result, statements = executed(engine, action)
+    return result, sum(statement.upper().startswith('SELECT') for statement in statements)
+
+
+def test_warm_lookup_issues_no_select(artists):
+    first, cold = selects(artists, lambda: operations.find_artist_id('ASA'))
+    second, warm = selects(artists, lambda: operations.find_artist_id('ASA'))
+    assert first == second == (1, 'afrobeat')
+    assert (cold, warm) == (1, 0)
+    assert cache.stats()['hits'] >= 1
+
+
+def test_adding_a_song_for_a_cached_artist_selects_no_artist(artists):
+    operations.find_artist_id('ASA')
+    _, statements = executed(
+        artists, lambda: operations.get_or_create_song('Fire', operations.find_artist_id('ASA').id, None, 100),
+    )
+    assert statements
+    assert not [statement for statement in statements if 'artist_table' in statement]
+
+
+def test_rename_invalidates_the_old_name(artists):
+    operations.find_artist_id('ASA')
+    operations.update_artist(operations.find_artist('ASA'), title='Asa', genre='soul')
+    session.remove()
+
+    assert selects(artists, lambda: operations.find_artist_id('ASA')) == (None, 1)
+    assert selects(artists, lambda: operations.find_artist_id('Asa')) == ((1, 'soul'), 0)
+
+
+def test_delete_invalidates_the_name(artists):
+    operations.find_artist_id('Daft Punk')
+    operations.delete_artist(operations.find_artist('Daft Punk'))
+    session.remove()
+
+    assert selects(artists, lambda: operations.find_artist_id('Daft Punk')) == (None, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    small = ArtistCache(maxsize=2)
+    small.put('a', 1, None)
+    small.put('b', 2, None)
+    small.peek('a')
+    small.put('c', 3, None)
+    assert small.peek('b') is None
+    assert small.peek('a') == (1, None)
+    assert small.stats()['size'] == 2
+
+
+def test_cache_size_must_be_positive():
+    with pytest.raises(ValueError):
+        ArtistCache(maxsize=0)
@@ -0,0 +1,101 @@
+import pytest
+from sqlalchemy import insert, select, func
+
+from models import Artist, Song, ScannedFile
+from batch import SongFilter, read_ids, delete_songs, update_songs, delete_artists
+
+
+@pytest.fixture
+def songs(catalog):
+    engine = catalog(
+        [
+            {'id': 1, 'title': 'ASA', 'genre': 'afrobeat'},
+            {'id': 2, 'title': 'Old Band', 'genre': 'polka'},
+            {'id': 3, 'title': 'Silent', 'genre': 'polka'},
+        ],
+        [{'id': number, 'title': f"Song {number}", 'artist_id': 1 + number % 2, 'bpm': 80 + number * 10}
+         for number in range(1, 9)],
+    )
+    with engine.begin() as conn:
+        conn.execute(insert(ScannedFile.__table__), [
+            {'path': f"/music/{number}.wav", 'size': 1, 'mtime_ns': 1, 'song_id': number} for number in (1, 2)
+        ])
+    return engine
+
+
+def count(engine, table, *conditions):
+    with engine.connect() as conn:
+        return conn.execute(select(func.count()).select_from(table).where(*conditions)).scalar()
+
+
+def test_delete_artists_deletes_their_songs(songs):
+    assert delete_artists(titles=['Old Band'], bind=songs) == (1, 4)
+    assert count(songs, Artist, Artist.title == 'Old Band') == 0
+    assert count(songs, Song) == 4
+    assert count(songs, Song, Song.artist_id == 2) == 0
+
+
+def test_delete_artists_without_songs(songs):
+    assert delete_artists(genre='polka', without_songs=True, bind=songs) == (1, 0)
+    assert count(songs, Artist) == 2
+
+
+def test_deleting_a_song_unlinks_its_scanned_files(songs):
+    assert delete_songs(SongFilter(ids={1}), bind=songs) == 1
+    with songs.connect() as conn:
+        links = dict(conn.execute(select(ScannedFile.path, ScannedFile.song_id)).all())
+    assert links == {'/music/1.wav': None, '/music/2.wav': 2}
+
+
+def test_update_songs(songs):
+    assert update_songs(SongFilter(artist='ASA', bpm_min=120), bpm=125, bind=songs) == 3
+    assert count(songs, Song, Song.bpm == 125) == 3
+    assert update_songs(SongFilter(genre='polka'), clear_bpm=True, artist='ASA', bind=songs) == 4
+    assert count(songs, Song, Song.artist_id == 1) == 8
+
+
+@pytest.mark.parametrize('change', [
+    lambda bind, dry_run: delete_songs(SongFilter(bpm_max=120), dry_run=dry_run, bind=bind),
+    lambda bind, dry_run: update_songs(SongFilter(ids={1, 2, 3, 99}), bpm=1, dry_run=dry_run, bind=bind),
+    lambda bind, dry_run: delete_artists(genre='polka', dry_run=dry_run, bind=bind),
+])
+def test_dry_run_changes_nothing_and_counts_the_same(songs, change):
+    def snapshot():
+        with songs.connect() as conn:
+            return (conn.execute(select(Song.id, Song.bpm, Song.artist_id).order_by(Song.id)).all(),
+                    conn.execute(select(Artist.id).order_by(Artist.id)).all())
+
+    before = snapshot()
+    counted = change(songs, True)
+    assert snapshot() == before
+    assert change(songs, False) == counted
+
+
+@pytest.mark.parametrize('chosen', [SongFilter(), SongFilter(artist='Nobody')])
+def test_bad_filters(songs, chosen):
+    with pytest.raises(ValueError):
+        delete_songs(chosen, bind=songs)
+
+
+def test_delete_artists_needs_foreign_keys(songs):
+    with songs.connect() as conn:
+        conn.exec_driver_sql("PRAGMA foreign_keys = OFF")
+        conn.commit()
+    # The setting is per connection; this one goes back to the pool and is reused
+    with pytest.raises(ValueError):
+        delete_artists(titles=['ASA'], bind=songs)
+    assert count(songs, Artist) == 3
+
+
+def test_read_ids(tmp_path):
+    path = tmp_path / 'ids.txt'
+    path.write_text("# retired\n1, 2 3\n\n4 # last one\n2\n", encoding='utf-8')
+    assert read_ids(str(path)) == {1, 2, 3, 4}
+
+
+@pytest.mark.parametrize('text', ["1\n2x\n", "1 -2\n", "3.5\n"])
+def test_read_ids_rejects_malformed_files(tmp_path, text):
+    path = tmp_path / 'ids.txt'
+    path.write_text(text, encoding='utf-8')
+    with pytest.raises(ValueError):
+        read_ids(str(path))
@@ -0,0 +1,95 @@
+import pytest
+from sqlalchemy import insert, select
+
+from models import Artist, Song, ScannedFile
+from dedupe import fold, normalise_title, find_duplicates, merge
+
+
+@pytest.mark.parametrize('title, key', [
+    ("Halo (Remastered)", 'halo'),
+    ("Halo - 2011 Remaster", 'halo'),
+    ("Halo [Radio Edit]", 'halo'),
+    ("Halo (Live)", 'halo live'),
+    ("Halo (Live) (Remastered)", 'halo live'),
+])
+def test_normalise_title(title, key):
+    assert normalise_title(title) == key
+
+
+def test_normalise_title_with_all_suffixes():
+    assert normalise_title("Halo (Live)", all_suffixes=True) == 'halo'
+
+
+@pytest.mark.parametrize('text, folded', [
+    ("Beyoncé", 'beyonce'),
+    ("BEYONCE", 'beyonce'),
+    ("  Daft   Punk ", 'daft punk'),
+    ("Sigur Rós", 'sigur ros'),
+    ("AC/DC", 'ac dc'),
+    ("!!!", '!!!'),
+])
+def test_fold(text, folded):
+    assert fold(text) == folded
+
+
+@pytest.fixture
+def duplicates(catalog):
+    song = dict.fromkeys(('artist_id', 'bpm', 'release_date'))
+    engine = catalog(
+        [
+            {'id': 1, 'title': 'Daft Punk', 'genre': None},
+            {'id': 2, 'title': 'daft punk ', 'genre': 'house'},
+            {'id': 3, 'title': 'Other', 'genre': 'pop'},
+        ],
+        [dict(song, **row) for row in (
+            {'id': 10, 'title': 'One More Time', 'artist_id': 1},
+            {'id': 11, 'title': 'One More Time (Remastered)', 'artist_id': 1, 'bpm': 123, 'release_date': '2000'},
+            {'id': 12, 'title': 'one more time', 'artist_id': 2},
+            {'id': 13, 'title': 'Da Funk', 'artist_id': 2, 'bpm': 111},
+            {'id': 14, 'title': 'One More Time (Live)', 'artist_id': 1},
+            {'id': 20, 'title': 'Halo', 'bpm': 80},
+            {'id': 21, 'title': 'halo', 'bpm': 90},
+            {'id': 30, 'title': 'Song', 'artist_id': 3, 'bpm': 100},
+            {'id': 31, 'title': 'Song (Remastered)', 'artist_id': 3, 'bpm': 101},
+        )],
+    )
+    with engine.begin() as conn:
+        conn.execute(insert(ScannedFile.__table__), [
+            {'path': '/music/omt.wav', 'size': 1, 'mtime_ns': 1, 'song_id': 12},
+            {'path': '/music/omt-remaster.wav', 'size': 1, 'mtime_ns': 1, 'song_id': 11},
+        ])
+    return engine
+
+
+def test_find_duplicates(duplicates):
+    plan = find_duplicates(duplicates)
+    assert [(group.keep.id, [other.id for other in group.merged], group.genre) for group in plan.artist_groups] == [
+        (1, [2], 'house'),
+    ]
+    assert [(group.keep.id, sorted(row.id for row in group.merged)) for group in plan.song_groups] == [(10, [11, 12])]
+    assert (plan.song_groups[0].bpm, plan.song_groups[0].release_date) == (123, '2000')
+    # Songs with no artist are never matched, and different BPMs are listed rather than merged
+    assert [(group.keep.id, [row.id for row in group.merged]) for group in plan.conflicts] == [(30, [31])]
+    assert (plan.songs, plan.artists) == (9, 3)
+
+
+def test_merge(duplicates):
+    plan = find_duplicates(duplicates)
+    assert merge(plan, duplicates) == (1, 2)
+
+    with duplicates.connect() as conn:
+        artists = conn.execute(select(Artist.id, Artist.title, Artist.genre).order_by(Artist.id)).all()
+        songs = dict(conn.execute(select(Song.id, Song.artist_id)).all())
+        kept = conn.execute(select(Song.bpm, Song.release_date).where(Song.id == 10)).one()
+        files = set(conn.execute(select(ScannedFile.song_id)).scalars())
+    assert artists == [(1, 'Daft Punk', 'house'), (3, 'Other', 'pop')]
+    assert songs == {10: 1, 13: 1, 14: 1, 20: None, 21: None, 30: 3, 31: 3}
+    assert tuple(kept) == (123, '2000')
+    assert files == {10}
+
+
+def test_nothing_to_merge_after_merging(duplicates):
+    merge(find_duplicates(duplicates), duplicates)
+    plan = find_duplicates(duplicates)
+    assert not plan
+    assert len(plan.conflicts) == 1
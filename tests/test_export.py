@@ -0,0 +1,93 @@
+import csv
+
+import pytest
+
+from export import export, parse_date_bound
+from importer import import_file
+from snapshot import Snapshot
+
+SONGS = [
+    ('Jailer', 1, 92, '2007'),
+    ('Fire on the Mountain', 1, None, '17/03/2008'),
+    ('Around the World', 2, 121, '1997-03-17'),
+    ('Da Funk', 2, 111, 'January 1995'),
+    ('Ünïcödé, "quoted"', 2, 128, 'circa 1999'),
+    ('Orphan', None, 100, None),
+    ('Someday', 3, 140, 'someday'),
+]
+
+
+@pytest.fixture
+def songs(catalog):
+    return catalog(
+        [
+            {'id': 1, 'title': 'ASA', 'genre': 'Afrobeat'},
+            {'id': 2, 'title': 'Daft Punk', 'genre': 'house'},
+            {'id': 3, 'title': 'Nobody', 'genre': None},
+        ],
+        [{'title': title, 'artist_id': artist_id, 'bpm': bpm, 'release_date': released}
+         for title, artist_id, bpm, released in SONGS],
+    )
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as handle:
+        return list(csv.DictReader(handle))
+
+
+# Function to return (title, artist, genre, release_date, bpm) of every song in a snapshot
+def read_snapshot(path):
+    with Snapshot(path) as snapshot:
+        artists = dict(zip(snapshot.column('artist.id'),
+                           zip(snapshot.column('artist.title'), snapshot.column('artist.genre'))))
+        columns = [list(snapshot.column(name)) for name in ('title', 'artist_id', 'release_date', 'bpm')]
+    return [
+        (title, *artists.get(artist_id, ('', '')), release_date, bpm)
+        for title, artist_id, release_date, bpm in zip(*columns)
+    ]
+
+
+def test_csv_and_snapshot_round_trip(songs, tmp_path, catalog):
+    assert export(str(tmp_path / 'songs.csv'), bind=songs) == len(SONGS)
+    assert export(str(tmp_path / 'songs.snap'), bind=songs) == len(SONGS)
+    rows = read_csv(tmp_path / 'songs.csv')
+    assert [(row['title'], row['artist'], row['bpm'], row['release_date']) for row in rows][:3] == [
+        ('Jailer', 'ASA', '92', '2007'),
+        ('Fire on the Mountain', 'ASA', '', '17/03/2008'),
+        ('Around the World', 'Daft Punk', '121', '1997-03-17'),
+    ]
+    assert read_snapshot(tmp_path / 'songs.snap') == [
+        (row['title'], row['artist'], row['genre'], row['release_date'], int(row['bpm'] or 0)) for row in rows
+    ]
+
+    # The CSV loads into another database, which exports the same snapshot (less the song without an artist)
+    copy = catalog()
+    stats = import_file(str(tmp_path / 'songs.csv'), bind=copy)
+    assert (stats.inserted, stats.invalid) == (len(SONGS) - 1, 1)
+    export(str(tmp_path / 'copy.snap'), bind=copy)
+    assert read_snapshot(tmp_path / 'copy.snap') == [
+        row for row in read_snapshot(tmp_path / 'songs.snap') if row[0] != 'Orphan'
+    ]
+
+
+@pytest.mark.parametrize('released_from, released_to, titles', [
+    ('1995', '1999', ['Around the World', 'Da Funk', 'Ünïcödé, "quoted"']),
+    ('1997-03', None, ['Jailer', 'Fire on the Mountain', 'Around the World', 'Ünïcödé, "quoted"']),
+    (None, '1995-01', ['Da Funk']),
+    ('2008-03-17', '2008-03-17', ['Fire on the Mountain']),
+])
+def test_date_filters_read_dates_like_stats(songs, tmp_path, released_from, released_to, titles):
+    path = tmp_path / 'filtered.csv'
+    export(str(path), bind=songs, released_from=released_from, released_to=released_to)
+    assert [row['title'] for row in read_csv(path)] == titles
+
+
+@pytest.mark.parametrize('text', ['1999-13', '2020-02-31', '2021-02-29', '99', '1999-1', '1999/01'])
+def test_invalid_date_bounds(text):
+    with pytest.raises(ValueError):
+        parse_date_bound(text)
+
+
+@pytest.mark.parametrize('text', ['1999', '1999-12', '2020-02-29', None])
+def test_valid_date_bounds(text):
+    assert parse_date_bound(text) == text
@@ -0,0 +1,88 @@
+import pytest
+from sqlalchemy import select, func
+
+from models import Artist, Song
+from importer import read_rows, normalise_rows, _parse_bpm, BulkImporter
+
+
+@pytest.mark.parametrize('value, bpm', [
+    ('120', 120), ('99.6', 100), (128.4, 128), ('inf', None), ('-inf', None), ('nan', None),
+    ('1e999', None), ('fast', None), ('', None), (None, None),
+])
+def test_parse_bpm(value, bpm):
+    assert _parse_bpm(value) == bpm
+
+
+def test_csv_with_byte_order_mark(tmp_path):
+    path = tmp_path / 'songs.csv'
+    path.write_bytes('﻿title,artist,bpm\nOne,Band,120\n'.encode('utf-8'))
+    assert list(normalise_rows(read_rows(str(path)))) == [
+        {'title': 'One', 'artist': 'Band', 'genre': None, 'release_date': None, 'bpm': 120},
+    ]
+
+
+def test_jsonl_lines_that_are_not_objects_are_invalid(tmp_path):
+    path = tmp_path / 'songs.jsonl'
+    path.write_text('{"title": "One", "artist": "Band"}\n[1, 2]\n{not json\n"text"\n\n', encoding='utf-8')
+    records = list(normalise_rows(read_rows(str(path))))
+    assert len(records) == 4
+    assert records[0]['title'] == 'One'
+    assert records[1:] == [None, None, None]
+
+
+@pytest.mark.parametrize('row', [
+    {'title': '   ', 'artist': 'Band'},
+    {'title': 'One', 'artist': ' \t'},
+    {'title': 'One'},
+    {'title': 'One', 'artist': 'Band', 'bpm': '-120'},
+    {'title': 'One', 'artist': 'Band', 'bpm': -3.6},
+])
+def test_rows_that_cannot_be_imported(row):
+    assert list(normalise_rows([row])) == [None]
+
+
+def record(title, artist, bpm=None):
+    return {'title': title, 'artist': artist, 'genre': 'pop', 'release_date': None, 'bpm': bpm}
+
+
+def test_duplicate_across_chunks_is_inserted_once(catalog):
+    engine = catalog()
+    stats = BulkImporter(bind=engine, batch_size=2).run(
+        [record('One', 'Band'), record('Two', 'Band'), record('One', 'Band'), None, record('Three', 'Band')]
+    )
+    assert (stats.rows, stats.inserted, stats.duplicates, stats.invalid) == (5, 3, 1, 1)
+    with engine.connect() as conn:
+        assert sorted(conn.execute(select(Song.title)).scalars()) == ['One', 'Three', 'Two']
+
+
+def test_existing_artists_and_songs_are_reused(catalog):
+    engine = catalog([{'id': 7, 'title': 'Band', 'genre': 'rock'}],
+                     [{'title': 'One', 'artist_id': 7, 'bpm': 100}])
+    stats = BulkImporter(bind=engine, batch_size=10).run(
+        [record('One', 'Band'), record('Two', 'Band'), record('Solo', 'Newcomer')]
+    )
+    assert (stats.inserted, stats.duplicates, stats.artists_created) == (2, 1, 1)
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(Artist)).scalar() == 2
+        assert conn.execute(select(Song.artist_id).where(Song.title == 'Two')).scalar() == 7
+
+
+def test_each_chunk_commits_on_its_own(catalog, monkeypatch):
+    engine = catalog()
+    importer = BulkImporter(bind=engine, batch_size=2)
+    import_chunk = importer._import_chunk
+    calls = []
+
+    # The second chunk fails after its rows have been inserted
+    def failing(conn, records):
+        import_chunk(conn, records)
+        calls.append(len(records))
+        if len(calls) == 2:
+            raise RuntimeError("disk full")
+
+    monkeypatch.setattr(importer, '_import_chunk', failing)
+    with pytest.raises(RuntimeError):
+        importer.run([record('One', 'Band'), record('Two', 'Band'), record('Three', 'Other'), record('Four', 'Other')])
+    with engine.connect() as conn:
+        assert sorted(conn.execute(select(Song.title)).scalars()) == ['One', 'Two']
+        assert list(conn.execute(select(Artist.title)).scalars()) == ['Band']
@@ -0,0 +1,46 @@
+import io
+
+import pytest
+from sqlalchemy import event
+
+from listing import write_songs_by_bpm, write_songs_by_artist
+
+
+# Function to build a catalog of `artists` artists of `songs_each` songs
+def catalog_of(catalog, artists, songs_each):
+    return catalog(
+        [{'id': number, 'title': f"Artist {number}", 'genre': 'pop'} for number in range(1, artists + 1)],
+        [{'title': f"Song {number}-{song}", 'artist_id': number, 'bpm': 60 + song % 120, 'release_date': '2020'}
+         for number in range(1, artists + 1) for song in range(songs_each)],
+    )
+
+
+# Function to run listing() and return (statements executed, lines written)
+def count_statements(engine, listing):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        out = io.StringIO()
+        listing(out)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    return len(statements), out.getvalue().count('\n')
+
+
+@pytest.mark.parametrize('listing, lines', [
+    (lambda out: write_songs_by_bpm(out=out, color=False, chunk_size=50), lambda artists, songs: artists * songs),
+    (lambda out: write_songs_by_artist(1, out=out, color=False, chunk_size=50), lambda artists, songs: songs),
+])
+def test_statement_count_does_not_grow_with_catalog(catalog, listing, lines):
+    counts = []
+    for artists, songs_each in ((2, 3), (40, 30)):
+        engine = catalog_of(catalog, artists, songs_each)
+        statements, written = count_statements(engine, listing)
+        assert written == lines(artists, songs_each)
+        counts.append(statements)
+    assert counts[0] == counts[1]
+    assert counts[0] == 1
@@ -0,0 +1,118 @@
+import pytest
+from sqlalchemy import create_engine
+
+from models import make_engine, init_db
+from migrate import migrate, check_query_plans, current_version, MigrationError, LATEST_VERSION
+
+# The tables as the original OneToMany.py created them: no constraints besides the primary keys
+# and an unenforced foreign key, and no indexes
+LEGACY_SCHEMA = [
+    "CREATE TABLE artist_table (id INTEGER NOT NULL, title VARCHAR, genre VARCHAR, PRIMARY KEY (id))",
+    'CREATE TABLE songs_table (id INTEGER NOT NULL, title VARCHAR, "release_Date" TEXT, bpm INTEGER, '
+    'artist_id INTEGER, PRIMARY KEY (id), FOREIGN KEY(artist_id) REFERENCES artist_table (id))',
+]
+
+
+# Function to create a database with the legacy schema and rows, without the foreign_keys PRAGMA
+def legacy_database(path, artists, songs):
+    engine = create_engine(f"sqlite:///{path}")
+    with engine.begin() as conn:
+        for statement in LEGACY_SCHEMA:
+            conn.exec_driver_sql(statement)
+        conn.exec_driver_sql("INSERT INTO artist_table (id, title, genre) VALUES (?, ?, ?)", artists)
+        if songs:
+            conn.exec_driver_sql(
+                'INSERT INTO songs_table (id, title, "release_Date", bpm, artist_id) VALUES (?, ?, ?, ?, ?)', songs
+            )
+    engine.dispose()
+    return make_engine(f"sqlite:///{path}")
+
+
+@pytest.fixture
+def legacy(tmp_path):
+    engine = legacy_database(
+        tmp_path / 'legacy.db',
+        [(1, 'ASA', 'Afrobeat'), (2, 'Daft Punk', None)],
+        [
+            (1, 'Jailer', '2007', 92, 1),
+            (2, None, None, None, 1),
+            (3, 'Around the World', '17/03/1997', 121, 2),
+            # By an artist deleted before foreign keys were enforced
+            (4, 'Lost', None, 100, 9),
+        ],
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_migrate_legacy_database(legacy):
+    applied = migrate(legacy)
+    assert [number for number, _ in applied] == list(range(1, LATEST_VERSION + 1))
+
+    with legacy.connect() as conn:
+        assert current_version(conn) == LATEST_VERSION
+        indexes = {row[1]: row[2] for row in conn.exec_driver_sql("PRAGMA index_list(songs_table)")}
+        bpm_index = [row[2] for row in conn.exec_driver_sql("PRAGMA index_info(ix_songs_table_bpm)")]
+        artist_unique = [row[2] for row in conn.exec_driver_sql("PRAGMA index_list(artist_table)")]
+        songs = conn.exec_driver_sql(
+            "SELECT id, title, release_date, bpm, artist_id FROM songs_table ORDER BY id"
+        ).all()
+        artists = conn.exec_driver_sql("SELECT id, title, genre FROM artist_table ORDER BY id").all()
+        song_key = conn.exec_driver_sql("PRAGMA foreign_key_list(songs_table)").one()
+        found = conn.exec_driver_sql("SELECT rowid FROM songs_fts WHERE songs_fts MATCH 'world'").scalars().all()
+
+    assert {'ix_songs_table_artist_id', 'ix_songs_table_title_artist_id', 'ix_songs_table_bpm',
+            'ix_songs_table_title'} <= set(indexes)
+    assert bpm_index == ['bpm', 'id', 'artist_id']
+    assert 1 in artist_unique
+    # Every row survives the rebuilds; a missing title is filled in and a dangling artist unlinked
+    assert [tuple(row) for row in artists] == [(1, 'ASA', 'Afrobeat'), (2, 'Daft Punk', None)]
+    assert [tuple(row) for row in songs] == [
+        (1, 'Jailer', '2007', 92, 1),
+        (2, 'Untitled', None, None, 1),
+        (3, 'Around the World', '17/03/1997', 121, 2),
+        (4, 'Lost', None, 100, None),
+    ]
+    assert (song_key[2], song_key[3], song_key[6]) == ('artist_table', 'artist_id', 'CASCADE')
+    assert found == [3]
+
+
+def test_migrate_is_idempotent(legacy):
+    migrate(legacy)
+    assert migrate(legacy) == []
+
+
+def test_duplicate_artist_titles_stop_the_migration(tmp_path):
+    engine = legacy_database(tmp_path / 'duplicates.db', [(1, 'ASA', None), (2, 'ASA', None)], [])
+    with pytest.raises(MigrationError):
+        migrate(engine)
+    # Rolled back completely: still the legacy schema at version 0
+    with engine.connect() as conn:
+        assert current_version(conn) == 0
+        assert conn.exec_driver_sql("SELECT count(*) FROM artist_table").scalar() == 2
+    engine.dispose()
+
+
+def test_newer_database_is_refused(legacy):
+    migrate(legacy)
+    with legacy.begin() as conn:
+        conn.exec_driver_sql(f"PRAGMA user_version = {LATEST_VERSION + 1}")
+    with pytest.raises(MigrationError):
+        migrate(legacy)
+
+
+def test_hot_queries_use_indexes(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    init_db(engine)
+    assert check_query_plans(engine) == []
+
+
+def test_missing_index_is_reported(tmp_path):
+    engine = make_engine(f"sqlite:///{tmp_path / 'plans.db'}")
+    init_db(engine)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("DROP INDEX ix_songs_table_bpm")
+    problems = check_query_plans(engine)
+    names = {name for name, _ in problems}
+    assert {'songs ordered by bpm', 'tempo band', 'tempo index'} <= names
+    assert any(detail.startswith('SCAN songs_table') for _, detail in problems)
@@ -0,0 +1,88 @@
+import random
+
+import numpy as np
+import pytest
+
+import playlist
+from playlist import TempoIndex, plan_set, build_playlist
+
+
+def index_of(bpms, artists=None):
+    bpm = np.array(bpms, dtype=np.int64)
+    song_ids = np.arange(1, len(bpms) + 1, dtype=np.int64)
+    artist_ids = np.array(artists if artists is not None else range(1, len(bpms) + 1), dtype=np.int64)
+    return TempoIndex(bpm, song_ids, artist_ids)
+
+
+def tempos(index, positions):
+    return [int(index.bpm[position]) for position in positions]
+
+
+def test_end_tempo_is_a_target_not_an_exact_value():
+    index = index_of([120, 122, 123])
+    assert tempos(index, plan_set(index, 120, 124, length=3, max_step=2, rng=random.Random(0))) == [120, 122, 123]
+
+
+def test_fractional_end_tempo():
+    index = index_of([120, 121, 122, 123, 124, 125])
+    picked = tempos(index, plan_set(index, 120, 124.5, length=3, max_step=3, rng=random.Random(0)))
+    assert picked[0] == 120
+    assert abs(picked[-1] - 124.5) <= 3
+    assert all(abs(b - a) <= 3 for a, b in zip(picked, picked[1:]))
+
+
+def test_artist_gap_is_kept():
+    index = index_of([120] * 6, artists=[1, 1, 1, 2, 2, 2])
+    picked = plan_set(index, 120, 120, length=6, max_step=1, artist_gap=1, rng=random.Random(3))
+    artists = [int(index.artist_ids[position]) for position in picked]
+    assert all(a != b for a, b in zip(artists, artists[1:]))
+
+
+def test_steps_too_large_for_the_length():
+    with pytest.raises(ValueError):
+        plan_set(index_of([120, 140]), 120, 140, length=2, max_step=3)
+
+
+@pytest.fixture
+def songs(catalog):
+    genres = ['house', 'jazz']
+    return catalog(
+        [{'id': number, 'title': f"Artist {number}", 'genre': genres[number % 2]} for number in range(1, 41)],
+        [{'title': f"Song {number}", 'artist_id': 1 + number % 40, 'bpm': 118 + number % 11} for number in range(2000)],
+    )
+
+
+def test_sample_reads_at_most_per_tempo_songs(songs):
+    with songs.connect() as conn:
+        index = TempoIndex.sample(conn, 120, 124, 10, random.Random(1))
+    assert not index.complete
+    assert index.tempos.tolist() == [120, 121, 122, 123, 124]
+    assert np.diff(index.bounds).tolist() == [10] * 5
+    assert len(set(index.song_ids.tolist())) == 50
+
+
+def test_sample_of_small_tempos_is_complete(songs):
+    with songs.connect() as conn:
+        index = TempoIndex.sample(conn, 120, 121, 1000, random.Random(1), genres=['jazz'])
+        full = TempoIndex.load(conn, 120, 121, genres=['jazz'])
+    assert index.complete
+    assert index.song_ids.tolist() == full.song_ids.tolist()
+
+
+def test_build_playlist_reads_a_sample(songs):
+    built = build_playlist(119, 127, length=20, max_step=2, artist_gap=5, seed=4, bind=songs)
+    assert len(built.tracks) == 20
+    assert built.candidates < 2000
+    # A genre twice in a row: the artists' temporary table is not left behind
+    for _ in range(2):
+        built = build_playlist(120, 124, length=10, genres=['house'], artist_gap=3, seed=1, bind=songs)
+        assert {track.genre for track in built.tracks} == {'house'}
+
+
+def test_every_song_is_read_when_the_sample_is_too_small(songs, monkeypatch):
+    monkeypatch.setattr(playlist, 'SAMPLE_PER_TRACK', 0)
+    built = build_playlist(120, 124, length=10, seed=1, bind=songs)
+    assert len(built.tracks) == 10
+    with songs.connect() as conn:
+        in_range = conn.exec_driver_sql("SELECT count(*) FROM songs_table WHERE bpm BETWEEN 117 AND 127").scalar()
+    assert built.candidates == in_range
@@ -0,0 +1,151 @@
+import asyncio
+import json
+
+import pytest
+
+import server
+from server import Server, HTTPError, match_route, etag_matches, encode_cursor, decode_cursor, MAX_ID
+
+
+# A Server on a small catalog, called directly through respond() without opening a socket
+@pytest.fixture
+def api(catalog, monkeypatch):
+    engine = catalog(
+        [{'id': 1, 'title': 'Daft Punk', 'genre': 'house'}, {'id': 2, 'title': 'ASA', 'genre': 'soul'}],
+        [{'title': f"Song {number}", 'artist_id': 1 + number % 2, 'bpm': 100 + number} for number in range(10)],
+    )
+    monkeypatch.setattr(server, 'engine', engine)
+    api = Server(workers=2)
+    yield api
+    api.executor.shutdown()
+    api.version.close()
+
+
+# Function to return (status, headers, payload) for one request, or the HTTPError's status and payload
+def call(api, method, target, body=None, headers=None):
+    raw = json.dumps(body).encode() if isinstance(body, (dict, list)) else body
+    try:
+        return asyncio.run(api.respond(method, target, headers or {}, raw))
+    except HTTPError as exc:
+        return exc.status, {}, exc.payload
+
+
+def test_match_route():
+    route, ids = match_route('GET', '/artists/7/songs')
+    assert route.handler is server.artist_songs
+    assert ids == [7]
+
+
+def test_unknown_path_is_404():
+    with pytest.raises(HTTPError) as caught:
+        match_route('GET', '/albums')
+    assert caught.value.status == 404
+
+
+def test_id_too_large_for_sqlite_is_404():
+    match_route('GET', f"/songs/{MAX_ID}")
+    with pytest.raises(HTTPError) as caught:
+        match_route('GET', f"/songs/{MAX_ID + 1}")
+    assert caught.value.status == 404
+
+
+def test_wrong_method_is_405_with_allowed_methods():
+    with pytest.raises(HTTPError) as caught:
+        match_route('PUT', '/artists/1')
+    assert caught.value.status == 405
+    assert caught.value.payload['allow'] == ['GET', 'PATCH', 'DELETE']
+
+
+@pytest.mark.parametrize('header, matches', [
+    (None, False),
+    ('*', True),
+    ('W/"a.1.ff"', True),
+    ('"a.1.ff"', True),
+    ('"other", W/"a.1.ff"', True),
+    ('W/"a.2.ff"', False),
+])
+def test_etag_matches(header, matches):
+    assert etag_matches(header, 'W/"a.1.ff"') is matches
+
+
+@pytest.mark.parametrize('values, key_type, nullable', [
+    (["Daft Punk", 3], str, False),
+    ([120, 3], int, True),
+    ([None, 3], int, True),
+    (["a", MAX_ID], str, False),
+])
+def test_decode_cursor(values, key_type, nullable):
+    assert decode_cursor(encode_cursor(values), key_type, nullable) == values
+
+
+@pytest.mark.parametrize('values, key_type, nullable', [
+    (["a", 10 ** 24], str, False),
+    (["a", MAX_ID + 1], str, False),
+    (["a", -1], str, False),
+    (["a", True], str, False),
+    (["a", "3"], str, False),
+    ([1, 3], str, False),
+    ([None, 3], str, False),
+    (["a", 3], int, True),
+    ([True, 3], int, True),
+    ([10 ** 24, 3], int, True),
+    (["a"], str, False),
+    ({"a": 1}, str, False),
+])
+def test_bad_cursors_are_400(values, key_type, nullable):
+    with pytest.raises(HTTPError) as caught:
+        decode_cursor(encode_cursor(values), key_type, nullable)
+    assert caught.value.status == 400
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', 'bm90IGpzb24'])
+def test_undecodable_cursors_are_400(cursor):
+    with pytest.raises(HTTPError) as caught:
+        decode_cursor(cursor, str)
+    assert caught.value.status == 400
+
+
+def test_pages_follow_the_cursor(api):
+    status, _, first = call(api, 'GET', '/songs?sort=bpm&limit=4')
+    assert status == 200
+    _, _, second = call(api, 'GET', f"/songs?sort=bpm&limit=4&after={first['next']}")
+    assert [item['bpm'] for item in first['items'] + second['items']] == list(range(100, 108))
+
+
+@pytest.mark.parametrize('target', ['/artists', '/songs?sort=bpm'])
+def test_out_of_range_cursor_is_400_not_500(api, target):
+    cursor = encode_cursor(["a", 10 ** 24])
+    assert call(api, 'GET', f"{target}{'&' if '?' in target else '?'}after={cursor}")[0] == 400
+
+
+def test_not_modified_until_the_catalog_changes(api):
+    status, headers, _ = call(api, 'GET', '/artists')
+    assert status == 200
+    etag = headers['ETag']
+    assert call(api, 'GET', '/artists', headers={'if-none-match': etag})[:2] == (304, {'ETag': etag})
+
+    assert call(api, 'POST', '/artists', {'title': 'New Band'})[0] == 201
+    status, headers, payload = call(api, 'GET', '/artists', headers={'if-none-match': etag})
+    assert status == 200
+    assert headers['ETag'] != etag
+    assert 'New Band' in [item['title'] for item in payload['items']]
+
+
+def test_duplicate_artist_is_409(api):
+    status, _, payload = call(api, 'POST', '/artists', {'title': 'ASA'})
+    assert status == 409
+    assert payload['id'] == 2
+
+
+def test_rename_onto_an_existing_artist_is_409(api):
+    assert call(api, 'PATCH', '/artists/2', {'title': 'Daft Punk'})[0] == 409
+    assert call(api, 'GET', '/artists/2')[2]['title'] == 'ASA'
+
+
+@pytest.mark.parametrize('body', [b'{"title": ', b'["title"]'])
+def test_bad_json_body_is_400(api, body):
+    assert call(api, 'POST', '/artists', body)[0] == 400
+
+
+def test_missing_song_is_404(api):
+    assert call(api, 'GET', '/songs/999')[0] == 404
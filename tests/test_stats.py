@@ -0,0 +1,91 @@
+import pytest
+
+from stats import parse_numbers, normalise_release_date, catalog_stats
+
+
+def test_parse_numbers():
+    assert parse_numbers('3,1,2').tolist() == [3, 1, 2]
+    assert parse_numbers('-1').tolist() == [-1]
+    assert parse_numbers(None).tolist() == []
+
+
+@pytest.mark.parametrize('text', ['1,2,x,4', '1,,3', '1,2,'])
+def test_parse_numbers_rejects_bad_input(text):
+    with pytest.raises(ValueError):
+        parse_numbers(text)
+
+
+@pytest.mark.parametrize('text, iso', [
+    ('1999', '1999'),
+    (' 2014-03-09 ', '2014-03-09'),
+    ('2014-03', '2014-03'),
+    ('09/03/2014', '2014-03-09'),
+    ('03/2014', '2014-03'),
+    ('March 2014', '2014-03'),
+    ('3 March 2014', '2014-03-03'),
+    ('March 3, 2014', '2014-03-03'),
+    ('circa 1999', '1999'),
+    ('31/02/2014', None),
+    ('2014-13', None),
+    ('between 1999 and 2000', None),
+    ('0999', None),
+    ('soon', None),
+    ('', None),
+    (None, None),
+])
+def test_normalise_release_date(text, iso):
+    assert normalise_release_date(text) == iso
+
+
+@pytest.fixture
+def small_catalog(catalog):
+    return catalog(
+        [
+            {'id': 1, 'title': 'Daft Punk', 'genre': 'House'},
+            {'id': 2, 'title': 'Kerri Chandler', 'genre': ' house'},
+            {'id': 3, 'title': 'Miles Davis', 'genre': 'jazz'},
+            {'id': 4, 'title': 'Nobody', 'genre': None},
+        ],
+        [
+            {'title': 'One More Time', 'artist_id': 1, 'bpm': 123, 'release_date': '2000'},
+            {'title': 'Da Funk', 'artist_id': 1, 'bpm': 111, 'release_date': '17/01/1995'},
+            {'title': 'Digital Love', 'artist_id': 1, 'bpm': None, 'release_date': 'March 2001'},
+            {'title': 'Rain', 'artist_id': 2, 'bpm': 125, 'release_date': None},
+            {'title': 'So What', 'artist_id': 3, 'bpm': 136, 'release_date': 'someday'},
+            {'title': 'Orphan', 'artist_id': None, 'bpm': 90, 'release_date': '2000'},
+        ],
+    )
+
+
+def test_catalog_stats(small_catalog):
+    stats = catalog_stats(top=2, bin_width=10, bind=small_catalog)
+    assert (stats['songs'], stats['artists']) == (6, 4)
+
+    genres = {genre['genre'].strip().lower(): genre for genre in stats['genres']}
+    assert len(genres) == len(stats['genres'])
+    assert {name: (genre['songs'], genre['artists'], genre['average_bpm']) for name, genre in genres.items()} == {
+        'house': (4, 2, 119.7),
+        'jazz': (1, 1, 136.0),
+        '(no genre)': (1, 1, 90.0),
+    }
+
+    histogram = stats['bpm_histogram']
+    assert histogram['bins'] == [90, 100, 110, 120, 130]
+    assert histogram['songs_without_bpm'] == 1
+    assert sum(sum(counts) for counts in histogram['genres'].values()) == 5
+
+    assert [(artist['title'], artist['songs']) for artist in stats['top_artists']] == [
+        ('Daft Punk', 3), ('Kerri Chandler', 1),
+    ]
+    assert stats['release_years'] == [
+        {'year': 1995, 'songs': 1}, {'year': 2000, 'songs': 2}, {'year': 2001, 'songs': 1},
+    ]
+    assert stats['release_dates'] == {
+        'dated': 4, 'missing': 1, 'unrecognised': 1, 'earliest': '1995-01-17', 'latest': '2001-03',
+    }
+
+
+def test_catalog_stats_of_an_empty_catalog(catalog):
+    stats = catalog_stats(bind=catalog())
+    assert (stats['songs'], stats['genres'], stats['top_artists']) == (0, [], [])
+    assert stats['release_dates']['earliest'] is None
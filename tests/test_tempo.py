@@ -0,0 +1,27 @@
+from collections import Counter
+
+import pytest
+
+from tempo import find_compatible
+
+
+@pytest.fixture
+def songs(catalog):
+    catalog([{'id': 1, 'title': 'Band', 'genre': 'house'}],
+            [{'title': f"Song {bpm}", 'artist_id': 1, 'bpm': bpm} for bpm in range(40, 260)])
+
+
+def test_bands_never_return_a_song_twice(songs):
+    matches = find_compatible(120, tolerance=33, limit=1000)
+    assert not [song for song, count in Counter(match.id for match in matches).items() if count > 1]
+
+
+@pytest.mark.parametrize('tolerance', [100 / 3, 34, 50])
+def test_overlapping_bands_are_rejected(songs, tolerance):
+    with pytest.raises(ValueError):
+        find_compatible(120, tolerance=tolerance)
+
+
+def test_exact_only_allows_wide_tolerance(songs):
+    matches = find_compatible(120, tolerance=50, half_double=False, limit=1000)
+    assert {match.bpm for match in matches} == set(range(60, 181))